@@ -0,0 +1,5 @@
+"""
+Standalone performance benchmarks, run from the python-client directory as modules, e.g.
+
+    python -m benchmarks.file_entry --sizes 100 1000
+"""
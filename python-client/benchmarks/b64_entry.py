@@ -0,0 +1,84 @@
+"""Throughput of building a B64FileEntry's src, vs. the previous streaming base64io encoder"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import os
+from itertools import product
+
+import base64io
+
+from arakawa.file_store import B64FileEntry, HashingWriter
+
+from .utils import MB, report, timer
+
+MIME = "application/vnd.apache.arrow+binary"
+
+
+def base64io_src(size: int, chunk: bytes) -> str:
+    """The previous approach - encode & hash as written via base64io, then decode the whole output"""
+    wrapped = io.BytesIO()
+    sink = HashingWriter(wrapped)
+    f = base64io.Base64IO(sink)
+    for _ in range(size // len(chunk)):
+        f.write(chunk)
+    f.close()
+    sink.hexdigest()
+    return f"data:{MIME};base64,{wrapped.getvalue().decode('ascii')}"
+
+
+def write_entry(size: int, chunk: bytes) -> B64FileEntry:
+    fe = B64FileEntry(".arrow", MIME)
+    for _ in range(size // len(chunk)):
+        fe.file.write(chunk)
+    fe.freeze()
+    return fe
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100], help="MB")
+    # e.g. 8KB for writers going through a TextIOWrapper, such as json.dump
+    parser.add_argument(
+        "--write-sizes", type=int, nargs="+", default=[8, 1024], help="KB"
+    )
+    args = parser.parse_args()
+
+    rows = []
+    for size_mb, write_kb in product(args.sizes, args.write_sizes):
+        size = size_mb * MB
+        chunk = os.urandom(write_kb * 1024)
+        with timer() as elapsed:
+            old_src = base64io_src(size, chunk)
+        old = elapsed()
+
+        with timer() as elapsed:
+            new_src = write_entry(size, chunk).src
+        new = elapsed()
+        assert new_src == old_src
+
+        # streaming the src into an output, as with `save_report(..., stream=True)`
+        fe = write_entry(size, chunk)
+        with timer() as elapsed:
+            out = io.StringIO()
+            for s in fe.iter_src():
+                out.write(s)
+        streamed = elapsed()
+
+        rows.append(
+            {
+                "size (MB)": size_mb,
+                "write (KB)": write_kb,
+                "base64io (s)": f"{old:.2f}",
+                "binascii (s)": f"{new:.2f}",
+                "speedup": f"{old / new:.1f}x",
+                "iter_src (s)": f"{streamed:.2f}",
+            }
+        )
+
+    report(rows, list(rows[0]))
+
+
+if __name__ == "__main__":
+    main()
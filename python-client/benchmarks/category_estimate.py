@@ -0,0 +1,64 @@
+"""Time of deciding which string columns are stored as categories, exact counts vs. sampled estimates"""
+
+from __future__ import annotations
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from arakawa.common.arrow_processor import DFConverter
+from arakawa.common.df_processor import parse_categories
+
+from .utils import report, timer
+
+
+def gen_df(rows: int, cols: int) -> pd.DataFrame:
+    """String columns of mostly unique ids, with every fourth a low-cardinality label"""
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(
+        {
+            f"c{i}": (
+                rng.integers(0, 10, rows) if i % 4 == 0 else rng.integers(0, rows, rows)
+            ).astype(str)
+            for i in range(cols)
+        }
+    )
+
+
+def _categories(df: pd.DataFrame) -> set[str]:
+    return set(df.select_dtypes("category").columns)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--shapes", nargs="+", default=["50000x500", "10000000x4"], help="ROWSxCOLS"
+    )
+    args = parser.parse_args()
+
+    rows_out = []
+    for shape in args.shapes:
+        rows, cols = (int(x) for x in shape.split("x"))
+        df = gen_df(rows, cols)
+        row: dict[str, str] = {"shape": shape}
+        decided = {}
+        for estimate in ("exact", "sample"):
+            data = df.copy()
+            with timer() as elapsed:
+                parse_categories(data, category_estimate=estimate)
+            row[f"parse_categories {estimate} (s)"] = f"{elapsed():.2f}"
+            decided[estimate] = _categories(data)
+
+            with timer() as elapsed:
+                DFConverter(df, category_estimate=estimate)
+            row[f"DFConverter {estimate} (s)"] = f"{elapsed():.2f}"
+
+        row["same categories"] = str(decided["exact"] == decided["sample"])
+        rows_out.append(row)
+
+    report(rows_out, list(rows_out[0]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Time of computing DataTable column statistics, relative to writing the table itself"""
+
+from __future__ import annotations
+
+import argparse
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from arakawa.common.column_stats import ColumnStats
+from arakawa.common.datafiles import ArrowFormat
+
+from .utils import MB, report, timer
+
+
+def gen_df(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(
+        {
+            "int": rng.integers(0, 1_000_000, rows),
+            "float": rng.normal(size=rows),
+            "label": rng.choice(["a", "b", "c", "d"], rows),
+            "id": rng.integers(0, rows, rows).astype(str),
+            "time": pd.Timestamp("2020-01-01") + pd.to_timedelta(np.arange(rows), "s"),
+        }
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", nargs="+", type=int, default=[100_000, 5_000_000])
+    args = parser.parse_args()
+
+    rows_out = []
+    for rows in args.rows:
+        df = gen_df(rows)
+        row: dict[str, str] = {"rows": str(rows)}
+        for name, data in (("pandas", df), ("arrow", pa.Table.from_pandas(df))):
+            with timer() as elapsed:
+                ArrowFormat.save_file(pa.MockOutputStream(), data)
+            row[f"write {name} (s)"] = f"{elapsed():.2f}"
+
+            with timer() as elapsed:
+                stats = ColumnStats(data).to_json()
+            row[f"stats {name} (s)"] = f"{elapsed():.2f}"
+        row["stats (KB)"] = f"{len(stats) / MB * 1024:.1f}"
+        rows_out.append(row)
+
+    report(rows_out, list(rows_out[0]))
+
+
+if __name__ == "__main__":
+    main()
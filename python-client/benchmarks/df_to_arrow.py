@@ -0,0 +1,104 @@
+"""Time & peak memory of writing a DataFrame's Arrow file for a DataTable,
+the process_df engine vs. the single-pass conversion, whole or in row batches"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing as mp
+from collections.abc import Callable
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from arakawa.common.arrow_processor import DFConverter, df_to_arrow
+from arakawa.common.datafiles import write_batches, write_table
+from arakawa.common.df_processor import process_df
+
+from .utils import MB, peak_memory, report, timer
+
+
+def gen_df(rows: int, cols: int) -> pd.DataFrame:
+    """A frame cycling through the common column types"""
+    rng = np.random.default_rng(0)
+    gens: list[Callable[[], object]] = [
+        lambda: rng.integers(0, 1000, rows),
+        lambda: rng.random(rows),
+        lambda: np.where(rng.random(rows) > 0.1, rng.random(rows), np.nan),
+        lambda: pd.Categorical.from_codes(
+            rng.integers(0, 10, rows), [f"cat_{i}" for i in range(10)]
+        ).astype(str),
+        lambda: pd.date_range("2020", periods=rows, freq="s"),
+        lambda: rng.random(rows) > 0.5,
+        lambda: rng.integers(0, 10**6, rows).astype(str),
+    ]
+    return pd.DataFrame({f"c{i}": gens[i % len(gens)]() for i in range(cols)})
+
+
+def process_df_engine(df: pd.DataFrame) -> None:
+    """The original approach, converting the whole processed frame"""
+    table = pa.Table.from_pandas(process_df(df), preserve_index=False)
+    write_table(table, pa.MockOutputStream())
+
+
+def single_pass_engine(df: pd.DataFrame) -> None:
+    """Converting the whole frame in a single batch"""
+    write_table(df_to_arrow(df, batch_size=max(len(df), 1)), pa.MockOutputStream())
+
+
+def batched_engine(df: pd.DataFrame) -> None:
+    """As ArrowFormat.save_file, streaming batches of rows to the file"""
+    converter = DFConverter(df)
+    write_batches(converter.schema, converter.iter_batches(), pa.MockOutputStream())
+
+
+ENGINES = {
+    "process_df": process_df_engine,
+    "single-pass": single_pass_engine,
+    "batched": batched_engine,
+}
+
+
+# NOTE - files are written to a mock stream, which only counts the bytes
+
+
+def _run(engine: str, rows: int, cols: int, results: mp.Queue) -> None:
+    df = gen_df(rows, cols)
+    with peak_memory() as peak, timer() as elapsed:
+        ENGINES[engine](df)
+    results.put((elapsed(), peak()))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--shapes", nargs="+", default=["1000000x50", "10000000x10"], help="ROWSxCOLS"
+    )
+    args = parser.parse_args()
+
+    # run each conversion in a fresh process, so peak memory is measured independently
+    ctx = mp.get_context("fork")
+    rows_out = []
+    for shape in args.shapes:
+        rows, cols = (int(x) for x in shape.split("x"))
+        results = {}
+        for engine in ENGINES:
+            queue = ctx.Queue()
+            p = ctx.Process(target=_run, args=(engine, rows, cols, queue))
+            p.start()
+            results[engine] = queue.get()
+            p.join()
+
+        base_t = results["process_df"][0]
+        row = {"shape": shape}
+        for engine, (t, _) in results.items():
+            row[f"{engine} (s)"] = f"{t:.2f} ({base_t / t:.1f}x)"
+        for engine, (_, mem) in results.items():
+            row[f"{engine} peak (MB)"] = f"{mem / MB:.0f}"
+        rows_out.append(row)
+
+    report(rows_out, list(rows_out[0]))
+
+
+if __name__ == "__main__":
+    main()
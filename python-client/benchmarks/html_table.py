@@ -0,0 +1,50 @@
+"""Time of rendering Table blocks' HTML, pandas' `to_html` vs. the vectorized `to_html_table`"""
+
+from __future__ import annotations
+
+import argparse
+
+import polars as pl
+
+from arakawa.common.html_table import to_html_table
+
+from .df_to_arrow import gen_df
+from .utils import report, timer
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--shapes", nargs="+", default=["20x5", "200x10", "5000x20"], help="ROWSxCOLS"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=20, help="Tables rendered per shape"
+    )
+    args = parser.parse_args()
+
+    rows_out = []
+    for shape in args.shapes:
+        rows, cols = (int(x) for x in shape.split("x"))
+        df = gen_df(rows, cols)
+        pl_df = pl.from_pandas(df)
+        renderers = {
+            "pandas to_html": df.to_html,
+            "pandas fast": lambda: to_html_table(df),  # noqa: B023
+            "polars to_html": lambda: pl_df.to_pandas().to_html(),  # noqa: B023
+            "polars fast": lambda: to_html_table(pl_df),  # noqa: B023
+        }
+        row = {"shape": shape, "tables": str(args.repeat)}
+        base = None
+        for name, render in renderers.items():
+            with timer() as elapsed:
+                for _ in range(args.repeat):
+                    render()
+            base = base or elapsed()
+            row[f"{name} (s)"] = f"{elapsed():.3f} ({base / elapsed():.1f}x)"
+        rows_out.append(row)
+
+    report(rows_out, list(rows_out[0]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Peak memory of adding a DataFrame to a DataTable and writing it, relative to the frame's own size,
+copying the frame up front as before vs. the lazy copy-on-write ingestion"""
+
+from __future__ import annotations
+
+import argparse
+import ctypes
+import gc
+import multiprocessing as mp
+
+import pandas as pd
+import pyarrow as pa
+
+import arakawa as ar
+from arakawa.view.asset_writers import DataTableWriter
+
+from .df_to_arrow import gen_df
+from .utils import MB, peak_memory, report, timer
+
+
+def deep_copy_engine(df: pd.DataFrame) -> None:
+    """The original ingestion, writing a deep copy of the frame"""
+    DataTableWriter().write_file(df.copy(deep=True), pa.MockOutputStream())
+
+
+def copy_on_write_engine(df: pd.DataFrame) -> None:
+    block = ar.DataTable(df)
+    DataTableWriter().write_file(block.data, pa.MockOutputStream())
+
+
+ENGINES = {"deep copy": deep_copy_engine, "copy-on-write": copy_on_write_engine}
+
+
+def _run(engine: str, rows: int, cols: int, results: mp.Queue) -> None:
+    df = gen_df(rows, cols)
+    size = df.memory_usage(index=True, deep=True).sum()
+    before = df.copy(deep=True) if rows <= 100_000 else None
+    # return the memory freed whilst generating the frame, so it isn't reused unnoticed
+    gc.collect()
+    pa.default_memory_pool().release_unused()
+    ctypes.CDLL("libc.so.6").malloc_trim(0)
+    with peak_memory() as peak, timer() as elapsed:
+        ENGINES[engine](df)
+    # the caller's frame is never modified
+    if before is not None:
+        pd.testing.assert_frame_equal(df, before)
+    results.put((size, elapsed(), peak()))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--shapes", nargs="+", default=["100000x10", "2000000x20"], help="ROWSxCOLS"
+    )
+    args = parser.parse_args()
+
+    # run each engine in a fresh process, so peak memory is measured independently
+    ctx = mp.get_context("fork")
+    rows_out = []
+    for shape in args.shapes:
+        rows, cols = (int(x) for x in shape.split("x"))
+        row = {"shape": shape}
+        for engine in ENGINES:
+            queue = ctx.Queue()
+            p = ctx.Process(target=_run, args=(engine, rows, cols, queue))
+            p.start()
+            size, t, mem = queue.get()
+            p.join()
+            row["input (MB)"] = f"{size / MB:.0f}"
+            row[f"{engine} (s)"] = f"{t:.2f}"
+            # the peak, including the input, as a multiple of the input
+            row[f"{engine} peak"] = f"{mem / MB:.0f}MB ({(size + mem) / size:.2f}x)"
+        rows_out.append(row)
+
+    report(rows_out, list(rows_out[0]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Throughput of encoding large Vega-Lite specs and view trees as HTML-safe JSON,
+with jinja's `htmlsafe_json_dumps` (stdlib `json`) vs. `htmlsafe_dumps` per JSON backend"""
+
+from __future__ import annotations
+
+import argparse
+
+import altair as alt
+import numpy as np
+import pandas as pd
+from jinja2.utils import htmlsafe_json_dumps
+
+from arakawa import optional_libs as opt
+from arakawa.common.json_backend import htmlsafe_dumps
+from arakawa.file_store import B64FileEntry
+from arakawa.processors import ConvertPydantic, Pipeline, PreProcessView, ViewState
+
+from .utils import MB, report, timer
+from .view_serialization import gen_blocks_view, gen_graph_view
+
+
+def gen_vega_spec(rows: int) -> dict:
+    """A Vega-Lite scatter plot of `rows` inline rows"""
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(
+        {
+            "x": rng.random(rows),
+            "y": rng.normal(size=rows),
+            "category": rng.choice(["a & b", "<c>", "d'e"], rows),
+        }
+    )
+    alt.data_transformers.disable_max_rows()
+    chart = alt.Chart(df).mark_point().encode(x="x", y="y", color="category")
+    return chart.to_dict()
+
+
+def view_json(blocks) -> dict:
+    s = ViewState(blocks=blocks, file_entry_klass=B64FileEntry)
+    return Pipeline(s).pipe(PreProcessView()).pipe(ConvertPydantic()).state.view_json
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000, help="Vega-Lite rows")
+    parser.add_argument("--blocks", type=int, default=10_000)
+    parser.add_argument("--nodes", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3, help="Encodes per object")
+    args = parser.parse_args()
+
+    objs = {
+        f"{args.rows}-row Vega-Lite": gen_vega_spec(args.rows),
+        f"{args.blocks} blocks": view_json(gen_blocks_view(args.blocks)),
+        f"{args.nodes}-node graph": view_json(gen_graph_view(args.nodes)),
+    }
+    encoders = {
+        "jinja": htmlsafe_json_dumps,
+        "json": lambda x: htmlsafe_dumps(x, "json"),
+    }
+    if opt.HAVE_ORJSON:
+        encoders["orjson"] = lambda x: htmlsafe_dumps(x, "orjson")
+
+    rows = []
+    for name, obj in objs.items():
+        row = {"object": name}
+        base = None
+        for enc_name, fn in encoders.items():
+            with timer() as elapsed:
+                for _ in range(args.repeat):
+                    size = len(fn(obj).encode()) / MB
+            t = elapsed() / args.repeat
+            base = base or t
+            row[f"{enc_name} (MB/s)"] = f"{size / t:.0f} ({base / t:.1f}x)"
+        rows.append(row)
+
+    report(rows, list(rows[0]))
+
+
+if __name__ == "__main__":
+    main()
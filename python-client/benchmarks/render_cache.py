@@ -0,0 +1,65 @@
+"""Time of rebuilding a multi-tab report after changing one chart, with and without a `RenderCache`"""
+
+from __future__ import annotations
+
+import argparse
+
+import altair as alt
+import pandas as pd
+
+import arakawa as ar
+
+from .df_to_arrow import gen_df
+from .utils import report, timer
+
+
+def gen_report(tabs: int, rows: int, changed: int = 0) -> ar.Blocks:
+    """A report of `tabs` pages of 5 blocks each, with the chart of the first page scaled by `changed`"""
+    pages = []
+    for i in range(tabs):
+        df = gen_df(rows, 5).assign(page=i)
+        chart_df = pd.DataFrame(
+            {
+                "x": range(20),
+                "y": [(i + (changed if i == 0 else 0)) * x for x in range(20)],
+            }
+        )
+        pages.append(
+            ar.Page(
+                ar.Text(f"## Page {i}"),
+                ar.BigNumber(heading="Rows", value=len(df)),
+                ar.Group(
+                    ar.DataTable(df),
+                    ar.Plot(alt.Chart(chart_df).mark_line().encode(x="x", y="y")),
+                    columns=2,
+                ),
+                ar.Table(df.head(10)),
+                title=f"Page {i}",
+            )
+        )
+    return ar.Blocks(blocks=pages)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tabs", type=int, default=60, help="Pages of 5 blocks each")
+    parser.add_argument("--rows", type=int, default=10_000, help="Rows per DataTable")
+    args = parser.parse_args()
+
+    cache = ar.RenderCache()
+    ar.stringify_report(gen_report(args.tabs, args.rows), render_cache=cache)
+
+    rows_out = []
+    for name, render_cache in [("uncached", None), ("render cache", cache)]:
+        # the data is regenerated each time, as when re-running a notebook
+        view = gen_report(args.tabs, args.rows, changed=1)
+        with timer() as elapsed:
+            ar.stringify_report(view, render_cache=render_cache)
+        rows_out.append({"build": name, "time (s)": f"{elapsed():.3f}"})
+
+    report(rows_out, list(rows_out[0]))
+    print(cache)
+
+
+if __name__ == "__main__":
+    main()
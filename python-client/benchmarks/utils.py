@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import resource
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+
+MB = 1024 * 1024
+
+
+@contextmanager
+def timer() -> Iterator[Callable[[], float]]:
+    """Time the enclosed block, the yielded function returns the elapsed seconds"""
+    start = time.perf_counter()
+    end: float | None = None
+
+    def elapsed() -> float:
+        return (end or time.perf_counter()) - start
+
+    try:
+        yield elapsed
+    finally:
+        end = time.perf_counter()
+
+
+def rss() -> int:
+    """The current resident memory of the process in bytes (Linux only)"""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * resource.getpagesize()
+
+
+@contextmanager
+def peak_memory(interval: float = 0.001) -> Iterator[Callable[[], int]]:
+    """Sample the resident memory whilst the enclosed block runs,
+    the yielded function returns the peak increase in bytes"""
+    base = rss()
+    peak = base
+    done = threading.Event()
+
+    def sample() -> None:
+        nonlocal peak
+        while not done.wait(interval):
+            peak = max(peak, rss())
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    try:
+        yield lambda: peak - base
+    finally:
+        done.set()
+        sampler.join()
+        peak = max(peak, rss())
+
+
+def report(rows: list[dict], columns: list[str]) -> None:
+    """Print the results as a simple aligned table"""
+    widths = [max(len(c), *(len(str(r[c])) for r in rows)) for c in columns]
+    print("  ".join(c.ljust(w) for c, w in zip(columns, widths, strict=True)))
+    for r in rows:
+        print(
+            "  ".join(str(r[c]).ljust(w) for c, w in zip(columns, widths, strict=True))
+        )
@@ -0,0 +1,92 @@
+"""Time of serializing converted views to JSON, camelizing the dumped dict vs. dumping with camelCase aliases"""
+
+from __future__ import annotations
+
+import argparse
+
+import humps
+import numpy as np
+
+import arakawa as ar
+from arakawa.file_store import B64FileEntry
+from arakawa.processors import ConvertPydantic, Pipeline, PreProcessView, ViewState
+
+from .utils import report, timer
+
+
+def gen_blocks_view(n: int) -> ar.Blocks:
+    """`n` blocks - texts, big numbers and groups of text - in tabs of 75"""
+    blocks = []
+    for i in range(n // 4):
+        blocks += [
+            ar.Text(f"Text **{i}**", name=f"text_{i}"),
+            ar.BigNumber(heading="Value", value=i, change=1, is_upward_change=True),
+            ar.Group(ar.Text(f"Text {i}"), columns=1, label=f"{i}"),
+        ]
+    tabs = [
+        ar.Group(blocks=blocks[i : i + 75], label=f"Tab {i}")
+        for i in range(0, len(blocks), 75)
+    ]
+    return ar.Blocks(ar.Select(blocks=tabs))
+
+
+def gen_graph_view(nodes: int) -> ar.Blocks:
+    """A Sigma graph of `nodes` nodes, with 2 edges per node"""
+    rng = np.random.default_rng(0)
+    xy = rng.random((nodes, 2)).tolist()
+    targets = rng.integers(0, nodes, (nodes, 2)).tolist()
+    data = {
+        "options": {"type": "directed", "multi": False, "allowSelfLoops": True},
+        "attributes": {},
+        "nodes": [
+            {"key": i, "attributes": {"x": x, "y": y, "label": f"node {i}", "size": 1}}
+            for i, (x, y) in enumerate(xy)
+        ],
+        "edges": [
+            {"key": 2 * i + j, "source": i, "target": t, "attributes": {"weight": 1.0}}
+            for i, ts in enumerate(targets)
+            for j, t in enumerate(ts)
+        ],
+    }
+    return ar.Blocks(ar.Sigma(data), ar.Text("A graph"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--blocks", type=int, default=10_000)
+    parser.add_argument("--nodes", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3, help="Dumps per view")
+    args = parser.parse_args()
+
+    views = {
+        f"{args.blocks} blocks": gen_blocks_view(args.blocks),
+        f"{args.nodes}-node graph": gen_graph_view(args.nodes),
+    }
+    rows = []
+    for name, blocks in views.items():
+        s = ViewState(blocks=blocks, file_entry_klass=B64FileEntry)
+        view = Pipeline(s).pipe(PreProcessView()).pipe(ConvertPydantic()).result
+
+        def dump():
+            return view.model_dump(mode="json", by_alias=True, exclude_none=True)  # noqa: B023
+
+        dumps = {
+            "dump + camelize": lambda: humps.camelize(dump()),
+            "dump by alias": dump,
+        }
+        row = {"view": name}
+        base = None
+        for dump_name, fn in dumps.items():
+            with timer() as elapsed:
+                for _ in range(args.repeat):
+                    fn()
+            t = elapsed() / args.repeat
+            base = base or t
+            row[f"{dump_name} (s)"] = f"{t:.3f} ({base / t:.1f}x)"
+        rows.append(row)
+
+    report(rows, list(rows[0]))
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,7 @@ except ImportError:
     __version__ = "0.0.0"
 
 # Public API re-exports
+from .asset_cache import AssetCache  # noqa: F401
 from .blocks import (  # noqa: F401
     HTML,
     Alert,
@@ -63,6 +64,8 @@ from .processors import (  # noqa: F401
     save_report,
     stringify_report,
 )
+from .profiling import BuildProfile  # noqa: F401
+from .render_cache import RenderCache  # noqa: F401
 from .types import AlertMode, ComputeMethod, SelectType, VAlign  # noqa: F401
 from .view import Blocks, Report, View  # noqa: F401
 
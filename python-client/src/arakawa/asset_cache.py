@@ -0,0 +1,221 @@
+"""
+Persistent on-disk cache of serialized assets, keyed by a fingerprint of their source object
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Any
+
+import pandas as pd
+import pyarrow as pa
+from altair.utils import SchemaBase
+from multimethod import multimethod
+
+from arakawa import optional_libs as opt
+from arakawa.common.column_stats import ColumnStats
+from arakawa.common.dataset_scan import DatasetScan
+from arakawa.settings import AR_VERSION
+from arakawa.types import NPath
+from arakawa.utils import log
+
+DEFAULT_MAX_SIZE = 1024**3
+
+
+@multimethod
+def fingerprint(_: object) -> str | None:
+    """Return a digest of an asset's data, or None if the type can't be fingerprinted (and so isn't cached)"""
+    return None
+
+
+@fingerprint.register  # type: ignore
+def _(x: str) -> str | None:
+    return hashlib.sha256(x.encode()).hexdigest()
+
+
+@fingerprint.register  # type: ignore
+def _(x: pd.DataFrame) -> str | None:
+    try:
+        row_hashes = pd.util.hash_pandas_object(x, index=True).to_numpy()
+    except TypeError:
+        # unhashable values, e.g. lists or dicts
+        return None
+
+    h = hashlib.sha256(row_hashes.tobytes())
+    h.update(repr(list(x.columns)).encode())
+    h.update(repr(list(x.dtypes)).encode())
+    h.update(repr(list(x.index.names)).encode())
+    # object values are hashed as strings, so also hash their types to tell apart e.g. 1 and "1"
+    is_object = pd.api.types.is_object_dtype
+    objects = [x.index] if is_object(x.index) else []
+    objects += [x.iloc[:, i] for i, dt in enumerate(x.dtypes) if is_object(dt)]
+    for values in objects:
+        types = pd.Series(values).map(lambda v: type(v).__qualname__)
+        h.update(pd.util.hash_pandas_object(types, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+@fingerprint.register  # type: ignore
+def _(x: SchemaBase) -> str | None:
+    spec = json.dumps(x.to_dict(), sort_keys=True, default=str)
+    return hashlib.sha256(spec.encode()).hexdigest()
+
+
+@fingerprint.register  # type: ignore
+def _(x: pa.Table) -> str | None:
+    # the serialized batches only include the sliced parts of their buffers
+    h = hashlib.sha256(x.schema.serialize())
+    for batch in x.to_batches():
+        h.update(batch.serialize())
+    return h.hexdigest()
+
+
+@fingerprint.register  # type: ignore
+def _(x: DatasetScan) -> str | None:
+    # assume files with the same size & modification time are unchanged
+    h = hashlib.sha256(f"{x.format}:{x.columns}:{x.filter}:{x.limit}".encode())
+    for fn in sorted(x.dataset.files):
+        st = os.stat(fn)
+        h.update(f"{fn}:{st.st_size}:{st.st_mtime_ns}".encode())
+    return h.hexdigest()
+
+
+@fingerprint.register  # type: ignore
+def _(x: ColumnStats) -> str | None:
+    # keyed apart from the table's own payload by its extension, see `PydanticBuilder._prepare_entry`
+    return fingerprint(x.data)
+
+
+if opt.HAVE_POLARS:
+
+    @fingerprint.register  # type: ignore
+    def _(x: opt.PlDataFrame) -> str | None:
+        try:
+            # NOTE - row hashes are only stable for a given polars version
+            row_hashes = x.hash_rows().to_numpy()
+        except Exception:
+            return None
+
+        h = hashlib.sha256(row_hashes.tobytes())
+        h.update(f"{opt.pl.__version__}:{x.schema!r}".encode())
+        return h.hexdigest()
+
+
+def asset_key(data: Any, *parts: str) -> str | None:
+    """Build the key of an asset's data, with any extra parts that determine its payload,
+    or None if the data can't be fingerprinted"""
+    fp = fingerprint(data)
+    if fp is None:
+        return None
+    return hashlib.sha256(":".join((AR_VERSION, *parts, fp)).encode()).hexdigest()
+
+
+class AssetCache:
+    """
+    Cache of the payloads written for assets (e.g. the Arrow file for a DataTable's DataFrame),
+    so rebuilding a report with unchanged data skips serializing it again.
+
+    Payloads are stored as files in `cache_dir`, and the least-recently used are evicted once they exceed `max_size` bytes in total,
+    via `evict` after each build.
+    Hit and miss counts are kept for the lifetime of the cache object.
+    """
+
+    def __init__(self, cache_dir: NPath, max_size: int = DEFAULT_MAX_SIZE):
+        """
+        Args:
+            cache_dir: Directory to store the cached payloads in, created if it doesn't exist
+            max_size: The maximum total size of the cached payloads in bytes (default: 1GB)
+        """
+        self.cache_dir = Path(cache_dir).expanduser()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+        self.hits: int = 0
+        self.misses: int = 0
+        # assets may be fetched concurrently, see `PydanticBuilder.build_assets`
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"AssetCache(cache_dir={str(self.cache_dir)!r}, hits={self.hits}, misses={self.misses})"
+
+    def get_key(self, data: Any, *parts: str) -> str | None:
+        """Build the cache key for an asset's data, see `asset_key`"""
+        return asset_key(data, *parts)
+
+    def _path(self, key: str, ext: str) -> Path:
+        return self.cache_dir / f"{key}{ext}"
+
+    def _write(self, path: Path, write: Callable[[IO[bytes]], None]) -> None:
+        # write to a temp file first, so failed or concurrent writes never leave a partial payload
+        fd, tmp_name = tempfile.mkstemp(dir=self.cache_dir, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+        except BaseException:
+            os.unlink(tmp_name)
+            raise
+
+        os.replace(tmp_name, path)
+
+    def contains(self, key: str, ext: str) -> bool:
+        """Whether the payload for the key is cached, so fetching it won't call its writer"""
+        return self._path(key, ext).exists()
+
+    @contextmanager
+    def fetch(
+        self, key: str, ext: str, write: Callable[[IO[bytes]], None]
+    ) -> Iterator[IO[bytes]]:
+        """Open the cached payload for the key, calling `write` to create it on a miss"""
+        path = self._path(key, ext)
+        # payloads are opened whilst holding the lock, so can't be evicted in between
+        with self._lock:
+            f = self._open(path)
+            if f:
+                self.hits += 1
+                # mark as recently used
+                path.touch()
+            else:
+                self.misses += 1
+
+        if f is None:
+            self._write(path, write)
+            with self._lock:
+                f = path.open("rb")
+
+        with f:
+            yield f
+
+    @staticmethod
+    def _open(path: Path) -> IO[bytes] | None:
+        try:
+            return path.open("rb")
+        except FileNotFoundError:
+            return None
+
+    def evict(self) -> None:
+        """Remove the least-recently used payloads until within max_size"""
+        with self._lock:
+            entries = [
+                e
+                for e in os.scandir(self.cache_dir)
+                if e.is_file() and not e.name.startswith(".tmp-")
+            ]
+            total = sum(e.stat().st_size for e in entries)
+            for e in sorted(entries, key=lambda e: e.stat().st_mtime_ns):
+                if total <= self.max_size:
+                    break
+                log.debug(f"Evicting {e.name} from the asset cache")
+                total -= e.stat().st_size
+                os.unlink(e.path)
+
+    def clear(self) -> None:
+        """Remove all cached payloads"""
+        for e in os.scandir(self.cache_dir):
+            if e.is_file():
+                os.unlink(e.path)
@@ -2,14 +2,22 @@
 
 from __future__ import annotations
 
+import dataclasses as dc
 from pathlib import Path
-from typing import TYPE_CHECKING, Any, cast
+from typing import TYPE_CHECKING, Any, Literal, cast
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 from pandas.io.formats.style import Styler
 from pydantic import AnyUrl, Field
 
-from arakawa.common.df_processor import to_df
+from arakawa.common.arrow_processor import is_arrow_data, to_arrow_table
+from arakawa.common.column_stats import ColumnStats
+from arakawa.common.dataset_scan import DatasetScan
+from arakawa.common.df_processor import CategoryEstimate, to_df
+from arakawa.common.html_table import TableRenderer
+from arakawa.exceptions import ARError
 from arakawa.file_store import FileEntry
 from arakawa.types import NPath
 
@@ -33,6 +41,10 @@ class AssetBlock(OptionalNameMinx, OptionalCaptionMixin, OptionalLabelMixin, Dat
     src: AnyUrl | None = Field(default=None)
     type: str | None = Field(default=None)  # pattern=r"\w+/[\w.+\-]+"
 
+    def linked_assets(self) -> dict[str, AssetBlock]:
+        """Extra assets stored alongside the block's own, keyed by the field that references them"""
+        return {}
+
 
 class Media(AssetBlock):
     """
@@ -172,12 +184,15 @@ class Table(AssetBlock):
 
     _tag = "Table"
 
+    renderer: TableRenderer | None = Field(default=None, exclude=True)
+
     def __init__(
         self,
         data: pd.DataFrame | Styler | PlDataFrame,
         caption: str | None = None,
         name: str | None = None,
         label: str | None = None,
+        renderer: TableRenderer | None = None,
     ):
         """
         Args:
@@ -185,8 +200,11 @@ class Table(AssetBlock):
             caption: A caption to display below the table (optional)
             name: A unique name for the block to reference when adding text or embedding (optional)
             label: A label used when displaying the block (optional)
+            renderer: How DataFrames are rendered, `"pandas"` with `DataFrame.to_html`, or `"fast"`, which formats whole columns at once, but formats values as Arrow rather than pandas; `Styler`s are always rendered by pandas (default: the `AR_TABLE_RENDERER` environment variable, or `"pandas"`)
         """
-        super().__init__(data=data, caption=caption, name=name, label=label)
+        super().__init__(
+            data=data, caption=caption, name=name, label=label, renderer=renderer
+        )
 
 
 class DataTable(AssetBlock):
@@ -203,25 +221,139 @@ class DataTable(AssetBlock):
 
     rows: int = Field(..., ge=0)
     columns: int = Field(..., ge=0)
+    category_estimate: CategoryEstimate | None = Field(default=None, exclude=True)
+    # NOTE - the browser only decodes lz4 compressed buffers
+    compression: Literal["lz4"] | None = Field(default=None, exclude=True)
+    batch_size: int | None = Field(default=None, gt=0, exclude=True)
+    preview_rows: int | None = Field(default=None, gt=0, exclude=True)
+    # a DataTable of the first rows, displayed until the full table is requested
+    preview: Any = Field(default=None, exclude=True)
+    preview_src: AnyUrl | None = Field(default=None)
+    # the statistics of each column, written by the same writer as a JSON asset, see `DataTableWriter`
+    column_stats: Any = Field(default=None, exclude=True)
+    stats_src: AnyUrl | None = Field(default=None)
 
     def __init__(
         self,
-        df: pd.DataFrame | PlDataFrame,
+        df: pd.DataFrame | PlDataFrame | pa.Table | pa.RecordBatchReader | Any,
         caption: str | None = None,
         name: str | None = None,
         label: str | None = None,
+        category_estimate: CategoryEstimate | None = None,
+        compression: Literal["lz4"] | None = None,
+        batch_size: int | None = None,
+        preview_rows: int | None = None,
+        stats: bool = False,
     ):
         """
         Args:
-            df: A Pandas/Polars dataframe to attach to the report
+            df: A Pandas/Polars dataframe to attach to the report, or any Arrow data - a PyArrow table or stream, or an object with `__arrow_c_stream__` or `__arrow_c_array__`, e.g. a DuckDB result, which is written without converting it to pandas. Arrays of values (rather than records) are written as a single column
             caption: A caption to display below the plot (optional)
             name: A unique name for the block to reference when adding text or embedding (optional)
             label: A label used when displaying the block (optional)
+            category_estimate: How string columns stored as categories are detected, `"exact"` counts the unique values of every column, `"sample"` only counts them for columns whose sample looks categorical, which is faster for wide or long frames (default: the `AR_CATEGORY_ESTIMATE` environment variable, or `"exact"`)
+            compression: Compress the table's Arrow buffers with `"lz4"`, making the report smaller, at the cost of decompressing it when viewed (default: no compression)
+            batch_size: The maximum number of rows per Arrow record batch (default: about 64MB of rows for DataFrames, or as given for Arrow data)
+            preview_rows: For large tables, also write a preview of this many rows that is displayed straight away, only loading the full table when the viewer asks to, e.g. to sort, search or download it (default: no preview)
+            stats: Also write the statistics of each column - null and distinct counts, min & max, the most common values and histograms - which the table shows without loading the full table (default: False)
         """
-        # create a copy of the df to process
-        df = to_df(df)
-        # TODO - support pyarrow schema for local reports
-        (rows, columns) = df.shape
+        if isinstance(df, DatasetScan):
+            # scanned from its files when written
+            (rows, columns) = (df.count_rows(), len(df.schema))
+            if rows == 0:
+                raise ARError("Empty DataFrame provided")
+        elif is_arrow_data(df):
+            # keep Arrow data as is, referencing rather than copying its buffers
+            df = to_arrow_table(df)
+            (rows, columns) = (df.num_rows, df.num_columns)
+        else:
+            # create a copy of the df to process
+            df = to_df(df)
+            (rows, columns) = df.shape
         super().__init__(
-            data=df, caption=caption, name=name, label=label, rows=rows, columns=columns
+            data=df,
+            caption=caption,
+            name=name,
+            label=label,
+            rows=rows,
+            columns=columns,
+            category_estimate=category_estimate,
+            compression=compression,
+            batch_size=batch_size,
+            preview_rows=preview_rows,
         )
+        if stats:
+            self.column_stats = DataTable.model_construct(data=ColumnStats(df))
+        if preview_rows is not None and rows > preview_rows:
+            # the same options, for the first rows only
+            self.preview = DataTable.model_construct(
+                data=_head(df, preview_rows),
+                rows=preview_rows,
+                columns=columns,
+                category_estimate=category_estimate,
+                compression=compression,
+                batch_size=batch_size,
+            )
+
+    def linked_assets(self) -> dict[str, AssetBlock]:
+        assets: dict[str, AssetBlock] = {}
+        if self.preview is not None:
+            assets["preview_src"] = self.preview
+        if self.column_stats is not None:
+            assets["stats_src"] = self.column_stats
+        return assets
+
+    @classmethod
+    def from_file(
+        cls,
+        path: NPath,
+        format: str | None = None,
+        columns: list[str] | None = None,
+        filter: pc.Expression | None = None,
+        limit: int | None = None,
+        caption: str | None = None,
+        name: str | None = None,
+        label: str | None = None,
+        compression: Literal["lz4"] | None = None,
+        batch_size: int | None = None,
+        preview_rows: int | None = None,
+        stats: bool = False,
+    ) -> DataTable:
+        """
+        Create a DataTable from a Parquet, CSV or Arrow file, or a directory of them, without loading it into memory.
+        The file is scanned, and streamed into the report, when the report is saved
+
+        Args:
+            path: The file or directory to scan
+            format: The format of the files, one of `"parquet"`, `"csv"` or `"ipc"` (default: guessed from the extension)
+            columns: The columns to include (default: all)
+            filter: A `pyarrow.compute` expression to filter the rows by, e.g. `pc.field("year") >= 2020` (optional)
+            limit: The maximum number of rows to include (optional)
+            caption: A caption to display below the table (optional)
+            name: A unique name for the block to reference when adding text or embedding (optional)
+            label: A label used when displaying the block (optional)
+            compression: Compress the table's Arrow buffers, as `DataTable` (optional)
+            batch_size: The maximum number of rows per Arrow record batch (default: as scanned)
+            preview_rows: Also write a preview of this many rows, as `DataTable` (optional)
+            stats: Also write the statistics of each column, as `DataTable` (default: False)
+        """
+        scan = DatasetScan.open(path, format, columns, filter, limit)
+        return cls(
+            scan,
+            caption=caption,
+            name=name,
+            label=label,
+            compression=compression,
+            batch_size=batch_size,
+            preview_rows=preview_rows,
+            stats=stats,
+        )
+
+
+def _head(df: pd.DataFrame | pa.Table | DatasetScan, n: int) -> Any:
+    """The first n rows of a DataTable's data"""
+    if isinstance(df, DatasetScan):
+        return dc.replace(df, limit=n)
+    if isinstance(df, pa.Table):
+        return df.slice(0, n)
+    return df.head(n)
@@ -2,7 +2,8 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING, Any, ClassVar, TypeVar
 
-from pydantic import BaseModel, ConfigDict, computed_field
+from pydantic import AliasGenerator, BaseModel, ConfigDict, computed_field
+from pydantic.alias_generators import to_camel
 
 if TYPE_CHECKING:
     from arakawa.view import ViewVisitor
@@ -19,7 +20,11 @@ class BaseBlock(BaseModel):
 
     _tag: ClassVar[str]
 
-    model_config = ConfigDict(arbitrary_types_allowed=True)
+    # fields are serialized in camelCase for the web components, so the view is dumped directly with `by_alias`
+    model_config = ConfigDict(
+        arbitrary_types_allowed=True,
+        alias_generator=AliasGenerator(serialization_alias=to_camel),
+    )
 
     @computed_field(alias="_tag")
     @property
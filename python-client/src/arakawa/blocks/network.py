@@ -4,8 +4,8 @@ import sys
 from collections.abc import Callable
 from typing import Any
 
-import humps
-from pydantic import Field
+from pydantic import AliasGenerator, ConfigDict, Field, with_config
+from pydantic.alias_generators import to_camel
 
 from arakawa import optional_libs as opt
 from arakawa.exceptions import ARError
@@ -19,6 +19,8 @@ else:
     from typing import TypedDict
 
 
+# serialized in camelCase, as the block's fields
+@with_config(ConfigDict(alias_generator=AliasGenerator(serialization_alias=to_camel)))
 class LayoutSettings(TypedDict, total=False):
     adjust_sizes: bool | None
     barnes_hut_optimize: bool | None
@@ -60,7 +62,7 @@ class Sigma(OptionalNameMinx, OptionalLabelMixin, DataBlock):
         """
         super().__init__(
             data=data,
-            layout_settings=humps.camelize(layout_settings or {}),
+            layout_settings=layout_settings or {},
             name=name,
             label=label,
             width=width,
@@ -0,0 +1,425 @@
+"""
+Single-pass conversion of DataFrames to Arrow tables for DataTables
+
+Builds the same table as `pa.Table.from_pandas(process_df(df))`, but converts each column
+directly into its final Arrow array, rather than making a pass over the whole frame per step.
+Columns of types without a direct conversion fall back to `process_df`, one at a time.
+
+Large frames are converted in row batches (see `iter_batches`), so only a batch's worth of
+converted data is held at once. The type of each column is decided up front by a scan over
+the whole column, made batch by batch, so all batches share the same schema and dictionaries.
+
+Data that's already in Arrow (see `is_arrow_data`) is written as is, only converting the
+types arrow.js can't read, see `normalize_arrow_table`.
+"""
+
+from __future__ import annotations
+
+import dataclasses as dc
+from collections.abc import Iterator
+from typing import Any
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from pandas.api.types import (
+    infer_dtype,
+    is_bool_dtype,
+    is_datetime64_any_dtype,
+    is_float_dtype,
+    is_integer_dtype,
+    is_string_dtype,
+    is_timedelta64_dtype,
+)
+
+from arakawa.exceptions import ARError
+
+from .df_processor import (
+    MAX_FEW_CATEGORIES,
+    MAX_PROP_CATEGORIES,
+    CategoryEstimate,
+    is_categorical,
+    likely_categorical,
+    process_df,
+)
+
+# floats beyond this may not convert to integers exactly, so aren't downcast directly
+MAX_EXACT_FLOAT = 2**53
+# target in-memory size of a batch of rows, see `batch_size_for`
+BATCH_BYTES = 64 * 1024**2
+MIN_BATCH_SIZE = 1024
+# rows of strings counted at a time, small enough to stop early on columns of mostly unique values
+STR_SCAN_SIZE = 64 * 1024
+
+INT_TYPES = [np.int8, np.int16, np.int32, np.int64]
+UINT_TYPES = [np.uint8, np.uint16, np.uint32, np.uint64]
+
+
+def df_to_arrow(
+    df: pd.DataFrame,
+    batch_size: int | None = None,
+    category_estimate: CategoryEstimate = "exact",
+) -> pa.Table:
+    """Convert a DataFrame into the Arrow table stored for a DataTable
+    NOTE - unlike `process_df`, this doesn't modify the dataframe
+    """
+    converter = DFConverter(df, batch_size, category_estimate)
+    return pa.Table.from_batches(list(converter.iter_batches()), converter.schema)
+
+
+def batch_size_for(df: pd.DataFrame) -> int:
+    """The number of rows converted at a time, so a batch takes about `BATCH_BYTES` in memory"""
+    row_bytes = df.memory_usage(index=True).sum() / max(len(df), 1)
+    return max(MIN_BATCH_SIZE, int(BATCH_BYTES // max(row_bytes, 1)))
+
+
+@dc.dataclass
+class ColumnPlan:
+    """How a column is converted, decided from the whole column so every batch gets the same type"""
+
+    kind: str
+    # the numpy type ints, or integral floats, are downcast to
+    int_type: type[np.integer] | None = None
+    # the sorted categories of columns stored as a dictionary
+    categories: pd.Index | None = None
+    ordered: bool = False
+    # the whole column, converted up front as it falls back to `process_df`
+    array: pa.Array | None = None
+    # the shared Arrow dictionary built from the categories
+    dictionary: pa.Array | None = dc.field(default=None, repr=False)
+
+    def __post_init__(self):
+        if self.categories is not None:
+            self.dictionary = pa.array(self.categories, type=pa.large_string())
+
+
+class DFConverter:
+    """Converts a DataFrame into Arrow record batches of (at most) `batch_size` rows"""
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        batch_size: int | None = None,
+        category_estimate: CategoryEstimate = "exact",
+    ):
+        self.batch_size = batch_size or batch_size_for(df)
+        self.n_rows = len(df)
+        self.columns = _get_columns(df)
+        self.plans = [
+            plan_column(ser, self.batch_size, category_estimate)
+            for ser in self.columns.values()
+        ]
+        self.schema = pa.schema(
+            [
+                (name, convert_column(ser.iloc[:0], plan).type)
+                for (name, ser), plan in zip(
+                    self.columns.items(), self.plans, strict=True
+                )
+            ]
+        )
+
+    def iter_batches(self) -> Iterator[pa.RecordBatch]:
+        # an empty frame still has a (empty) batch, as `pa.Table.from_pandas`
+        for start in range(0, max(self.n_rows, 1), self.batch_size):
+            stop = start + self.batch_size
+            arrays = [
+                convert_column(ser.iloc[start:stop], plan, start)
+                for ser, plan in zip(self.columns.values(), self.plans, strict=True)
+            ]
+            yield pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+
+
+def _get_columns(df: pd.DataFrame) -> dict[str, pd.Series]:
+    columns = _flatten_columns(df.columns)
+    out: dict[str, pd.Series] = {}
+    if not isinstance(df.index, pd.RangeIndex):
+        # reset any other index into columns, named as by `reset_index`
+        try:
+            index_names = pd.DataFrame(
+                index=df.index[:0], columns=columns
+            ).reset_index()
+        except ValueError as e:
+            # an index named as a column
+            raise ARError(f"Duplicate column name found in the DataFrame: {e}") from e
+        index_frame = df.index.to_frame(index=False)
+        for i, name in enumerate(index_names.columns[: index_frame.shape[1]]):
+            _add_column(out, name, index_frame.iloc[:, i])
+
+    for i, name in enumerate(columns):
+        _add_column(out, name, df.iloc[:, i])
+    return out
+
+
+def _add_column(columns: dict[str, pd.Series], name: Any, ser: pd.Series) -> None:
+    # names are converted to strings, so e.g. 1 and "1" also clash
+    if str(name) in columns:
+        raise ARError(f"Duplicate column name {name!r} found in the DataFrame")
+    columns[str(name)] = ser
+
+
+def _flatten_columns(columns: pd.Index) -> pd.Index:
+    """flatten hierarchical columns and convert to strings, as `convert_axis`"""
+    if columns.nlevels > 1:
+        columns = pd.Index(["/".join(a) for a in columns.to_flat_index()])
+    return columns.astype("string")
+
+
+def to_arrow_array(ser: pd.Series) -> pa.Array:
+    """Convert a column with the same downcast, dictionary and string semantics as `process_df`"""
+    return convert_column(ser, plan_column(ser, max(len(ser), 1)))
+
+
+def _batches(ser: pd.Series, batch_size: int) -> Iterator[pd.Series]:
+    for start in range(0, len(ser), batch_size):
+        yield ser.iloc[start : start + batch_size]
+
+
+def plan_column(
+    ser: pd.Series, batch_size: int, category_estimate: CategoryEstimate = "exact"
+) -> ColumnPlan:
+    """Decide how to convert a column, scanning it `batch_size` rows at a time,
+    with string categories detected as `category_estimate`, see `parse_categories`"""
+    dtype = ser.dtype
+    if len(ser) == 0 or not any(b.notna().any() for b in _batches(ser, batch_size)):
+        return _fallback_plan(ser, category_estimate)
+
+    if isinstance(dtype, pd.CategoricalDtype):
+        categories = ser.cat.categories
+        if infer_dtype(categories) != "string":
+            return _fallback_plan(ser, category_estimate)
+        return ColumnPlan("dictionary", categories=categories, ordered=dtype.ordered)
+    if is_bool_dtype(dtype):
+        return ColumnPlan("bool")
+    if is_integer_dtype(dtype):
+        int_type = _downcast_int(int(ser.min()), int(ser.max()))
+        return (
+            ColumnPlan("int", int_type)
+            if int_type
+            else _fallback_plan(ser, category_estimate)
+        )
+    if is_float_dtype(dtype):
+        return _plan_float(ser, batch_size, category_estimate)
+    if is_datetime64_any_dtype(dtype):
+        return ColumnPlan("datetime")
+    if is_timedelta64_dtype(dtype):
+        # NOTE - only until arrow.js supports Duration type
+        return _plan_str(ser, batch_size, category_estimate, kind="timedelta")
+    if is_string_dtype(dtype) and infer_dtype(ser, skipna=True) == "string":
+        return _plan_str(ser, batch_size, category_estimate)
+
+    return _fallback_plan(ser, category_estimate)
+
+
+def convert_column(ser: pd.Series, plan: ColumnPlan, start: int = 0) -> pa.Array:
+    """Convert a column, or the batch of its rows from `start`, as planned"""
+    match plan.kind:
+        case "bool":
+            return pa.array(ser, type=pa.bool_(), from_pandas=True)
+        case "int":
+            mask = ser.isna().to_numpy()
+            return _masked_array(ser.to_numpy(dtype=plan.int_type, na_value=0), mask)
+        case "float" | "float_int":
+            dtype = np.dtype(getattr(ser.dtype, "numpy_dtype", ser.dtype))
+            mask = ser.isna().to_numpy()
+            values = ser.to_numpy(dtype=dtype, na_value=np.nan)
+            if plan.kind == "float_int":
+                values = np.where(mask, 0, values).astype(plan.int_type)
+            return _masked_array(values, mask)
+        case "datetime":
+            return pa.array(ser)
+        case "timedelta" | "str":
+            if plan.kind == "timedelta":
+                ser = _timedelta_to_str(ser)
+            if plan.dictionary is None:
+                return pa.array(ser, type=pa.large_string(), from_pandas=True)
+            return _dictionary(plan, plan.categories.get_indexer(ser))
+        case "dictionary":
+            return _dictionary(plan, ser.cat.codes.to_numpy())
+        case _:
+            assert plan.array is not None
+            return plan.array.slice(start, len(ser))
+
+
+def _fallback_plan(
+    ser: pd.Series, category_estimate: CategoryEstimate = "exact"
+) -> ColumnPlan:
+    df = process_df(ser.to_frame(name="_"), category_estimate=category_estimate)
+    array = pa.Table.from_pandas(df, preserve_index=False).column(0).combine_chunks()
+    return ColumnPlan("fallback", array=array)
+
+
+def _plan_float(
+    ser: pd.Series, batch_size: int, category_estimate: CategoryEstimate = "exact"
+) -> ColumnPlan:
+    dtype = np.dtype(getattr(ser.dtype, "numpy_dtype", ser.dtype))
+    if dtype == np.float16:
+        return _fallback_plan(ser, category_estimate)
+
+    # as `convert_dtypes`, floats that are all integers are converted to (downcast) ints
+    lo, hi = np.inf, -np.inf
+    for b in _batches(ser, batch_size):
+        valid = b.to_numpy(dtype=dtype, na_value=np.nan)[b.notna().to_numpy()]
+        if not (
+            np.isfinite(valid).all()
+            and (np.abs(valid) < MAX_EXACT_FLOAT).all()
+            and (np.trunc(valid) == valid).all()
+        ):
+            return ColumnPlan("float")
+        if len(valid):
+            lo, hi = min(lo, valid.min()), max(hi, valid.max())
+
+    return ColumnPlan("float_int", _downcast_int(int(lo), int(hi)))
+
+
+def _plan_str(
+    ser: pd.Series,
+    batch_size: int,
+    category_estimate: CategoryEstimate,
+    kind: str = "str",
+) -> ColumnPlan:
+    if category_estimate == "sample" and not likely_categorical(ser):
+        return ColumnPlan(kind)
+
+    size = len(ser)
+    # beyond this many categories neither criteria can be met, so stop counting
+    max_categories = max(MAX_FEW_CATEGORIES, MAX_PROP_CATEGORIES * (size + 1) - 1)
+    uniques = pd.Index([], dtype=object)
+    for b in _batches(ser, min(batch_size, STR_SCAN_SIZE)):
+        if kind == "timedelta":
+            b = _timedelta_to_str(b)
+        uniques = uniques.append(pd.Index(b.dropna().unique())).unique()
+        if len(uniques) > max_categories:
+            return ColumnPlan(kind)
+
+    if is_categorical(len(uniques), size):
+        # categories are sorted, as by `astype("category")`
+        return ColumnPlan(kind, categories=uniques.sort_values())
+    return ColumnPlan(kind)
+
+
+def _timedelta_to_str(ser: pd.Series) -> pd.Series:
+    return ser.astype("string").mask(ser.isna())
+
+
+def _masked_array(values: np.ndarray, mask: np.ndarray) -> pa.Array:
+    return pa.array(values, mask=mask if mask.any() else None)
+
+
+def _downcast_int(lo: int, hi: int) -> type[np.integer] | None:
+    """The smallest type for the range, unsigned if possible, as `downcast_numbers`
+    returns None for ranges beyond int64, which aren't downcast the same way"""
+    if hi > np.iinfo(np.int64).max:
+        return None
+    types = UINT_TYPES if lo >= 0 else INT_TYPES
+    return next(t for t in types if np.iinfo(t).min <= lo and hi <= np.iinfo(t).max)
+
+
+def _dictionary(plan: ColumnPlan, codes: np.ndarray) -> pa.DictionaryArray:
+    # index type as pandas sizes categorical codes, see `coerce_indexer_dtype`
+    n = len(plan.dictionary)
+    index_type = next((t for t in INT_TYPES if n < np.iinfo(t).max), np.int64)
+    indices = _masked_array(codes.astype(index_type), codes == -1)
+    return pa.DictionaryArray.from_arrays(
+        indices, plan.dictionary, ordered=plan.ordered
+    )
+
+
+def is_arrow_data(x: Any) -> bool:
+    """Whether the object provides Arrow data, as a pyarrow object or through the PyCapsule interface,
+    e.g. Polars and DuckDB results, other than pandas objects, which are converted as `process_df`
+    NOTE - pandas series and frames also implement the PyCapsule interface since pandas 3
+    """
+    return not isinstance(x, pd.DataFrame | pd.Series | pd.Index) and (
+        isinstance(x, pa.Table | pa.RecordBatch | pa.RecordBatchReader)
+        or hasattr(x, "__arrow_c_stream__")
+        or hasattr(x, "__arrow_c_array__")
+    )
+
+
+def to_arrow_table(x: Any) -> pa.Table:
+    """Collect Arrow data into a table, referencing rather than copying its buffers,
+    with arrays (and streams of them) of values other than structs as a single column, named as by `to_df`
+    NOTE - streams are read in full, so can only be used once
+    """
+    if isinstance(x, pa.Table):
+        return x
+    if isinstance(x, pa.RecordBatchReader):
+        return x.read_all()
+    if isinstance(x, pa.RecordBatch):
+        return pa.Table.from_batches([x])
+
+    column = (
+        pa.chunked_array(x)
+        if hasattr(x, "__arrow_c_stream__")
+        else pa.chunked_array([pa.array(x)])
+    )
+    if pa.types.is_struct(column.type):
+        return pa.Table.from_struct_array(column)
+    return pa.table({"Result": column})
+
+
+def normalize_arrow_table(table: pa.Table) -> pa.Table:
+    """Convert the columns of types arrow.js can't read, leaving the others as they are"""
+    for i, field in enumerate(table.schema):
+        column = _normalize_column(table.column(i))
+        if column is not None:
+            table = table.set_column(i, field.with_type(column.type), column)
+    return table
+
+
+def normalize_arrow_batch(batch: pa.RecordBatch) -> pa.RecordBatch:
+    """Convert the columns of a batch as `normalize_arrow_table`"""
+    arrays = [
+        column if (normalized := _normalize_column(column)) is None else normalized
+        for column in batch.columns
+    ]
+    return pa.RecordBatch.from_arrays(arrays, names=batch.schema.names)
+
+
+def _normalize_column(
+    column: pa.Array | pa.ChunkedArray,
+) -> pa.Array | pa.ChunkedArray | None:
+    if pa.types.is_duration(column.type):
+        # formatted as pandas timedeltas, as `process_df`
+        ser = _timedelta_to_str(column.to_pandas())
+        return pa.array(ser, type=pa.large_string(), from_pandas=True)
+    t = _normalize_type(column.type)
+    return None if t is None else column.cast(t)
+
+
+def _normalize_type(t: pa.DataType) -> pa.DataType | None:
+    """The type with any view types, including those nested in dictionaries, lists & structs,
+    as their large equivalent, e.g. polars categoricals are exported as `dictionary<values=string_view>`,
+    or None if there are none"""
+    if pa.types.is_string_view(t):
+        return pa.large_string()
+    if pa.types.is_binary_view(t):
+        return pa.large_binary()
+    if pa.types.is_dictionary(t):
+        values = _normalize_type(t.value_type)
+        return (
+            None if values is None else pa.dictionary(t.index_type, values, t.ordered)
+        )
+    if pa.types.is_map(t):
+        key, item = _normalize_field(t.key_field), _normalize_field(t.item_field)
+        if key is None and item is None:
+            return None
+        return pa.map_(key or t.key_field, item or t.item_field, t.keys_sorted)
+    if pa.types.is_list(t) or pa.types.is_large_list(t):
+        value = _normalize_field(t.value_field)
+        make_list = pa.list_ if pa.types.is_list(t) else pa.large_list
+        return None if value is None else make_list(value)
+    if pa.types.is_fixed_size_list(t):
+        value = _normalize_field(t.value_field)
+        return None if value is None else pa.list_(value, t.list_size)
+    if pa.types.is_struct(t):
+        fields = [_normalize_field(f) for f in t]
+        if all(f is None for f in fields):
+            return None
+        return pa.struct([f or t.field(i) for i, f in enumerate(fields)])
+    return None
+
+
+def _normalize_field(field: pa.Field) -> pa.Field | None:
+    t = _normalize_type(field.type)
+    return None if t is None else field.with_type(t)
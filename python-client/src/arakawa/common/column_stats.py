@@ -0,0 +1,194 @@
+"""
+Per-column statistics of DataTables - null counts, distinct counts, min & max, the most common
+values and histograms - computed with vectorized Arrow and NumPy operations when the report is saved,
+so the browser can summarise columns without scanning the full table.
+
+Columns are converted and summarised one at a time, so only a single column is held in memory at once.
+"""
+
+from __future__ import annotations
+
+import dataclasses as dc
+import json
+import math
+from collections.abc import Iterator
+from typing import Any
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from multimethod import multimethod
+
+from .arrow_processor import _get_columns, normalize_arrow_table, to_arrow_array
+from .dataset_scan import DatasetScan
+
+# the number of most common values kept for non-numeric columns
+TOP_K = 10
+HISTOGRAM_BINS = 20
+# the number of smallest hashes kept to estimate distinct counts, giving a relative error of about 1/sqrt(k)
+DISTINCT_SKETCH_SIZE = 4096
+# longer strings are truncated, to keep the stats small
+MAX_VALUE_LENGTH = 100
+
+
+@dc.dataclass(frozen=True, eq=False)
+class ColumnStats:
+    """The statistics of a DataTable's data, computed when it's written, see `DataTableWriter`"""
+
+    data: pd.DataFrame | pa.Table | DatasetScan
+
+    def compute(self) -> list[dict[str, Any]]:
+        return [column_stats(name, column) for name, column in iter_columns(self.data)]
+
+    def to_json(self) -> str:
+        return json.dumps(self.compute(), separators=(",", ":"), default=str)
+
+
+@multimethod
+def iter_columns(df: pd.DataFrame) -> Iterator[tuple[str, pa.ChunkedArray]]:
+    """The columns of a DataTable's data, with the types they're written as"""
+    for name, ser in _get_columns(df).items():
+        yield name, pa.chunked_array([to_arrow_array(ser)])
+
+
+@iter_columns.register  # type: ignore
+def _(df: pa.Table) -> Iterator[tuple[str, pa.ChunkedArray]]:
+    yield from zip(df.column_names, normalize_arrow_table(df).columns, strict=True)
+
+
+@iter_columns.register  # type: ignore
+def _(df: DatasetScan) -> Iterator[tuple[str, pa.ChunkedArray]]:
+    # NOTE - only the column is read from columnar formats, but CSV files are parsed per column
+    for field in df.schema:
+        scan = dc.replace(df, columns=[field.name])
+        chunks = [batch.column(0) for batch in scan.iter_batches()]
+        yield field.name, pa.chunked_array(chunks, type=field.type)
+
+
+def column_stats(name: str, column: pa.ChunkedArray) -> dict[str, Any]:
+    t = column.type
+    stats: dict[str, Any] = {"name": name, "type": str(t), "nulls": column.null_count}
+
+    if pa.types.is_integer(t) or pa.types.is_floating(t) or _is_temporal(t):
+        values = [_numeric_values(chunk) for chunk in column.chunks]
+        values = [v for v in values if len(v)]
+        if pa.types.is_floating(t):
+            column = pc.filter(column, pc.is_finite(column))
+        min_max = pc.min_max(column)
+        stats.update(min=_py(min_max["min"]), max=_py(min_max["max"]))
+        if values:
+            stats["distinct"] = _distinct_estimate(values, column)
+            stats["histogram"] = _histogram(values, t)
+        return stats
+
+    try:
+        counts = pc.value_counts(column)
+    except pa.ArrowNotImplementedError:
+        # e.g. nested types
+        return stats
+    # nulls are counted as a value
+    counts = counts.filter(counts.field("values").is_valid())
+    n = counts.field("counts").to_numpy()
+    order = np.argsort(-n, kind="stable")[:TOP_K]
+    stats.update(
+        distinct=len(counts),
+        top=[[_py(counts.field("values")[i]), int(n[i])] for i in order],
+    )
+    return stats
+
+
+def _is_temporal(t: pa.DataType) -> bool:
+    return pa.types.is_timestamp(t) or pa.types.is_date(t)
+
+
+def _numeric_values(chunk: pa.Array) -> np.ndarray:
+    """The valid, finite, values of a chunk"""
+    values = chunk.drop_null().to_numpy(zero_copy_only=False)
+    if values.dtype.kind == "f":
+        return values[np.isfinite(values)]
+    return values
+
+
+def _hash(values: np.ndarray) -> np.ndarray:
+    """64-bit hashes of the values' bits, by the splitmix64 finalizer"""
+    match values.dtype.kind:
+        case "f":
+            # so -0.0 hashes as 0.0
+            x = (values.astype(np.float64) + 0.0).view(np.uint64)
+        case "u":
+            x = values.astype(np.uint64)
+        case _:
+            x = values.astype(np.int64, copy=False).view(np.uint64)
+    x = x ^ (x >> np.uint64(30))
+    x *= np.uint64(0xBF58476D1CE4E5B9)
+    x ^= x >> np.uint64(27)
+    x *= np.uint64(0x94D049BB133111EB)
+    x ^= x >> np.uint64(31)
+    return x
+
+
+def _distinct_estimate(values: list[np.ndarray], column: pa.ChunkedArray) -> int:
+    """
+    Estimate the number of distinct values from the k smallest distinct hashes (a KMV sketch),
+    which are spread over the hash range in proportion to the number of distinct values.
+    Columns with fewer distinct values than the sketch are counted exactly, and estimates are capped at the number of values
+    """
+    hashes = np.concatenate([_hash(v) for v in values])
+    k = DISTINCT_SKETCH_SIZE
+    # the m smallest hashes contain the k smallest distinct ones, unless there are many duplicates
+    m = k
+    while m < len(hashes):
+        smallest = np.unique(np.partition(hashes, m - 1)[:m])
+        if len(smallest) >= k:
+            estimate = round((k - 1) / (float(smallest[k - 1]) / 2.0**64))
+            return min(estimate, len(hashes))
+        m *= 4
+    return pc.count_distinct(column).as_py()
+
+
+def _histogram(values: list[np.ndarray], t: pa.DataType) -> dict[str, list]:
+    """Counts of fixed-width bins between the min and max, accumulated chunk by chunk"""
+    dtype = values[0].dtype
+    temporal = dtype.kind == "M"
+    if temporal:
+        values = [v.view("i8") for v in values]
+    lo = min(v.min() for v in values)
+    hi = max(v.max() for v in values)
+
+    if pa.types.is_date(t):
+        # bins of whole days, so no two edges fall on the same date
+        day = 86_400_000 if pa.types.is_date64(t) else 1
+        width = day * math.ceil((int(hi) - int(lo) + day) / day / HISTOGRAM_BINS)
+        n_bins = math.ceil((int(hi) - int(lo) + day) / width)
+        edges = int(lo) + width * np.arange(n_bins + 1)
+    elif dtype.kind in "iuM" and int(hi) - int(lo) < HISTOGRAM_BINS:
+        # a bin per value
+        edges = np.arange(int(lo), int(hi) + 2)
+    else:
+        edges = np.histogram_bin_edges([], HISTOGRAM_BINS, range=(lo, hi))
+    counts = np.zeros(len(edges) - 1, dtype=np.int64)
+    for v in values:
+        counts += np.histogram(v, edges)[0]
+
+    if temporal:
+        edges = _temporal_edges(edges.astype("i8").astype(dtype), t)
+        return {"edges": edges, "counts": counts.tolist()}
+    return {"edges": edges.tolist(), "counts": counts.tolist()}
+
+
+def _temporal_edges(edges: np.ndarray, t: pa.DataType) -> list[str]:
+    """The edges as ISO strings in the column's unit, and in its timezone as the min & max"""
+    if pa.types.is_timestamp(t) and t.tz is not None:
+        return [x.isoformat() for x in pa.array(edges, t).to_pylist()]
+    unit = "D" if pa.types.is_date(t) else t.unit
+    return np.datetime_as_string(edges, unit=unit).tolist()
+
+
+def _py(x: pa.Scalar) -> Any:
+    v = x.as_py()
+    if isinstance(v, float) and not math.isfinite(v):
+        return None
+    if isinstance(v, str) and len(v) > MAX_VALUE_LENGTH:
+        return v[:MAX_VALUE_LENGTH] + "…"
+    return v
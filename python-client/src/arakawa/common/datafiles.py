@@ -3,7 +3,9 @@
 from __future__ import annotations
 
 import abc
-from typing import IO
+from collections.abc import Iterable
+from io import IOBase
+from typing import IO, Literal
 
 import pandas as pd
 import pyarrow as pa
@@ -14,9 +16,30 @@ from pyarrow import RecordBatchFileWriter
 from arakawa import optional_libs as opt
 from arakawa.types import ARROW_EXT, ARROW_MIMETYPE, MIME
 
-from .df_processor import obj_to_str, process_df, str_to_arrow_str
-
-PathOrFile = str | IO | Base64IO
+from .arrow_processor import DFConverter, normalize_arrow_table
+from .dataset_scan import DatasetScan
+from .df_processor import CategoryEstimate, obj_to_str, str_to_arrow_str
+
+# NOTE - IO is only a typing protocol, IOBase matches concrete files, e.g. GzipFile
+# the codecs arrow files' buffers may be compressed with
+IPCCompression = Literal["lz4", "zstd"]
+PathOrFile = str | IO | IOBase | Base64IO
+
+# saved tables have no pandas metadata, so restore the nullable dtypes `process_df` converts to
+NULLABLE_DTYPES = {
+    pa.int8(): pd.Int8Dtype(),
+    pa.int16(): pd.Int16Dtype(),
+    pa.int32(): pd.Int32Dtype(),
+    pa.int64(): pd.Int64Dtype(),
+    pa.uint8(): pd.UInt8Dtype(),
+    pa.uint16(): pd.UInt16Dtype(),
+    pa.uint32(): pd.UInt32Dtype(),
+    pa.uint64(): pd.UInt64Dtype(),
+    pa.float32(): pd.Float32Dtype(),
+    pa.float64(): pd.Float64Dtype(),
+    pa.bool_(): pd.BooleanDtype(),
+    pa.large_string(): pd.StringDtype(),
+}
 
 
 def write_table(table: pa.Table, sink: PathOrFile):
@@ -26,6 +49,20 @@ def write_table(table: pa.Table, sink: PathOrFile):
     writer.close()
 
 
+def write_batches(
+    schema: pa.Schema,
+    batches: Iterable[pa.RecordBatch],
+    sink: PathOrFile,
+    compression: IPCCompression | None = None,
+):
+    """Write record batches to an arrow file as they're produced, so only one is held in memory,
+    with their buffers compressed if `compression` is set"""
+    options = pa.ipc.IpcWriteOptions(compression=compression)
+    with RecordBatchFileWriter(sink, schema, options=options) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+
+
 class DFFormatter(abc.ABC):
     # TODO - tie to mimetypes lib
     content_type: MIME
@@ -53,24 +90,54 @@ class ArrowFormat(DFFormatter):
 
     @staticmethod
     def load_file(fn: PathOrFile) -> pd.DataFrame:
-        df = pa.ipc.open_file(fn).read_pandas()
+        df = pa.ipc.open_file(fn).read_pandas(types_mapper=NULLABLE_DTYPES.get)
         # NOTE - need to convert categories from object to string https://github.com/apache/arrow/issues/33070
         obj_to_str(df)
         str_to_arrow_str(df)
         return df
 
+    # NOTE - all take the keyword args `compression`, the codec to compress the batches' buffers with,
+    # and `batch_size`, the max rows per batch (default: as chosen for the type of data)
     @multimethod
-    def save_file(fn: PathOrFile, df: pd.DataFrame):  # type: ignore # noqa: N805
-        df = process_df(df)
-        # NOTE - can pass expected schema and columns for output df here
-        table: pa.Table = pa.Table.from_pandas(df, preserve_index=False)
-        write_table(table, fn)
+    def save_file(  # type: ignore
+        fn: PathOrFile,  # noqa: N805
+        df: pd.DataFrame,
+        category_estimate: CategoryEstimate = "exact",
+        compression: IPCCompression | None = None,
+        batch_size: int | None = None,
+    ):
+        # converts as process_df, building each column directly, a batch of rows at a time
+        converter = DFConverter(df, batch_size, category_estimate)
+        write_batches(converter.schema, converter.iter_batches(), fn, compression)
 
     if opt.HAVE_POLARS:
 
         @save_file.register  # type: ignore
-        def _(fn: PathOrFile, df: opt.PlDataFrame):  # type: ignore # noqa: N805
-            table: pa.Table = df.to_arrow()
-            write_table(table, fn)
+        def _(fn: PathOrFile, df: opt.PlDataFrame, **kwargs):  # type: ignore # noqa: N805
+            ArrowFormat.save_file(fn, df.to_arrow(), **kwargs)
+
+    @save_file.register  # type: ignore
+    def _(
+        fn: PathOrFile,  # noqa: N805
+        df: pa.Table,
+        compression: IPCCompression | None = None,
+        batch_size: int | None = None,
+        **_,
+    ):
+        # written as is, batch by batch, other than the types arrow.js can't read
+        table = normalize_arrow_table(df)
+        batches = table.to_batches(max_chunksize=batch_size)
+        write_batches(table.schema, batches, fn, compression)
+
+    @save_file.register  # type: ignore
+    def _(
+        fn: PathOrFile,  # noqa: N805
+        df: DatasetScan,
+        compression: IPCCompression | None = None,
+        batch_size: int | None = None,
+        **_,
+    ):
+        # streamed from the files, batch by batch
+        write_batches(df.schema, df.iter_batches(batch_size), fn, compression)
 
     save_file = staticmethod(save_file)  # type: ignore
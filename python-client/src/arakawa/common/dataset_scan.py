@@ -0,0 +1,107 @@
+"""
+Lazy scans of Parquet, CSV and Arrow files for DataTables, which are streamed into the
+asset batch by batch rather than loaded into memory
+"""
+
+from __future__ import annotations
+
+import dataclasses as dc
+from collections.abc import Iterator
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from arakawa.exceptions import ARError
+from arakawa.types import NPath
+
+from .arrow_processor import normalize_arrow_batch, normalize_arrow_table
+
+# file formats, by extension, as named by `pyarrow.dataset`
+DATASET_FORMATS = {
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".csv": "csv",
+    ".arrow": "ipc",
+    ".feather": "ipc",
+    ".ipc": "ipc",
+}
+
+
+def guess_format(path: Path) -> str:
+    if path.is_dir():
+        # a directory of (e.g. partitioned) files, of the first file's format
+        path = next((p for p in sorted(path.rglob("*")) if p.is_file()), path)
+    try:
+        return DATASET_FORMATS[path.suffix.lower()]
+    except KeyError:
+        raise ARError(
+            f"Can't tell the format of {path}, please pass one of {sorted(set(DATASET_FORMATS.values()))}"
+        ) from None
+
+
+@dc.dataclass(frozen=True)
+class DatasetScan:
+    """
+    A projection, filter and row limit over a file (or directory of files), applied as it's scanned.
+    NOTE - the files are read when the scan is written, so must exist until then
+    """
+
+    path: Path
+    format: str
+    columns: list[str] | None = None
+    filter: pc.Expression | None = None
+    limit: int | None = None
+
+    @classmethod
+    def open(
+        cls,
+        path: NPath,
+        format: str | None = None,
+        columns: list[str] | None = None,
+        filter: pc.Expression | None = None,
+        limit: int | None = None,
+    ) -> DatasetScan:
+        path = Path(path).expanduser()
+        if not path.exists():
+            raise ARError(f"File {path} not found")
+        scan = cls(path, format or guess_format(path), columns, filter, limit)
+        # check the projection and filter up front, rather than when writing the report
+        try:
+            scan.scanner()
+        except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+            raise ARError(f"Invalid scan of {path}: {e}") from e
+        return scan
+
+    @property
+    def dataset(self) -> ds.Dataset:
+        return ds.dataset(self.path, format=self.format)
+
+    def scanner(self, batch_size: int | None = None) -> ds.Scanner:
+        kwargs = {} if batch_size is None else {"batch_size": batch_size}
+        return self.dataset.scanner(columns=self.columns, filter=self.filter, **kwargs)
+
+    @property
+    def schema(self) -> pa.Schema:
+        """The schema of the written batches"""
+        return normalize_arrow_table(
+            self.scanner().projected_schema.empty_table()
+        ).schema
+
+    def count_rows(self) -> int:
+        """The number of rows scanned, from the file metadata where possible (e.g. Parquet without a filter)"""
+        rows = self.scanner().count_rows()
+        return rows if self.limit is None else min(rows, self.limit)
+
+    def iter_batches(self, batch_size: int | None = None) -> Iterator[pa.RecordBatch]:
+        """The normalized batches, of at most `batch_size` rows if set"""
+        remaining = self.limit
+        for batch in self.scanner(batch_size).to_batches():
+            if remaining is not None:
+                if remaining <= 0:
+                    break
+                batch = batch.slice(0, remaining)
+                remaining -= batch.num_rows
+            if batch.num_rows:
+                yield normalize_arrow_batch(batch)
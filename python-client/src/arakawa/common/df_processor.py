@@ -1,11 +1,52 @@
 import datetime
 from numbers import Number
-from typing import Any
+from typing import Any, Literal, get_args
 
 import numpy as np
 import pandas as pd
+from packaging import version as v
 
 import arakawa.optional_libs as opt
+from arakawa import settings
+from arakawa.exceptions import ARError
+
+# how the number of unique values of a column is found when deciding whether to store it as categories,
+# either counted exactly, or estimated from a sample and only counted for the likely columns
+CategoryEstimate = Literal["exact", "sample"]
+# max number of categories, and criteria, for columns to be converted to categories
+MAX_FEW_CATEGORIES = 20
+MAX_PROP_CATEGORIES = 0.05
+# rows sampled to estimate a column's cardinality, and the max proportion of unique values
+# in the sample for it to be considered categorical, see `likely_categorical`
+CATEGORY_SAMPLE_SIZE = 4096
+MAX_SAMPLE_PROP_UNIQUE = 0.5
+
+PANDAS_V3 = v.Version(pd.__version__).major >= 3
+
+
+def get_category_estimate(
+    category_estimate: CategoryEstimate | None = None,
+) -> CategoryEstimate:
+    """The given category estimate, or `settings.AR_CATEGORY_ESTIMATE`, checking it's valid"""
+    category_estimate = category_estimate or settings.AR_CATEGORY_ESTIMATE  # type: ignore
+    if category_estimate not in get_args(CategoryEstimate):
+        raise ARError(
+            f"Unknown category estimate {category_estimate}, must be one of 'exact' or 'sample'"
+        )
+    return category_estimate  # type: ignore
+
+
+def copy_on_write() -> bool:
+    """Whether pandas copies data lazily, only once it's modified - always from pandas 3, otherwise if enabled"""
+    return PANDAS_V3 or pd.options.mode.copy_on_write is True
+
+
+def copy_df(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Copy a frame so changes to either copy don't affect the other, lazily under copy-on-write,
+    where only the columns that are later modified are copied, otherwise deeply
+    """
+    return df.copy(deep=not copy_on_write())
 
 
 def convert_axis(df: pd.DataFrame):
@@ -54,21 +95,42 @@ def timedelta_to_str(df: pd.DataFrame):
     df[df_td.columns] = np.where(pd.isnull(df_td), pd.NA, df_td.astype("string"))
 
 
-def parse_categories(data: pd.DataFrame):
-    """Detect and converts categories"""
+def is_categorical(nunique: int, size: int) -> bool:
+    """Decides whether a column with `nunique` values of `size` should be categorical"""
+    if nunique <= MAX_FEW_CATEGORIES and (nunique != size):
+        # few unique values => make it a category regardless of the proportion
+        return True
 
-    def criteria(ser: pd.Series) -> bool:
-        """Decides whether to convert into categorical"""
-        nunique: int = ser.nunique()
+    prop_unique = (nunique + 1) / (size + 1)  # + 1 for nan
+
+    # a lot of redundant information => categories are more compact
+    return prop_unique <= MAX_PROP_CATEGORIES
+
+
+def likely_categorical(ser: pd.Series) -> bool:
+    """
+    Estimates from a random sample of the column whether it may be categorical,
+    so the unique values only need to be counted for the columns that may be
+    NOTE - columns with many values that each repeat a few times may not be detected,
+    as a small sample of them is still mostly unique
+    """
+    if len(ser) <= 4 * CATEGORY_SAMPLE_SIZE:
+        # counting smaller columns is cheap enough
+        return True
+    # NOTE - sampled with replacement, which only makes the sample look more categorical
+    idx = np.random.default_rng(0).integers(0, len(ser), CATEGORY_SAMPLE_SIZE)
+    sample = ser.iloc[np.sort(idx)]
+    return sample.nunique() <= MAX_SAMPLE_PROP_UNIQUE * CATEGORY_SAMPLE_SIZE
 
-        if nunique <= 20 and (nunique != ser.size):
-            # few unique values => make it a category regardless of the proportion
-            return True
 
-        prop_unique = (nunique + 1) / (ser.size + 1)  # + 1 for nan
+def parse_categories(data: pd.DataFrame, category_estimate: CategoryEstimate = "exact"):
+    """Detect and converts categories"""
 
-        # a lot of redundant information => categories are more compact
-        return prop_unique <= 0.05
+    def criteria(ser: pd.Series) -> bool:
+        """Decides whether to convert into categorical"""
+        if category_estimate == "sample" and not likely_categorical(ser):
+            return False
+        return is_categorical(ser.nunique(), ser.size)
 
     def try_to_category(ser: pd.Series) -> pd.Series:
         return ser.astype("category") if criteria(ser) else ser
@@ -101,16 +163,20 @@ def str_to_arrow_str(df: pd.DataFrame):
     df[df_str.columns] = df_str.astype("string[pyarrow]")
 
 
-def process_df(df: pd.DataFrame, copy: bool = False) -> pd.DataFrame:
+def process_df(
+    df: pd.DataFrame, copy: bool = False, category_estimate: CategoryEstimate = "exact"
+) -> pd.DataFrame:
     """
     Processing steps needed before writing / after reading
     We only modify the dataframe to optimise size,
     rather than convert/infer types, e.g. no longer parsing dates from strings
+    Categories are detected as `category_estimate`, see `parse_categories`
 
-    NOTE - this mutates the dataframe by default but returns it - use the returned copy!
+    NOTE - without copy-on-write, this mutates the dataframe by default but returns it - use the returned copy!
+    With copy-on-write the dataframe is never modified, and only the converted columns are copied
     """
-    if copy:
-        df = df.copy(deep=True)
+    if copy or copy_on_write():
+        df = copy_df(df)
 
     convert_axis(df)
 
@@ -125,7 +191,7 @@ def process_df(df: pd.DataFrame, copy: bool = False) -> pd.DataFrame:
     # td_col = df.select_dtypes("timedelta")
     # df[td_col.columns] = td_col
     obj_to_str(df)
-    parse_categories(df)
+    parse_categories(df, category_estimate)
 
     # convert all strings to use the arrow dtype
     str_to_arrow_str(df)
@@ -145,7 +211,7 @@ def to_df(value: Any) -> pd.DataFrame:
         return pd.DataFrame()
 
     if isinstance(value, pd.DataFrame):
-        return value.copy(deep=True)
+        return copy_df(value)
 
     if isinstance(value, pd.Series | pd.Index):
         if value.name is not None:
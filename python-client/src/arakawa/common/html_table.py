@@ -0,0 +1,176 @@
+"""
+Fast rendering of DataFrames as HTML tables for Table blocks
+
+Renders the same markup as `DataFrame.to_html`, but formats each column at once as an Arrow string array,
+escaping and wrapping the values in cells with vectorized compute functions, then joins the rows in a single pass.
+Values are formatted as Arrow casts them to strings, so may differ from pandas' formatting, e.g. floats are
+rounded to `FLOAT_DIGITS` decimal places rather than padded to the same precision.
+
+Frames with hierarchical rows or columns, which need spanning headers, are rendered by pandas.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Literal, get_args
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from multimethod import multimethod
+
+from arakawa import optional_libs as opt
+from arakawa import settings
+from arakawa.exceptions import ARError
+
+from .arrow_processor import _timedelta_to_str
+
+# `DataFrame.to_html`, or the vectorized `to_html_table`
+TableRenderer = Literal["pandas", "fast"]
+
+FLOAT_DIGITS = 6
+
+# as pandas, see `DataFrame.to_html`
+TABLE_START = '<table border="1" class="dataframe">\n'
+HEADER_ROW_START = '<tr style="text-align: right;">'
+
+
+def get_table_renderer(renderer: TableRenderer | None = None) -> TableRenderer:
+    """The given renderer, or `settings.AR_TABLE_RENDERER`, checking it's valid"""
+    renderer = renderer or settings.AR_TABLE_RENDERER  # type: ignore
+    if renderer not in get_args(TableRenderer):
+        raise ARError(
+            f"Unknown table renderer {renderer}, must be one of 'pandas' or 'fast'"
+        )
+    return renderer  # type: ignore
+
+
+@multimethod
+def to_html_table(df: pd.DataFrame) -> str:
+    """Render the frame as a HTML table, including its index as row headers"""
+    if df.columns.nlevels > 1 or df.index.nlevels > 1:
+        return df.to_html()
+
+    index_name = df.index.name
+    header = [
+        HEADER_ROW_START,
+        "<th></th>",
+        *(f"<th>{_escape_str(c)}</th>" for c in df.columns),
+        "</tr>\n",
+    ]
+    if index_name is not None:
+        header += [
+            f"<tr><th>{_escape_str(index_name)}</th>",
+            "<th></th>" * df.shape[1],
+            "</tr>\n",
+        ]
+
+    columns = [_format_column(_to_arrow(df.index.to_series()), "th")]
+    columns += [
+        _format_column(_to_arrow(df.iloc[:, i]), "td") for i in range(df.shape[1])
+    ]
+    return _assemble(header, columns, len(df))
+
+
+if opt.HAVE_POLARS:
+
+    @to_html_table.register  # type: ignore
+    def _(df: opt.PlDataFrame) -> str:
+        # polars frames have no index, so are rendered from their Arrow columns without row headers
+        header = [
+            HEADER_ROW_START,
+            *(f"<th>{_escape_str(c)}</th>" for c in df.columns),
+            "</tr>\n",
+        ]
+        table = df.to_arrow()
+        columns = [_format_column(c.combine_chunks(), "td") for c in table.columns]
+        return _assemble(header, columns, df.height)
+
+
+def _assemble(header: list[str], columns: list[pa.Array], n_rows: int) -> str:
+    if columns:
+        rows = pc.binary_join_element_wise("<tr>", *columns, "</tr>\n", "")
+        body = "".join(rows.to_pylist())
+    else:
+        body = "<tr></tr>\n" * n_rows
+    return "".join(
+        [
+            TABLE_START,
+            "<thead>\n",
+            *header,
+            "</thead>\n<tbody>\n",
+            body,
+            "</tbody>\n</table>",
+        ]
+    )
+
+
+def _to_arrow(ser: pd.Series) -> pa.Array:
+    try:
+        return pa.array(ser, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        # e.g. objects of mixed types, formatted individually
+        return pa.array(ser.map(str, na_action="ignore"), type=pa.string())
+
+
+def _format_column(arr: pa.Array, tag: str) -> pa.Array:
+    """Format the values as escaped strings, each wrapped in a cell"""
+    text = _to_str(arr)
+    return pc.binary_join_element_wise(f"<{tag}>", text, f"</{tag}>", "")
+
+
+def _to_str(arr: pa.Array) -> pa.Array:
+    t = arr.type
+    null_text = "NaN"
+    if pa.types.is_dictionary(t):
+        arr = arr.dictionary_decode()
+        t = arr.type
+
+    if pa.types.is_boolean(t):
+        # as Python, rather than Arrow's lower case
+        text = pc.if_else(arr, "True", "False")
+    elif pa.types.is_floating(t):
+        text = pc.cast(pc.round(arr, FLOAT_DIGITS), pa.string())
+    elif pa.types.is_timestamp(t):
+        null_text = "NaT"
+        text = pc.cast(_truncate_timestamps(arr), pa.string())
+    elif pa.types.is_duration(t):
+        null_text = "NaT"
+        text = pa.array(
+            _timedelta_to_str(arr.to_pandas()), pa.string(), from_pandas=True
+        )
+    elif pa.types.is_integer(t) or pa.types.is_date(t):
+        text = pc.cast(arr, pa.string())
+    else:
+        # only strings, or other types, may have characters to escape
+        try:
+            text = pc.cast(arr, pa.string())
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            text = pa.array([None if v is None else str(v) for v in arr.to_pylist()])
+        text = _escape(text)
+    return pc.fill_null(text, null_text)
+
+
+def _truncate_timestamps(arr: pa.Array) -> pa.Array:
+    """Drop the times of timestamps that are all at midnight, and any zero fractions of seconds, as pandas"""
+    if (
+        arr.type.tz is None
+        and pc.all(pc.equal(pc.floor_temporal(arr, unit="day"), arr)).as_py()
+        is not False
+    ):
+        return pc.cast(arr, pa.date32())
+    if arr.type.unit != "s":
+        seconds = pc.cast(arr, pa.timestamp("s", arr.type.tz), safe=False)
+        if pc.all(pc.equal(seconds, arr)).as_py() is not False:
+            return seconds
+    return arr
+
+
+def _escape(text: pa.Array) -> pa.Array:
+    # & first, so the other entities aren't escaped again
+    for char, entity in (("&", "&amp;"), ("<", "&lt;"), (">", "&gt;")):
+        text = pc.replace_substring(text, char, entity)
+    return text
+
+
+def _escape_str(x: Any) -> str:
+    return str(x).replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
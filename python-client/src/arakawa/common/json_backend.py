@@ -0,0 +1,130 @@
+"""
+JSON encoding of the app data embedded in reports, and of the plots written as assets,
+using orjson if installed (see `settings.AR_JSON_BACKEND`), else the stdlib `json`.
+
+Both backends produce the same compact JSON, with non-ASCII characters encoded as UTF-8 rather than escaped,
+NaN and infinite floats as `null`, and dates & times (and numpy values) converted by `_default`,
+so a report's contents don't depend on whether orjson is installed.
+Objects orjson can't encode (e.g. integers over 64 bits, or unsupported types) are encoded by the stdlib instead.
+"""
+
+from __future__ import annotations
+
+import datetime
+import json
+import math
+from functools import partial
+from typing import IO, Any, Literal
+
+import numpy as np
+from markupsafe import Markup
+
+from arakawa import optional_libs as opt
+from arakawa import settings
+from arakawa.exceptions import ARError
+
+JSONBackend = Literal["auto", "orjson", "json"]
+
+# as escaped by `jinja2.utils.htmlsafe_json_dumps`, so the JSON can be embedded in HTML and <script> tags
+HTML_UNSAFE = (
+    (b"<", b"\\u003c"),
+    (b">", b"\\u003e"),
+    (b"&", b"\\u0026"),
+    (b"'", b"\\u0027"),
+)
+
+
+def use_orjson(backend: str | None = None) -> bool:
+    """Whether to encode with orjson, for the given backend or `settings.AR_JSON_BACKEND`"""
+    backend = backend or settings.AR_JSON_BACKEND
+    if backend == "auto":
+        return opt.HAVE_ORJSON
+    if backend == "orjson":
+        if not opt.HAVE_ORJSON:
+            raise ARError(
+                "orjson is not installed, please install it or use the json backend"
+            )
+        return True
+    if backend == "json":
+        return False
+    raise ARError(
+        f"Unknown JSON backend {backend}, must be one of 'auto', 'orjson' or 'json'"
+    )
+
+
+def _finite(x: Any, parents: frozenset[int] = frozenset()) -> Any:
+    """Replace the NaN and infinite floats within the object with None, as encoded by orjson"""
+    if isinstance(x, float):
+        return x if math.isfinite(x) else None
+    if isinstance(x, dict | list | tuple):
+        # as the stdlib encoder, which may hit a non-finite float before the cycle
+        if id(x) in parents:
+            raise ValueError("Circular reference detected")
+        parents = parents | {id(x)}
+        if isinstance(x, dict):
+            return {k: _finite(v, parents) for k, v in x.items()}
+        return [_finite(v, parents) for v in x]
+    return x
+
+
+def _default(x: Any) -> Any:
+    """Convert the objects the stdlib can't encode, as orjson does"""
+    if isinstance(x, datetime.date | datetime.time):
+        return x.isoformat()
+    if isinstance(x, np.ndarray | np.generic):
+        return _finite(x.tolist())
+    raise TypeError(f"Object of type {type(x).__name__} is not JSON serializable")
+
+
+def _stdlib_dumps(obj: Any) -> bytes:
+    dumps = partial(
+        json.dumps,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        allow_nan=False,
+        default=_default,
+    )
+    try:
+        return dumps(obj).encode()
+    except ValueError as e:
+        # only walk the object when it has non-finite floats, not e.g. circular references
+        if not str(e).startswith("Out of range float values"):
+            raise
+        return dumps(_finite(obj)).encode()
+
+
+def dumps_bytes(obj: Any, backend: JSONBackend | None = None) -> bytes:
+    """Encode the object as UTF-8 JSON"""
+    if use_orjson(backend):
+        import orjson
+
+        try:
+            return orjson.dumps(
+                obj,
+                default=_default,
+                # dates & times are converted by `_default` as with the stdlib, e.g. pandas timestamps
+                option=orjson.OPT_NON_STR_KEYS
+                | orjson.OPT_SERIALIZE_NUMPY
+                | orjson.OPT_PASSTHROUGH_DATETIME,
+            )
+        except orjson.JSONEncodeError:
+            pass
+    return _stdlib_dumps(obj)
+
+
+def dump(obj: Any, f: IO[bytes], backend: JSONBackend | None = None) -> None:
+    """Write the object as UTF-8 JSON to the binary file"""
+    f.write(dumps_bytes(obj, backend))
+
+
+def escape_html(data: bytes) -> bytes:
+    """Escape the characters of the JSON that are unsafe in HTML as unicode escapes, one pass per character present"""
+    for char, escaped in HTML_UNSAFE:
+        if char in data:
+            data = data.replace(char, escaped)
+    return data
+
+
+def htmlsafe_dumps(obj: Any, backend: JSONBackend | None = None) -> Markup:
+    """Encode the object as JSON that's safe to render in HTML documents, as `jinja2.utils.htmlsafe_json_dumps`"""
+    return Markup(escape_html(dumps_bytes(obj, backend)).decode())
@@ -1,18 +1,22 @@
 from __future__ import annotations
 
 import abc
+import binascii
 import datetime
 import gzip
 import hashlib
 import io
+import json
+import mmap
+import os
 import sys
 import tempfile
+from collections.abc import Iterator
+from contextlib import suppress
 from pathlib import Path
-from shutil import copyfileobj
+from shutil import copyfile, copyfileobj
 from typing import IO, BinaryIO
 
-import base64io
-
 if sys.version_info <= (3, 11):
     from typing_extensions import Self
 else:
@@ -20,19 +24,146 @@ else:
 
 
 from arakawa.common import guess_type
+from arakawa.profiling import traced
+from arakawa.utils import log
 
 SERVED_REPORT_ASSETS_DIR = "assets"
+# index of the reusable asset files within an assets dir, see `FileStore.get_stored`
+MANIFEST_NAME = ".ar-manifest.json"
+# prefix of asset files still being written, so never referenced by a report
+TMP_PREFIX = ".ar-tmp-"
 GZIP_MTIME = datetime.datetime(year=2000, month=1, day=1).timestamp()
+# size of the chunks an entry's src is streamed in
+SRC_CHUNK_SIZE = 1024 * 1024
+# raw bytes encoded per binascii call, a multiple of 3 so the encoded blocks concatenate without padding
+B64_BLOCK_SIZE = 3 * 256 * 1024
+# mimes of assets the web components fetch & parse (rather than use their src directly),
+# so can be stored compressed and decoded in the browser via `DecompressionStream`
+COMPRESSIBLE_MIMES = frozenset(
+    {
+        "application/vnd.apache.arrow+binary",
+        "application/vnd.vegalite.v5+json",
+        "application/vnd.plotly.v1+json",
+        "application/vnd.bokeh.show+json",
+        "application/vnd.folium+html",
+        "application/vnd.arakawa.table+html",
+    }
+)
+# Linux ioctl to share the extents of another file (copy-on-write), see ioctl_ficlone(2)
+FICLONE = 0x40049409
+
+
+def hash_file(path: Path) -> tuple[str, int]:
+    """Calculate the sha256 hexdigest and size of a file via a memory-map,
+    so the contents are never read into Python memory"""
+    file_hash = hashlib.sha256()
+    with path.open("rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        # can't mmap an empty file
+        if size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                file_hash.update(mm)
+    return file_hash.hexdigest(), size
+
+
+def _reflink(src: Path, dest: Path) -> None:
+    import fcntl  # not available on Windows
+
+    with src.open("rb") as src_obj, dest.open("xb") as dest_obj:
+        try:
+            fcntl.ioctl(dest_obj.fileno(), FICLONE, src_obj.fileno())
+        except OSError:
+            dest.unlink()
+            raise
+
+
+def _symlink(src: Path, dest: Path) -> None:
+    dest.symlink_to(src.resolve())
+
+
+def link_file(src: Path, dest: Path) -> None:
+    """Make src available at dest without copying it where possible,
+    trying a reflink, hard-link and symlink in turn before falling back to a copy"""
+    for link in (_reflink, os.link, _symlink):
+        with suppress(OSError, ImportError):
+            link(src, dest)
+            return
+    copyfile(src, dest)
+
+
+class HashingWriter(io.RawIOBase):
+    """Write-through stream that hashes and counts all bytes written to the wrapped file,
+    so an entry's digest & size are known without re-reading its contents
+    """
+
+    def __init__(self, wrapped: IO[bytes]):
+        super().__init__()
+        self.wrapped = wrapped
+        self.size = 0
+        self._hash = hashlib.sha256()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        with memoryview(b) as view:
+            self.wrapped.write(view)
+            self._hash.update(view)
+            self.size += view.nbytes
+            return view.nbytes
+
+    def flush(self) -> None:
+        self.wrapped.flush()
+
+    def close(self) -> None:
+        # don't close the underlying file, only this layer
+        if not self.closed:
+            self.flush()
+        super().close()
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+
+class CountingWriter(io.RawIOBase):
+    """Write-through stream that counts the bytes written to the wrapped file"""
+
+    def __init__(self, wrapped: IO[bytes]):
+        super().__init__()
+        self.wrapped = wrapped
+        self.size = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        n = self.wrapped.write(b)
+        self.size += n
+        return n
+
+    def flush(self) -> None:
+        self.wrapped.flush()
 
 
 class FileEntry:
     file: IO
     _ext: str
     _dir_path: Path | None
+    # whether the store may link existing files into the entry's dir rather than copy them in
+    linkable: bool = False
+    # whether entries are kept in the assets dir across builds, so later builds can reuse them
+    persistent: bool = False
+    # the content-encoding of the stored contents, if any
+    encoding: str | None = None
+    # key of the data the entry was written from, if it can be reused, see `asset_key`
+    key: str | None = None
+    # whether written contents are discarded, so assets needn't be written at all
+    discards: bool = False
 
     # post-freeze
     frozen: bool = False
     mime: str
+    # full sha256 hexdigest of the stored contents, used as the key within the FileStore
     hash: str
     size: int
     wrapped: BinaryIO
@@ -53,18 +184,41 @@ class FileEntry:
     def src(self) -> str:
         pass
 
-    def as_dict(self) -> dict:
+    def discard(self) -> None:
+        """Release any resources held by a frozen entry that is superseded by an identical stored one"""
+
+    def iter_src(self, chunk_size: int = SRC_CHUNK_SIZE) -> Iterator[str]:  # noqa: ARG002
+        """Yield the src in chunks, so it can be streamed to an output without building it in memory"""
+        yield self.src
+
+    @property
+    def metadata(self) -> dict:
+        """Properties of the frozen entry, other than its src"""
         assert self.frozen
-        return {
-            "src": self.src,
+        metadata = {
             "hash": self.hash,
             "size": self.size,
             "mime": self.mime,
         }
+        if self.encoding:
+            metadata["encoding"] = self.encoding
+        return metadata
+
+    @property
+    def ref(self) -> str:
+        """Key of the frozen entry within the FileStore & the report's assets,
+        as identical contents served with another mime or encoding are a separate asset"""
+        assert self.frozen
+        return hashlib.sha256(
+            f"{self.hash}:{self.mime}:{self.encoding or ''}".encode()
+        ).hexdigest()
+
+    def as_dict(self) -> dict:
+        return {"src": self.src, **self.metadata}
 
     def __eq__(self, other: FileEntry) -> bool:
         if self.hash:
-            return self.hash == other.hash
+            return self.ref == other.ref
 
         raise NotImplementedError()
 
@@ -80,6 +234,8 @@ class NullWriter(io.BytesIO):
 class DummyFileEntry(FileEntry):
     """File entry that discards all data - for internal use"""
 
+    discards = True
+
     def __init__(self, *a, **kw):
         super().__init__(*a, **kw)
         self.file = NullWriter()
@@ -94,32 +250,92 @@ class DummyFileEntry(FileEntry):
 
 
 class B64FileEntry(FileEntry):
-    """Memory-based b64 file"""
+    """Memory-based b64 file
 
-    # requires b64io is bytes only and wraps to a bytes file only
-    file: base64io.Base64IO
+    The raw contents are buffered as written, and only encoded when the src is read,
+    in large blocks via binascii rather than by streaming through an encoder
+    """
+
+    file: IO[bytes]
     wrapped: io.BytesIO
-    contents: bytes
 
     def __init__(self, ext: str, mime: str | None = None, *a, **kw):
         super().__init__(ext, mime, *a, **kw)
         self.wrapped = io.BytesIO()
-        self.file = base64io.Base64IO(self.wrapped)
+        # raw contents are hashed as they're written
+        self._sink = HashingWriter(self.wrapped)
+        self.file = self._sink
 
+    @traced()
     def freeze(self) -> None:
         if not self.frozen:
             self.frozen = True
-            # get a reference to the buffer to splice later
             self.file.close()
-            self.file.flush()
-            self.contents = self.wrapped.getvalue()
-            # calc other properties
-            self.hash = hashlib.sha256(self.contents).hexdigest()[:10]
-            self.size = self.wrapped.tell()
+            self._sink.close()
+            self.hash = self._sink.hexdigest()
+            # size of the encoded contents within the src
+            self.size = 4 * -(-self._sink.size // 3)
+
+    def discard(self) -> None:
+        self.wrapped.close()
 
     @property
+    @traced()
     def src(self) -> str:
-        return f"data:{self.mime};base64,{self.contents.decode('ascii')}"
+        # encode into a single buffer, so the src is built with one final copy
+        buf = bytearray(f"data:{self.mime};base64,".encode())
+        with self.wrapped.getbuffer() as view:
+            for i in range(0, len(view), B64_BLOCK_SIZE):
+                buf += binascii.b2a_base64(view[i : i + B64_BLOCK_SIZE], newline=False)
+        return buf.decode("ascii")
+
+    def iter_src(self, chunk_size: int = SRC_CHUNK_SIZE) -> Iterator[str]:
+        yield f"data:{self.mime};base64,"
+        # encode whole 3-byte groups per chunk, so the chunks concatenate without padding
+        block_size = max(chunk_size // 4, 1) * 3
+        with self.wrapped.getbuffer() as view:
+            for i in range(0, len(view), block_size):
+                data = binascii.b2a_base64(view[i : i + block_size], newline=False)
+                yield data.decode("ascii")
+
+
+class GzipB64FileEntry(B64FileEntry):
+    """Memory-based b64 file, gzipped first if the web components decode it, see COMPRESSIBLE_MIMES"""
+
+    file: IO[bytes]
+    # size of the data written, before compression & encoding
+    raw_size: int
+
+    def __init__(self, ext: str, mime: str | None = None, *a, **kw):
+        super().__init__(ext, mime, *a, **kw)
+        target: IO[bytes] = self._sink
+        if self.mime in COMPRESSIBLE_MIMES:
+            self.encoding = "gzip"
+            # fixed name & mtime so the compressed output (and hash) only depends on the contents
+            target = gzip.GzipFile(
+                filename="", fileobj=target, mode="wb", mtime=GZIP_MTIME
+            )
+        self._gzip = target if self.encoding else None
+        self._counter = CountingWriter(target)
+        self.file = self._counter
+
+    @traced()
+    def freeze(self) -> None:
+        if not self.frozen:
+            self._counter.close()
+            if self._gzip:
+                self._gzip.close()
+            self.raw_size = self._counter.size
+            super().freeze()
+            log.debug(
+                f"Stored {self.mime} asset {self.hash[:8]} as {self.size} bytes, "
+                f"{self.saved_size} bytes smaller than its {self.raw_size} bytes of data"
+            )
+
+    @property
+    def saved_size(self) -> int:
+        """Number of bytes saved by compression, net of the b64 encoding overhead"""
+        return self.raw_size - self.size
 
 
 class GzipTmpFileEntry(FileEntry):
@@ -130,6 +346,7 @@ class GzipTmpFileEntry(FileEntry):
     # TODO - this could actually be an in-memory file...
     wrapped: tempfile._TemporaryFileWrapper
     has_output_dir: bool = False
+    linkable = True
 
     # Do we need DPTmpFile here, or just use namedtempfile??
     def __init__(self, ext: str, mime: str | None = None, dir_path: Path | None = None):
@@ -144,14 +361,12 @@ class GzipTmpFileEntry(FileEntry):
         else:
             self.wrapped = tempfile.NamedTemporaryFile("w+b", suffix=ext, prefix="ar-")  # noqa: SIM115
 
-        self.file = gzip.GzipFile(fileobj=self.wrapped, mode="w+b", mtime=GZIP_MTIME)
-
-    def calc_hash(self, f: IO) -> str:
-        f.seek(0)
-        file_hash = hashlib.sha256()
-        while chunk := f.read(8192):
-            file_hash.update(chunk)
-        return file_hash.hexdigest()[:10]
+        # compressed output is hashed as it's written
+        self._sink = HashingWriter(self.wrapped)
+        # fixed name & mtime so the compressed output (and hash) only depends on the contents
+        self.file = gzip.GzipFile(
+            filename="", fileobj=self._sink, mode="w+b", mtime=GZIP_MTIME
+        )
 
     @property
     def src(self) -> str:
@@ -159,61 +374,254 @@ class GzipTmpFileEntry(FileEntry):
             return f"/{SERVED_REPORT_ASSETS_DIR}/{Path(self.wrapped.name).name}"
         return "NYI"
 
+    @traced()
     def freeze(self) -> None:
         if not self.frozen:
             self.frozen = True
-            self.file.flush()
             self.file.close()
-            self.wrapped.flush()
+            self._sink.close()
             # size will be the compressed size...
-            self.size = self.wrapped.tell()
-            self.hash = self.calc_hash(self.wrapped)
+            self.size = self._sink.size
+            self.hash = self._sink.hexdigest()
+
+    def discard(self) -> None:
+        self.wrapped.close()
+        if self.has_output_dir:
+            # permanent files aren't removed on close
+            os.unlink(self.wrapped.name)
+
+
+def _asset_src(path: Path) -> str:
+    # relative, so the report can be served from any path
+    return f"{SERVED_REPORT_ASSETS_DIR}/{path.name}"
+
+
+class AssetFileEntry(FileEntry):
+    """File within a report's assets dir, named by the hash of its contents,
+    so unchanged assets keep their file across builds.
+    Gzipped if the web components decode it, see COMPRESSIBLE_MIMES"""
+
+    file: IO[bytes]
+    wrapped: BinaryIO
+    path: Path
+    linkable = True
+    persistent = True
+
+    def __init__(self, ext: str, mime: str | None = None, dir_path: Path | None = None):
+        assert dir_path, "Asset files require an output dir"
+        super().__init__(ext, mime, dir_path)
+        # written to a temp file, renamed once the hash is known
+        fd, tmp_name = tempfile.mkstemp(suffix=ext, prefix=TMP_PREFIX, dir=dir_path)
+        self.path = Path(tmp_name)
+        self.wrapped = os.fdopen(fd, "wb")
+        # stored output is hashed as it's written
+        self._sink = HashingWriter(self.wrapped)
+        self.file = self._sink
+
+        if self.mime in COMPRESSIBLE_MIMES:
+            self.encoding = "gzip"
+            # fixed name & mtime so the compressed output (and hash) only depends on the contents
+            self.file = gzip.GzipFile(
+                filename="", fileobj=self._sink, mode="wb", mtime=GZIP_MTIME
+            )
+
+    @property
+    def src(self) -> str:
+        return _asset_src(self.path)
+
+    @traced()
+    def freeze(self) -> None:
+        if not self.frozen:
+            self.frozen = True
+            self.file.close()
+            self._sink.close()
+            self.wrapped.close()
+            self.size = self._sink.size
+            self.hash = self._sink.hexdigest()
+
+            assert self._dir_path
+            path = self._dir_path / f"ar-{self.hash}{self._ext}"
+            if path.exists():
+                # unchanged since a previous build, or a duplicate within this one
+                self.path.unlink()
+            else:
+                os.replace(self.path, path)
+            self.path = path
+
+
+class StoredFileEntry(FileEntry):
+    """Asset file kept from a previous build, see `FileStore.get_stored`"""
+
+    path: Path
+
+    def __init__(self, path: Path, record: dict):
+        super().__init__(path.suffix, record["mime"], path.parent)
+        self.path = path
+        self.hash = record["hash"]
+        self.size = record["size"]
+        self.encoding = record.get("encoding")
+        self.frozen = True
+
+    @property
+    def src(self) -> str:
+        return _asset_src(self.path)
+
+    def freeze(self) -> None:
+        pass
+
+
+class LinkedFileEntry(FileEntry):
+    """Existing file linked into the output dir (see `link_file`), rather than copied in"""
+
+    path: Path
+
+    def __init__(
+        self, source: Path, mime: str | None = None, dir_path: Path | None = None
+    ):
+        assert dir_path, "Linked files require an output dir"
+        super().__init__("".join(source.suffixes), mime, dir_path)
+        self.source = source
+
+    @property
+    def src(self) -> str:
+        return _asset_src(self.path)
+
+    def freeze(self) -> None:
+        if not self.frozen:
+            self.frozen = True
+            self.hash, self.size = hash_file(self.source)
+            assert self._dir_path
+            self.path = self._dir_path / f"ar-{self.hash}{self._ext}"
+            # already linked by an entry with the same contents
+            if not self.path.exists():
+                link_file(self.source, self.path)
 
 
 class FileStore:
-    # TODO - make this a CAS (index by object hash itself?)
+    """Content-addressable store of file entries, indexed by the digest of their contents along with their mime & encoding
+
+    Adding a file whose contents are already stored (with the same mime & encoding) returns the existing entry,
+    so identical assets are only kept (and embedded) once
+    """
+
     # NOTE - currently we pass dir_path via the FileStore, could move into the file themselves?
     def __init__(self, fw_klass: type[FileEntry], assets_dir: Path | None = None):
         super().__init__()
         self.fw_klass = fw_klass
-        self.files: list[FileEntry] = []
+        self.files: dict[str, FileEntry] = {}
         self.dir_path = assets_dir
+        # number of adds resolved to an already stored entry
+        self.dedup_hits: int = 0
+        # entries by the key of the data they were written from, saved as the manifest
+        self.keys: dict[str, FileEntry] = {}
+        # manifest records of the assets kept from the previous build
+        self._stored: dict[str, dict] = self._load_manifest() if self.persistent else {}
 
     def __add__(self, other: Self) -> Self:
         # TODO - ensure factory is the same for both
-        self.files.extend(other.files)
+        for fw in other.files.values():
+            self._insert(fw)
+        self.dedup_hits += other.dedup_hits
         return self
 
     @property
     def store_count(self) -> int:
         return len(self.files)
 
+    @property
+    def persistent(self) -> bool:
+        """Whether the stored assets are kept on disk across builds, so can be reused"""
+        return self.fw_klass.persistent and self.dir_path is not None
+
+    @property
+    def dry_run(self) -> bool:
+        """Whether stored contents are discarded, so building a view only needs to validate its assets"""
+        return self.fw_klass.discards
+
+    def reusable(self, fw: FileEntry) -> bool:
+        """Whether an entry from a previous build may be added to this store as is"""
+        return type(fw) == self.fw_klass and fw._dir_path == self.dir_path  # noqa: E721
+
     @property
     def file_list(self) -> list[BinaryIO]:
-        return [f.wrapped for f in self.files]
+        return [f.wrapped for f in self.files.values()]
 
     def get_file(self, ext: str, mime: str) -> FileEntry:
         return self.fw_klass(ext, mime, self.dir_path)
 
-    def add_file(self, fw: FileEntry) -> None:
+    def _insert(self, fw: FileEntry) -> FileEntry:
+        if (entry := self.files.get(fw.ref)) is not None:
+            self.dedup_hits += 1
+            return entry
+
+        self.files[fw.ref] = fw
+        return fw
+
+    def add_file(self, fw: FileEntry, shared: bool = False) -> FileEntry:
+        """Freeze and add a file to the store, returning the stored entry for its contents
+        NOTE - use the returned entry, the given one is discarded if its contents are already stored,
+        unless `shared`, i.e. it's also used outside this build, e.g. kept by a `RenderCache`
+        """
         fw.freeze()
-        self.files.append(fw)
+        entry = self._insert(fw)
+        if entry is not fw and not shared:
+            fw.discard()
+        if fw.key:
+            self.keys[fw.key] = entry
+        return entry
 
     def load_file(self, path: Path) -> FileEntry:
-        """load a file into the store (makes a copy)"""
-        # TODO - ideally lazily-link a path to the store (rather than copy it in)
+        """load a file into the store, linking it into the assets dir if supported (else makes a copy)"""
+        if self.dir_path and self.fw_klass.linkable:
+            return self.add_file(LinkedFileEntry(path, dir_path=self.dir_path))
+
         ext = "".join(path.suffixes)
         dest_obj = self.fw_klass(ext=ext, dir_path=self.dir_path)
         with path.open("rb") as src_obj:
             copyfileobj(src_obj, dest_obj.file)
-        self.add_file(dest_obj)
-        return dest_obj
+        return self.add_file(dest_obj)
 
     def as_dict(self) -> dict:
         """Build a json structure suitable for embedding in a html file, json-rpc response, etc."""
-        x: FileEntry  # noqa: F842
-        return {x.hash: x.as_dict() for x in self.files}
+        return {h: x.as_dict() for h, x in self.files.items()}
+
+    def get_entry(self, ref: str) -> FileEntry | None:
+        return self.files.get(ref)
 
-    def get_entry(self, hash: str) -> FileEntry | None:
-        # TODO - change self.files to a dict[hash, FileEntry]?
-        return next((f for f in self.files if f.hash == hash), None)
+    def get_stored(self, key: str) -> FileEntry | None:
+        """Get the entry written for the data's key by the previous build, if its file still exists
+        NOTE - this may be called concurrently, so mustn't modify the store
+        """
+        if (record := self._stored.get(key)) is None:
+            return None
+        assert self.dir_path
+        path = self.dir_path / record["name"]
+        if not path.is_file():
+            return None
+        fe = StoredFileEntry(path, record)
+        fe.key = key
+        return fe
+
+    def _load_manifest(self) -> dict[str, dict]:
+        assert self.dir_path
+        try:
+            return json.loads((self.dir_path / MANIFEST_NAME).read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def save_manifest(self) -> None:
+        """Record the keyed assets of this build, so the next build can reuse them"""
+        assert self.dir_path
+        records = {
+            key: {"name": Path(fe.src).name, **fe.metadata}
+            for key, fe in self.keys.items()
+        }
+        (self.dir_path / MANIFEST_NAME).write_text(json.dumps(records))
+
+    def collect_garbage(self) -> None:
+        """Remove the files in the assets dir left by previous builds that aren't stored"""
+        assert self.dir_path
+        names = {Path(fe.src).name for fe in self.files.values()}
+        for e in os.scandir(self.dir_path):
+            if e.name.startswith(("ar-", TMP_PREFIX)) and e.name not in names:
+                os.unlink(e.path)
@@ -95,6 +95,15 @@ except ImportError:
     HAVE_POLARS = False
     log.debug("No Polars Found")
 
+# orjson, used to encode JSON if installed, see `arakawa.common.json_backend`
+try:
+    import orjson  # noqa: F401
+
+    HAVE_ORJSON = True
+except ImportError:
+    HAVE_ORJSON = False
+    log.debug("No orjson Found")
+
 # NetworkX
 try:
     import networkx
@@ -6,11 +6,25 @@ API for processing Views, e.g. rendering it locally and publishing to a remote s
 
 from __future__ import annotations
 
-from arakawa.file_store import B64FileEntry
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, Literal
+
+from arakawa.exceptions import ARError
+from arakawa.file_store import (
+    SERVED_REPORT_ASSETS_DIR,
+    AssetFileEntry,
+    B64FileEntry,
+    GzipB64FileEntry,
+)
+from arakawa.utils import log
 from arakawa.view import Blocks, BlocksT
 
 from .processors import (
+    BaseExportHTML,
     ConvertPydantic,
+    ExportHTMLFileAssets,
     ExportHTMLInlineAssets,
     ExportHTMLStringInlineAssets,
     ExportHTMLStringInlineNonResizableAssets,
@@ -18,6 +32,21 @@ from .processors import (
 )
 from .types import Formatting, Pipeline, ViewState
 
+if TYPE_CHECKING:
+    from arakawa.asset_cache import AssetCache
+    from arakawa.profiling import BuildProfile
+    from arakawa.render_cache import RenderCache
+
+
+@contextmanager
+def _tracing(profile: BuildProfile | None) -> Iterator[None]:
+    """Stop the profile tracing memory once the build is done, even if it fails"""
+    try:
+        yield
+    finally:
+        if profile is not None:
+            profile.stop_tracing()
+
 
 ################################################################################
 def save_report(
@@ -28,36 +57,103 @@ def save_report(
     formatting: Formatting | None = None,
     cdn_base: str | None = None,
     standalone: bool = False,
-) -> None:
+    stream: bool = False,
+    cache: AssetCache | None = None,
+    max_workers: int | None = None,
+    compress: bool = False,
+    mode: Literal["file", "directory"] = "file",
+    profile: BuildProfile | None = None,
+    render_cache: RenderCache | None = None,
+) -> BuildProfile | None:
     """Save a report as an HTML file.
 
     Args:
         blocks: A `Blocks` object or a list of Blocks.
-        path: A file path to store the document.
+        path: A file path to store the document, or the directory to store it in with `mode="directory"`.
         open: Open in your browser after creating. Default to False.
         name: A name of a report. Optional. Uses path if not provided.
         formatting: Sets the basic app styling.
         cdn_base: Base URL of CDN. Defaults to None.
         standalone: Whether or not to inline assets in an HTML instead of loading via CDN or not. Defaults to False.
+        stream: Whether or not to stream the HTML and assets into the file rather than rendering it in memory first, reducing peak memory usage for large reports. Only supported with `mode="file"`. Defaults to False.
+        cache: An `AssetCache` to reuse the serialized assets of unchanged data across builds. Defaults to None.
+        max_workers: The number of threads (or processes, for matplotlib figures) to write assets concurrently with. Defaults to None, writing them serially.
+        compress: Whether or not to gzip the inlined assets that support it (e.g. DataTables and plots), which are decompressed in the browser. Only supported with `mode="file"`. Defaults to False.
+        mode: Either "file" to save a single HTML file with the assets inlined, or "directory" to save an `index.html` with the assets as separate files to be served over HTTP, so a rebuild only writes the changed ones. Defaults to "file".
+        profile: A `BuildProfile` to record the time & memory of each step of the build in, and the size of the output. Defaults to None.
+        render_cache: A `RenderCache` to reuse the rendering of the blocks that are unchanged since a previous build, e.g. when iterating on a report in a notebook. Defaults to None.
+
+    Returns:
+        The `profile`, if given.
     """
-    s = ViewState(blocks=Blocks.wrap_blocks(blocks), file_entry_klass=B64FileEntry)
-
-    _ = (
-        Pipeline(s)
-        .pipe(PreProcessView(is_finalized=True))
-        .pipe(ConvertPydantic())
-        .pipe(
-            ExportHTMLInlineAssets(
-                path=path,
-                open=open,
-                name=name or "Report",
-                formatting=formatting,
-                cdn_base=cdn_base,
-                standalone=standalone,
+    export: BaseExportHTML
+    if mode == "file":
+        s = ViewState(
+            blocks=Blocks.wrap_blocks(blocks),
+            file_entry_klass=GzipB64FileEntry if compress else B64FileEntry,
+            profile=profile,
+        )
+        export = ExportHTMLInlineAssets(
+            path=path,
+            open=open,
+            name=name or "Report",
+            formatting=formatting,
+            cdn_base=cdn_base,
+            standalone=standalone,
+            stream=stream,
+        )
+    elif mode == "directory":
+        if stream or compress:
+            raise ARError(
+                "stream and compress only apply to inlined assets, so aren't supported with mode='directory'"
             )
+        app_dir = Path(path)
+        assets_dir = app_dir / SERVED_REPORT_ASSETS_DIR
+        assets_dir.mkdir(parents=True, exist_ok=True)
+        s = ViewState(
+            blocks=Blocks.wrap_blocks(blocks),
+            file_entry_klass=AssetFileEntry,
+            dir_path=assets_dir,
+            profile=profile,
         )
-        .result
-    )
+        export = ExportHTMLFileAssets(
+            app_dir=app_dir,
+            open=open,
+            name=name or "Report",
+            formatting=formatting,
+            cdn_base=cdn_base,
+            standalone=standalone,
+        )
+    else:
+        raise ARError(f"Unknown mode {mode}, must be either 'file' or 'directory'")
+
+    with _tracing(profile):
+        _ = (
+            Pipeline(s)
+            .pipe(PreProcessView(is_finalized=True))
+            .pipe(
+                ConvertPydantic(
+                    cache=cache, max_workers=max_workers, render_cache=render_cache
+                )
+            )
+            .pipe(export)
+            .result
+        )
+
+    if compress and mode == "file":
+        saved = sum(fe.saved_size for fe in s.store.files.values())
+        log.info(f"Compressing assets saved {saved} bytes")
+
+    if profile is not None:
+        if mode == "file":
+            output_size = Path(path).stat().st_size
+        else:
+            # the index, and the assets it uses
+            output_size = (app_dir / "index.html").stat().st_size + sum(
+                fe.size for fe in s.store.files.values()
+            )
+        profile.finish(output_size)
+    return profile
 
 
 def stringify_report(
@@ -67,6 +163,8 @@ def stringify_report(
     cdn_base: str | None = None,
     resizable: bool = True,
     standalone: bool = False,
+    profile: BuildProfile | None = None,
+    render_cache: RenderCache | None = None,
 ) -> str:
     """Stringify a report as an HTML string.
 
@@ -77,8 +175,14 @@ def stringify_report(
         cdn_base: Base URL of CDN. Defaults to None.
         resizable: Wether or not to allow make an iframed report resizable or not. Defaults to True.
         standalone: Whether or not to inline assets in an HTML instead of loading via CDN or not. Defaults to False.
+        profile: A `BuildProfile` to record the time & memory of each step of the build in, and the size of the output. Defaults to None.
+        render_cache: A `RenderCache` to reuse the rendering of the blocks that are unchanged since a previous build, e.g. when iterating on a report in a notebook. Defaults to None.
     """
-    s = ViewState(blocks=Blocks.wrap_blocks(blocks), file_entry_klass=B64FileEntry)
+    s = ViewState(
+        blocks=Blocks.wrap_blocks(blocks),
+        file_entry_klass=B64FileEntry,
+        profile=profile,
+    )
     klass = (
         ExportHTMLStringInlineAssets
         if resizable
@@ -90,10 +194,14 @@ def stringify_report(
         cdn_base=cdn_base,
         standalone=standalone,
     )
-    return (
-        Pipeline(s)
-        .pipe(PreProcessView(is_finalized=True))
-        .pipe(ConvertPydantic())
-        .pipe(export)
-        .result
-    )
+    with _tracing(profile):
+        html = (
+            Pipeline(s)
+            .pipe(PreProcessView(is_finalized=True))
+            .pipe(ConvertPydantic(render_cache=render_cache))
+            .pipe(export)
+            .result
+        )
+    if profile is not None:
+        profile.finish(len(html.encode()))
+    return html
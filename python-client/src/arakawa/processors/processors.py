@@ -6,23 +6,27 @@ from abc import ABC
 from copy import copy
 from os import path as osp
 from pathlib import Path
-from typing import Any, cast
+from typing import TYPE_CHECKING, Any, TextIO, cast
 from uuid import uuid4
 
-import humps
 from jinja2 import Environment, FileSystemLoader, Template, pass_context
-from jinja2.utils import htmlsafe_json_dumps
 from markupsafe import Markup
 
 from arakawa import blocks as b
 from arakawa.common import timestamp
+from arakawa.common.json_backend import htmlsafe_dumps
 from arakawa.exceptions import InvalidReportError
+from arakawa.profiling import span
 from arakawa.types import HTML, NPath, SelectType
 from arakawa.utils import display_msg, open_in_browser
 from arakawa.view import PreProcess
 
 from .types import BaseProcessor, Formatting
 
+if TYPE_CHECKING:
+    from arakawa.asset_cache import AssetCache
+    from arakawa.render_cache import RenderCache
+
 
 @pass_context
 def include_raw(ctx, name) -> Markup:
@@ -34,6 +38,10 @@ def include_raw(ctx, name) -> Markup:
     return Markup(src)
 
 
+# rendered in place of the app data when streaming a template, to find where to write it
+APP_DATA_PLACEHOLDER = f"__ar_app_data_{uuid4().hex}__"
+
+
 class PreProcessView(BaseProcessor):
     """Optimization to improve the layout of the view using the Block-API"""
 
@@ -75,21 +83,48 @@ class PreProcessView(BaseProcessor):
 
 
 class ConvertPydantic(BaseProcessor):
-    def __init__(self, *, pretty_print: bool = False, fragment: bool = False) -> None:
+    def __init__(
+        self,
+        *,
+        pretty_print: bool = False,
+        fragment: bool = False,
+        cache: AssetCache | None = None,
+        max_workers: int | None = None,
+        render_cache: RenderCache | None = None,
+    ) -> None:
         self.pretty_print: bool = pretty_print
         self.fragment: bool = fragment
+        self.cache = cache
+        self.max_workers = max_workers
+        self.render_cache = render_cache
         super().__init__()
 
     def __call__(self, _: Any):
         from arakawa.view.pydantic_visitor import PydanticBuilder
 
-        builder_state = PydanticBuilder(store=self.s.store)
-        self.s.blocks._accept(builder_state)
+        builder_state = PydanticBuilder(
+            store=self.s.store,
+            cache=self.cache,
+            max_workers=self.max_workers,
+            profile=self.s.profile,
+            render_cache=self.render_cache,
+        )
+        with span("walk view"):
+            self.s.blocks._accept(builder_state)
+        with span("build assets"):
+            builder_state.build_assets()
+        if self.cache:
+            # once all the assets are in the store, rather than after each fetch
+            self.cache.evict()
         view = builder_state.get_root(self.fragment)
 
-        self.s.view_json = humps.camelize(
-            view.model_dump(mode="json", by_alias=True, exclude_none=True)
-        )
+        with span("dump view"):
+            if self.render_cache is None:
+                self.s.view_json = view.model_dump(
+                    mode="json", by_alias=True, exclude_none=True
+                )
+            else:
+                self.s.view_json = builder_state.dump_view(view)
         return view
 
 
@@ -118,18 +153,38 @@ class BaseExportHTML(BaseProcessor, ABC):
 
         return settings.AR_CDN_BASE
 
-    def _write_html_template(
+    def _get_template_context(
         self,
         name: str,
         formatting: Formatting | None = None,
         cdn_base: str | None = None,
         standalone: bool = False,
-    ) -> tuple[str, str]:
-        """Internal method to write the ViewXML and assets into a HTML container and associated files"""
+    ) -> dict[str, Any]:
+        """Build the template variables, other than the app data"""
         name = name or "app"
         formatting = formatting or Formatting()
 
-        report_id: str = uuid4().hex
+        return {
+            "report_width_class": formatting.width.to_css(),
+            "report_name": name,
+            "report_date": timestamp(),
+            "css_header": formatting.to_css(),
+            "is_light_prose": json.dumps(formatting.light_prose),
+            "events": True,
+            "report_id": uuid4().hex,
+            "cdn_base": cdn_base or self.get_cdn(),
+            "standalone": standalone,
+        }
+
+    def _write_html_template(
+        self,
+        name: str,
+        formatting: Formatting | None = None,
+        cdn_base: str | None = None,
+        standalone: bool = False,
+    ) -> tuple[str, str]:
+        """Internal method to write the ViewXML and assets into a HTML container and associated files"""
+        context = self._get_template_context(name, formatting, cdn_base, standalone)
 
         # TODO - split this out?
         vs = self.s
@@ -141,21 +196,57 @@ class BaseExportHTML(BaseProcessor, ABC):
             view_json = {}
 
         app_data = {"viewJson": view_json, "assets": assets}
-        html = self.template.render(
+        with span("dump app data", assets=len(assets)):
             # Escape JS multi-line strings
-            app_data=htmlsafe_json_dumps({"data": {"result": app_data}}),
-            report_width_class=formatting.width.to_css(),
-            report_name=name,
-            report_date=timestamp(),
-            css_header=formatting.to_css(),
-            is_light_prose=json.dumps(formatting.light_prose),
-            events=True,
-            report_id=report_id,
-            cdn_base=cdn_base or self.get_cdn(),
-            standalone=standalone,
-        )
+            app_data_json = htmlsafe_dumps({"data": {"result": app_data}})
+        with span("render template", template=self.template_name):
+            html = self.template.render(app_data=app_data_json, **context)
 
-        return html, report_id
+        return html, context["report_id"]
+
+    def _stream_html_template(
+        self,
+        f: TextIO,
+        name: str,
+        formatting: Formatting | None = None,
+        cdn_base: str | None = None,
+        standalone: bool = False,
+    ) -> str:
+        """
+        Stream the ViewXML and assets into a HTML container, producing the same output as `_write_html_template`
+        NOTE - the assets are written in chunks directly from their file entries, so the document is never held in memory
+        """
+        context = self._get_template_context(name, formatting, cdn_base, standalone)
+
+        for chunk in self.template.generate(app_data=APP_DATA_PLACEHOLDER, **context):
+            before, placeholder, after = chunk.partition(APP_DATA_PLACEHOLDER)
+            f.write(before)
+            if placeholder:
+                with span("stream app data"):
+                    self._stream_app_data(f)
+                f.write(after)
+
+        return context["report_id"]
+
+    def _stream_app_data(self, f: TextIO) -> None:
+        vs = self.s
+        view_json = vs.view_json if vs else {}
+        entries = vs.store.files.values() if vs else []
+
+        # compact, as encoded by `htmlsafe_dumps`
+        f.write('{"data":{"result":{"viewJson":')
+        f.write(htmlsafe_dumps(view_json))
+        f.write(',"assets":{')
+        for i, fe in enumerate(entries):
+            if i:
+                f.write(",")
+            f.write(f'{htmlsafe_dumps(fe.ref)}:{{"src":"')
+            for src_chunk in fe.iter_src():
+                # escape as the contents of a JSON string
+                f.write(htmlsafe_dumps(src_chunk)[1:-1])
+            # splice the remaining properties into the asset object
+            f.write(f'",{htmlsafe_dumps(fe.metadata)[1:]}')
+        f.write("}}}}")
 
 
 class ExportHTMLInlineAssets(BaseExportHTML):
@@ -163,6 +254,8 @@ class ExportHTMLInlineAssets(BaseExportHTML):
     Export a view into a single HTML file containing:
     - View XML - embedded
     - Assets - embedded as b64 data-uris
+
+    If `stream` is set, the file is written incrementally rather than rendered in memory first
     """
 
     template_name = "local_template.html.j2"
@@ -175,6 +268,7 @@ class ExportHTMLInlineAssets(BaseExportHTML):
         formatting: Formatting | None = None,
         cdn_base: str | None = None,
         standalone: bool = False,
+        stream: bool = False,
     ):
         self.path = path
         self.open = open
@@ -182,16 +276,26 @@ class ExportHTMLInlineAssets(BaseExportHTML):
         self.formatting = formatting
         self.cdn_base = cdn_base
         self.standalone = standalone
+        self.stream = stream
 
     def __call__(self, _: Any) -> str:
-        html, report_id = self._write_html_template(
-            name=self.name,
-            formatting=self.formatting,
-            cdn_base=self.cdn_base,
-            standalone=self.standalone,
-        )
-
-        Path(self.path).write_text(html, encoding="utf-8")
+        if self.stream:
+            with Path(self.path).open("w", encoding="utf-8") as f:
+                report_id = self._stream_html_template(
+                    f,
+                    name=self.name,
+                    formatting=self.formatting,
+                    cdn_base=self.cdn_base,
+                    standalone=self.standalone,
+                )
+        else:
+            html, report_id = self._write_html_template(
+                name=self.name,
+                formatting=self.formatting,
+                cdn_base=self.cdn_base,
+                standalone=self.standalone,
+            )
+            Path(self.path).write_text(html, encoding="utf-8")
 
         display_msg(f"App saved to ./{self.path}")
 
@@ -204,9 +308,11 @@ class ExportHTMLInlineAssets(BaseExportHTML):
 
 class ExportHTMLFileAssets(BaseExportHTML):
     """
-    Export a view into a single HTML file on disk, containing
-    - View XML - embedded
-    - Assets - referenced as remote resources
+    Export a view into a directory on disk, containing
+    - index.html, with the View XML embedded
+    - Assets - referenced as files within the assets dir
+
+    Asset files left by previous exports that are no longer used are removed
     """
 
     template_name = "local_template.html.j2"
@@ -214,12 +320,14 @@ class ExportHTMLFileAssets(BaseExportHTML):
     def __init__(
         self,
         app_dir: Path,
+        open: bool = False,
         name: str = "app",
         formatting: Formatting | None = None,
         cdn_base: str | None = None,
         standalone: bool = False,
     ):
         self.app_dir = app_dir
+        self.open = open
         self.name = name
         self.formatting = formatting
         self.cdn_base = cdn_base
@@ -235,7 +343,17 @@ class ExportHTMLFileAssets(BaseExportHTML):
 
         index_path = self.app_dir / "index.html"
         index_path.write_text(html, encoding="utf-8")
+
+        store = self.s.store
+        if store.persistent:
+            store.save_manifest()
+            store.collect_garbage()
+
         display_msg(f"Built app in {self.app_dir}")
+
+        if self.open:
+            open_in_browser(index_path.resolve().as_uri())
+
         return self.app_dir
 
 
@@ -3,11 +3,14 @@ from __future__ import annotations
 import dataclasses
 from enum import Enum
 from pathlib import Path
-from typing import Any, Generic, TypeVar
+from typing import TYPE_CHECKING, Any, Generic, TypeVar
 
 from arakawa.file_store import DummyFileEntry, FileEntry, FileStore
 from arakawa.view import Blocks
 
+if TYPE_CHECKING:
+    from arakawa.profiling import BuildProfile
+
 
 @dataclasses.dataclass
 class ViewState:
@@ -18,6 +21,8 @@ class ViewState:
     view_json: dict[str, Any] = dataclasses.field(default_factory=dict)
     entries: dict[str, str] = dataclasses.field(default_factory=dict)
     dir_path: dataclasses.InitVar[Path | None] = None
+    # records the timings of the processors & assets, if set
+    profile: BuildProfile | None = None
 
     def __post_init__(self, file_entry_klass, dir_path):
         # TODO - should we use a lambda for file_entry_klass with dir_path captured?
@@ -52,7 +57,11 @@ class Pipeline(Generic[P_IN]):
 
     def pipe(self, p: BaseProcessor[P_IN, P_OUT]) -> Pipeline[P_OUT]:
         p.s = self._state
-        y = p.__call__(self._x)  # need to call as positional args
+        if self._state.profile is None:
+            y = p.__call__(self._x)  # need to call as positional args
+        else:
+            with self._state.profile.processor(type(p).__name__):
+                y = p.__call__(self._x)
         self._state = p.s
         return Pipeline(self._state, y)
 
@@ -0,0 +1,276 @@
+"""
+Opt-in instrumentation of report builds, recording where the time and memory of a build goes
+
+Steps within a build are marked with `span` (or `traced`), which only record anything while a pipeline processor
+is running with a tracing `BuildProfile`, so may be left in place at no cost.
+Traces are written in the Chrome trace-event format, viewable in Perfetto (https://ui.perfetto.dev) or `chrome://tracing`.
+"""
+
+from __future__ import annotations
+
+import dataclasses as dc
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, TypeVar, cast
+
+from arakawa.types import NPath
+from arakawa.utils import log
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# the profile of the build running in the current context, see `BuildProfile.processor`
+_active_profile: ContextVar[BuildProfile | None] = ContextVar(
+    "active_profile", default=None
+)
+
+
+@contextmanager
+def span(name: str, cat: str = "build", **args: Any) -> Iterator[None]:
+    """Mark a step of the build in the trace of the running build, if it's traced"""
+    profile = _active_profile.get()
+    if profile is None or not profile.trace:
+        yield
+        return
+
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        profile._add_event(name, cat, start, args)
+
+
+def traced(name: str | None = None, cat: str = "build") -> Callable[[F], F]:
+    """Decorate a function to mark its calls with `span`, named after the function by default"""
+
+    def decorator(f: F) -> F:
+        @functools.wraps(f)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span(name or f.__qualname__, cat):
+                return f(*args, **kwargs)
+
+        return cast(F, wrapper)
+
+    return decorator
+
+
+@dc.dataclass(frozen=True)
+class Measurement:
+    """The cost of a step of a build"""
+
+    # seconds
+    wall_time: float
+    # seconds of CPU time used by the process, including any other threads
+    cpu_time: float
+    # the most memory allocated above the start of the step, in bytes, as traced by `tracemalloc`
+    peak_memory: int | None
+
+
+@dc.dataclass(frozen=True)
+class ProcessorProfile(Measurement):
+    processor: str
+
+
+@dc.dataclass(frozen=True)
+class AssetProfile(Measurement):
+    block_type: str
+    block_name: str | None
+    # the size of the stored asset in bytes
+    size: int
+
+
+@dc.dataclass(eq=False)
+class _Frame:
+    wall_start_ns: int
+    cpu_start: float
+    mem_start: int = 0
+    mem_peak: int = 0
+
+
+class BuildProfile:
+    """
+    Timings of each processor of a report build (e.g. `ConvertPydantic`), and of each asset written, along with
+    the size of the output. Pass one to `save_report` or `stringify_report` and it's filled in as the report is built.
+
+    Memory is traced with `tracemalloc`, which slows down allocating Python objects, so may be disabled.
+    NOTE - when writing assets concurrently, they're measured as they're added to the store,
+    so include waiting for their writers, and their memory includes any other writers running at the time
+    """
+
+    def __init__(
+        self, trace_memory: bool = True, log: bool = False, trace: bool = False
+    ):
+        """
+        Args:
+            trace_memory: Whether or not to measure the peak memory of each step (default: True)
+            log: Whether or not to log the summary once the build is finished (default: False)
+            trace: Whether or not to record a timeline of the build, to write with `save_trace` (default: False)
+        """
+        self.trace_memory = trace_memory
+        self.log = log
+        self.trace = trace
+        self.processors: list[ProcessorProfile] = []
+        self.assets: list[AssetProfile] = []
+        self.output_size: int | None = None
+        self._frames: list[_Frame] = []
+        self._started_tracing = False
+        # Chrome trace events, timed from the creation of the profile
+        self._events: list[dict[str, Any]] = []
+        self._thread_names: dict[int, str] = {}
+        self._origin = time.perf_counter_ns()
+
+    def __repr__(self) -> str:
+        return f"BuildProfile(processors={len(self.processors)}, assets={len(self.assets)}, output_size={self.output_size})"
+
+    @contextmanager
+    def processor(self, name: str) -> Iterator[None]:
+        """Measure a processor of the pipeline, see `Pipeline.pipe`, tracing any steps it runs"""
+        token = _active_profile.set(self)
+        frame = self._start()
+        try:
+            yield
+        finally:
+            p = ProcessorProfile(*self._stop(frame), processor=name)
+            self.processors.append(p)
+            _active_profile.reset(token)
+            self._add_measurement(p, name, "processor", frame)
+
+    @contextmanager
+    def asset(self, block: Any) -> Iterator[dict[str, Any]]:
+        """Measure adding an asset block to the store, yielding a dict to set the stored `size` in"""
+        frame = self._start()
+        result: dict[str, Any] = {"size": 0}
+        try:
+            yield result
+        finally:
+            a = AssetProfile(
+                *self._stop(frame),
+                block_type=type(block).__name__,
+                block_name=block.id,
+                size=result["size"],
+            )
+            self.assets.append(a)
+            name = a.block_type + (f" {a.block_name}" if a.block_name else "")
+            self._add_measurement(a, name, "asset", frame, size=a.size)
+
+    def finish(self, output_size: int | None = None) -> None:
+        """Record the size of the output in bytes, once the build is complete"""
+        self.output_size = output_size
+        self.stop_tracing()
+        if self.log:
+            log.info(f"Report build profile\n{self.summary()}")
+
+    def stop_tracing(self) -> None:
+        """Stop tracing memory, if started by this profile, e.g. once a build has failed"""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "processors": [dc.asdict(p) for p in self.processors],
+            "assets": [dc.asdict(a) for a in self.assets],
+            "output_size": self.output_size,
+        }
+
+    def save_trace(self, path: NPath) -> None:
+        """Write the timeline of the build as a Chrome trace-event JSON file"""
+        if not self.trace:
+            log.warning("Build wasn't traced, create the profile with `trace=True`")
+
+        pid = os.getpid()
+        meta = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": pid,
+                "tid": tid,
+                "args": {"name": n},
+            }
+            for tid, n in self._thread_names.items()
+        ]
+        with open(os.path.expanduser(path), "w", encoding="utf-8") as f:
+            json.dump(
+                {"traceEvents": meta + [{**e, "pid": pid} for e in self._events]},
+                f,
+                default=str,
+            )
+
+    def summary(self, top: int = 10) -> str:
+        """A table of the processors and the `top` slowest assets"""
+
+        def _row(label: str, m: Measurement, size: int | None = None) -> str:
+            peak = "" if m.peak_memory is None else f"{m.peak_memory / 1024**2:.1f}"
+            size_mb = "" if size is None else f"{size / 1024**2:.2f}"
+            return f"{label:<40} {m.wall_time:>9.3f} {m.cpu_time:>9.3f} {peak:>9} {size_mb:>9}"
+
+        lines = [
+            f"{'step':<40} {'wall (s)':>9} {'cpu (s)':>9} {'peak (MB)':>9} {'size (MB)':>9}"
+        ]
+        lines += [_row(p.processor, p) for p in self.processors]
+        for a in sorted(self.assets, key=lambda a: a.wall_time, reverse=True)[:top]:
+            label = f"  {a.block_type}" + (f" {a.block_name!r}" if a.block_name else "")
+            lines.append(_row(label[:40], a, a.size))
+        if self.output_size is not None:
+            lines.append(f"output size: {self.output_size} bytes")
+        return "\n".join(lines)
+
+    def _add_event(self, name: str, cat: str, start: int, args: dict[str, Any]) -> None:
+        """Add a complete event, from `start` until now, on the current thread"""
+        end = time.perf_counter_ns()
+        thread = threading.current_thread()
+        self._thread_names.setdefault(thread.ident or 0, thread.name)
+        event = {
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": (start - self._origin) / 1000,
+            "dur": (end - start) / 1000,
+            "tid": thread.ident,
+        }
+        if args:
+            event["args"] = args
+        # appending is atomic, so spans may be added from writer threads
+        self._events.append(event)
+
+    def _add_measurement(
+        self, m: Measurement, name: str, cat: str, frame: _Frame, **args: Any
+    ) -> None:
+        if self.trace:
+            args.update(cpu_time=m.cpu_time, peak_memory=m.peak_memory)
+            self._add_event(name, cat, frame.wall_start_ns, args)
+
+    def _start(self) -> _Frame:
+        frame = _Frame(
+            wall_start_ns=time.perf_counter_ns(), cpu_start=time.process_time()
+        )
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            current, peak = tracemalloc.get_traced_memory()
+            # the peak is reset for each step, so carry it over to the enclosing ones first
+            for f in self._frames:
+                f.mem_peak = max(f.mem_peak, peak)
+            tracemalloc.reset_peak()
+            frame.mem_start = frame.mem_peak = current
+        self._frames.append(frame)
+        return frame
+
+    def _stop(self, frame: _Frame) -> tuple[float, float, int | None]:
+        wall_time = (time.perf_counter_ns() - frame.wall_start_ns) / 1e9
+        cpu_time = time.process_time() - frame.cpu_start
+        self._frames.remove(frame)
+        if not self.trace_memory or not tracemalloc.is_tracing():
+            return wall_time, cpu_time, None
+
+        frame.mem_peak = max(frame.mem_peak, tracemalloc.get_traced_memory()[1])
+        for f in self._frames:
+            f.mem_peak = max(f.mem_peak, frame.mem_peak)
+        return wall_time, cpu_time, frame.mem_peak - frame.mem_start
@@ -0,0 +1,178 @@
+"""
+In-memory cache of the rendered view of blocks, so rebuilding a report after changing a few blocks
+(e.g. iterating in a notebook) only converts & writes the changed subtrees
+"""
+
+from __future__ import annotations
+
+import dataclasses as dc
+import hashlib
+from collections import OrderedDict
+from collections.abc import Iterator
+from enum import Enum
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from pydantic import AnyUrl
+
+from arakawa.asset_cache import fingerprint
+from arakawa.blocks.asset import AssetBlock
+from arakawa.blocks.base import BaseBlock, DataBlock
+from arakawa.settings import AR_VERSION
+
+if TYPE_CHECKING:
+    from arakawa.file_store import FileEntry, FileStore
+
+DEFAULT_MAX_ENTRIES = 10_000
+
+REF_PREFIX = "ref://"
+
+
+@dc.dataclass(frozen=True)
+class Rendered:
+    """The view JSON of a block (including any sub-blocks), and the stored assets and ids it uses"""
+
+    # NOTE - shared between builds, so mustn't be modified
+    fragment: dict[str, Any]
+    entries: tuple[FileEntry, ...]
+    ids: frozenset[str]
+
+    @classmethod
+    def from_fragment(cls, fragment: dict[str, Any], store: FileStore) -> Rendered:
+        refs: set[str] = set()
+        ids: set[str] = set()
+        for d in _iter_dicts(fragment):
+            if "_tag" in d and d.get("id"):
+                ids.add(d["id"])
+            refs.update(
+                v.removeprefix(REF_PREFIX)
+                for v in d.values()
+                if isinstance(v, str) and v.startswith(REF_PREFIX)
+            )
+        entries = tuple(fe for h in sorted(refs) if (fe := store.get_entry(h)))
+        return cls(fragment, entries, frozenset(ids))
+
+
+class RenderedBlock(DataBlock):
+    """Placeholder for a block reused from the render cache within a converted view, see `PydanticBuilder.visit`"""
+
+    _tag = "Rendered"
+
+    rendered: Any
+
+    @property
+    def id(self) -> str | None:
+        return None
+
+
+class RenderCache:
+    """
+    Cache of the rendered view JSON of each block and container subtree, along with the assets they use,
+    keyed by a hash of the block's structure and data (see `block_key`), so rebuilding a report only
+    converts, and writes the assets of, the blocks that have changed.
+
+    Entries are kept in memory, including inlined assets, and the least-recently used are evicted once there are
+    more than `max_entries`. Hit and miss counts are kept for the lifetime of the cache object.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        Args:
+            max_entries: The maximum number of blocks to keep the rendering of (default: 10,000)
+        """
+        self.max_entries = max_entries
+        self.hits: int = 0
+        self.misses: int = 0
+        self._entries: OrderedDict[str, Rendered] = OrderedDict()
+
+    def __repr__(self) -> str:
+        return f"RenderCache(entries={len(self._entries)}, hits={self.hits}, misses={self.misses})"
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str, store: FileStore) -> Rendered | None:
+        """Get the rendering of the block's key, if its assets may be added to the store"""
+        rendered = self._entries.get(key)
+        if rendered is None or not all(store.reusable(fe) for fe in rendered.entries):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return rendered
+
+    def put(self, key: str, rendered: Rendered) -> None:
+        self._entries[key] = rendered
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+def block_key(b: BaseBlock, memo: dict[int, str | None]) -> str | None:
+    """
+    Build the structural key of a block, from its type, fields and sub-blocks, and the fingerprint of any data,
+    or None if it can't be fingerprinted (and so isn't cached).
+    Keys are memoized by object id in `memo`, which must only be used during a single build
+    """
+    if id(b) in memo:
+        return memo[id(b)]
+
+    parts = [AR_VERSION, type(b).__name__]
+    if isinstance(b, AssetBlock):
+        from arakawa.view.pydantic_visitor import get_writer
+
+        # the options that change the written payload
+        parts.append(repr(getattr(get_writer(b), "key_parts", ())))
+
+    key: str | None = None
+    for name, value in b.__dict__.items():
+        # the entry written by a previous build, not part of the block itself
+        if name == "prev_entry":
+            continue
+        if name == "file" and value is not None:
+            value = Path(value)
+        part = _value_key(value, memo)
+        if part is None:
+            break
+        parts.append(f"{name}={part}")
+    else:
+        key = hashlib.sha256("\0".join(parts).encode()).hexdigest()
+
+    memo[id(b)] = key
+    return key
+
+
+def _value_key(value: Any, memo: dict[int, str | None]) -> str | None:
+    if value is None or isinstance(value, str | int | float | bool | Enum | AnyUrl):
+        return repr(value)
+    if isinstance(value, BaseBlock):
+        return block_key(value, memo)
+    if isinstance(value, list | tuple):
+        parts = [_value_key(v, memo) for v in value]
+        return None if None in parts else f"[{','.join(parts)}]"  # type: ignore
+    if isinstance(value, Path):
+        # assume files with the same size & modification time are unchanged
+        try:
+            st = value.stat()
+        except OSError:
+            return None
+        return f"{value}:{st.st_size}:{st.st_mtime_ns}"
+
+    # asset data, which may be shared between blocks, e.g. a DataTable and its preview
+    if id(value) not in memo:
+        memo[id(value)] = fingerprint(value)
+    return memo[id(value)]
+
+
+def _iter_dicts(x: Any) -> Iterator[dict]:
+    if isinstance(x, dict):
+        yield x
+        for v in x.values():
+            yield from _iter_dicts(v)
+    elif isinstance(x, list):
+        for v in x:
+            yield from _iter_dicts(v)
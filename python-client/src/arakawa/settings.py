@@ -8,3 +8,12 @@ AR_CDN_BASE = os.environ.get(
     "AR_CDN_BASE",
     f"https://cdn.jsdelivr.net/npm/arakawa@{convert2semver(AR_VERSION)}/dist",
 )
+# how DataTables decide which string columns to store as categories, "exact" or "sample",
+# unless set on the block, see `arakawa.common.df_processor.parse_categories`
+AR_CATEGORY_ESTIMATE = os.environ.get("AR_CATEGORY_ESTIMATE", "exact")
+# how Tables of DataFrames are rendered to HTML, "pandas" or the vectorized "fast" renderer,
+# unless set on the block, see `arakawa.common.html_table`
+AR_TABLE_RENDERER = os.environ.get("AR_TABLE_RENDERER", "pandas")
+# how the app data & plots are encoded as JSON, "auto" to use orjson if installed, "orjson" or the stdlib "json",
+# see `arakawa.common.json_backend`
+AR_JSON_BACKEND = os.environ.get("AR_JSON_BACKEND", "auto")
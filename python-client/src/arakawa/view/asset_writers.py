@@ -9,12 +9,22 @@ from io import TextIOWrapper
 from typing import Any
 
 import pandas as pd
+import pyarrow as pa
 from altair.utils import SchemaBase
 from multimethod import multimethod
 from pandas.io.formats.style import Styler
 
 from arakawa import optional_libs as opt
-from arakawa.common import ArrowFormat
+from arakawa.common import ArrowFormat, json_backend
+from arakawa.common.column_stats import ColumnStats
+from arakawa.common.datafiles import IPCCompression
+from arakawa.common.dataset_scan import DatasetScan
+from arakawa.common.df_processor import CategoryEstimate, get_category_estimate
+from arakawa.common.html_table import (
+    TableRenderer,
+    get_table_renderer,
+    to_html_table,
+)
 from arakawa.exceptions import ARError
 from arakawa.utils import log
 
@@ -55,15 +65,39 @@ class AttachmentWriter:
 
 
 class DataTableWriter:
-    def get_meta(self, _: pd.DataFrame) -> AssetMeta:
+    def __init__(
+        self,
+        category_estimate: CategoryEstimate | None = None,
+        compression: IPCCompression | None = None,
+        batch_size: int | None = None,
+    ):
+        self.category_estimate = get_category_estimate(category_estimate)
+        self.options = {"compression": compression, "batch_size": batch_size}
+        self.key_parts = (self.category_estimate, str(compression), str(batch_size))
+
+    # NOTE - Arrow data, e.g. PyCapsule streams, is collected into a table by the block, see `to_arrow_table`
+    @multimethod
+    def get_meta(self, _: pd.DataFrame | pa.Table | DatasetScan) -> AssetMeta:
         return AssetMeta(mime=ArrowFormat.content_type, ext=ArrowFormat.ext)
 
+    if opt.HAVE_POLARS:
+
+        @get_meta.register  # type: ignore
+        def _(self, _: opt.PlDataFrame) -> AssetMeta:
+            return AssetMeta(mime=ArrowFormat.content_type, ext=ArrowFormat.ext)
+
+    @get_meta.register  # type: ignore
+    def _(self, _: ColumnStats) -> AssetMeta:
+        return AssetMeta(ext=".json", mime="application/json")
+
     @multimethod
     def write_file(self, x: pd.DataFrame, f) -> None:
         if x.empty:
             raise ARError("Empty DataFrame provided")
         # process_df called in Arrow.save_file
-        ArrowFormat.save_file(f, x)
+        ArrowFormat.save_file(
+            f, x, category_estimate=self.category_estimate, **self.options
+        )
 
     if opt.HAVE_POLARS:
 
@@ -72,17 +106,36 @@ class DataTableWriter:
             if x.is_empty():
                 raise ARError("Empty DataFrame provided")
 
-            ArrowFormat.save_file(f, x)
+            ArrowFormat.save_file(f, x, **self.options)
+
+    @write_file.register  # type: ignore
+    def _(self, x: pa.Table, f) -> None:
+        if x.num_rows == 0 or x.num_columns == 0:
+            raise ARError("Empty DataFrame provided")
+
+        ArrowFormat.save_file(f, x, **self.options)
+
+    @write_file.register  # type: ignore
+    def _(self, x: DatasetScan, f) -> None:
+        ArrowFormat.save_file(f, x, **self.options)
+
+    @write_file.register  # type: ignore
+    def _(self, x: ColumnStats, f) -> None:
+        f.write(x.to_json().encode())
 
 
 class HTMLTableWriter:
+    def __init__(self, renderer: TableRenderer | None = None):
+        self.renderer = get_table_renderer(renderer)
+        self.key_parts = (self.renderer,)
+
     def get_meta(self, _: pd.DataFrame | Styler) -> AssetMeta:
         return AssetMeta(mime="application/vnd.arakawa.table+html", ext=".tbl.html")
 
     @multimethod
     def write_file(self, x: pd.DataFrame, f) -> None:
         self._check(x)
-        out = x.to_html().encode()
+        out = (to_html_table(x) if self.renderer == "fast" else x.to_html()).encode()
         f.write(out)
 
     @write_file.register  # type: ignore
@@ -102,13 +155,15 @@ class HTMLTableWriter:
 
         @write_file.register  # type: ignore
         def _(self, x: opt.PlDataFrame, f) -> None:
-            y = x.to_pandas()
-
-            self._check(y)
-            out = y.to_html().encode()
+            self._check(x)
+            if self.renderer == "fast":
+                # rendered from the frame's Arrow columns, without converting it to pandas
+                out = to_html_table(x).encode()
+            else:
+                out = x.to_pandas().to_html().encode()
             f.write(out)
 
-    def _check(self, df: pd.DataFrame) -> None:
+    def _check(self, df: Any) -> None:
         n_cells = df.shape[0] * df.shape[1]
         if n_cells > 500:
             log.warning(
@@ -119,6 +174,11 @@ class HTMLTableWriter:
 class PlotWriter:
     obj_type: Any
 
+    @multimethod
+    def thread_safe(self, _: Any) -> bool:
+        """Whether the plot can be written from a thread alongside others"""
+        return True
+
     # Altair (always installed)
     @multimethod
     def get_meta(self, _: SchemaBase) -> AssetMeta:
@@ -126,7 +186,7 @@ class PlotWriter:
 
     @multimethod
     def write_file(self, x: SchemaBase, f) -> None:
-        json.dump(x.to_dict(), ARTextIOWrapper(f))
+        json_backend.dump(x.to_dict(), f)
 
     if opt.HAVE_FOLIUM:
 
@@ -149,7 +209,7 @@ class PlotWriter:
         def _(self, x: opt.BFigure | opt.BLayout, f):
             from bokeh.embed import json_item
 
-            json.dump(json_item(x), ARTextIOWrapper(f))
+            json_backend.dump(json_item(x), f)
 
     if opt.HAVE_PLOTLY:
 
@@ -159,7 +219,7 @@ class PlotWriter:
 
         @write_file.register  # type: ignore
         def _(self, x: opt.PFigure, f):
-            json.dump(x.to_json(), ARTextIOWrapper(f))
+            json_backend.dump(x.to_json(), f)
 
     if opt.HAVE_MATPLOTLIB:
 
@@ -167,6 +227,11 @@ class PlotWriter:
         def _(self, _: opt.Axes | opt.Figure | opt.ndarray) -> AssetMeta:
             return AssetMeta(mime="image/svg+xml", ext=".svg")
 
+        @thread_safe.register  # type: ignore
+        def _(self, _: opt.Axes | opt.Figure | opt.ndarray) -> bool:
+            # pyplot's global state isn't thread-safe
+            return False
+
         @write_file.register  # type: ignore
         def _(self, x: opt.Figure, f) -> None:
             x.savefig(ARTextIOWrapper(f), format="svg", bbox_inches="tight")
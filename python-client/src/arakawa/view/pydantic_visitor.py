@@ -1,18 +1,29 @@
 from __future__ import annotations
 
+import contextvars
 import dataclasses
+import io
+import multiprocessing as mp
 import sys
 from collections import namedtuple
-from typing import TYPE_CHECKING, Any, Protocol, cast
+from collections.abc import Callable
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from shutil import copyfileobj
+from typing import IO, TYPE_CHECKING, Any, Protocol, cast
 
 from multimethod import DispatchError, multimethod
 from pydantic import AnyUrl
 
+from arakawa.asset_cache import asset_key
 from arakawa.blocks import BaseBlock, Group
 from arakawa.blocks.asset import AssetBlock
 from arakawa.blocks.layout import ContainerBlock
 from arakawa.blocks.text import EmbeddedTextBlock
+from arakawa.common import guess_type
 from arakawa.exceptions import ARError
+from arakawa.profiling import span
+from arakawa.render_cache import Rendered, RenderedBlock, block_key
 from arakawa.settings import AR_VERSION
 from arakawa.types import VAlign
 from arakawa.utils import log
@@ -27,20 +38,53 @@ else:
     from typing import Self
 
 if TYPE_CHECKING:
+    from arakawa.asset_cache import AssetCache
     from arakawa.file_store import FileEntry, FileStore
+    from arakawa.profiling import BuildProfile
+    from arakawa.render_cache import RenderCache
+
+
+@dataclasses.dataclass
+class AssetJob:
+    """Asset block scheduled during the tree walk, see `PydanticBuilder.build_assets`"""
+
+    block: AssetBlock
+    # the block's copy within the view, updated with the asset ref once it's stored
+    element: AssetBlock
+    # the element's field the ref is stored in, see `AssetBlock.linked_assets`
+    attr: str = "src"
+    # result of running the writer concurrently, if needed
+    future: Future | None = None
 
 
 @dataclasses.dataclass
 class PydanticBuilder(ViewVisitor):
     store: FileStore
     elements: list[BaseBlock] = dataclasses.field(default_factory=list)
+    # reuses previously serialized payloads for unchanged asset data, if given
+    cache: AssetCache | None = None
+    # if set, asset writers only run once the tree walk is complete, concurrently via `build_assets`
+    max_workers: int | None = None
+    # records the timings of each asset added to the store, if set
+    profile: BuildProfile | None = None
+    # reuses the rendering of unchanged blocks from previous builds, if given, see `dump_view`
+    render_cache: RenderCache | None = None
 
     _seen_ids: set[str] = dataclasses.field(default_factory=set)
+    # entries for asset data objects already written during this build, see `_data_key`
+    _data_entries: dict[tuple, tuple[Any, FileEntry]] = dataclasses.field(
+        default_factory=dict
+    )
+    _jobs: list[AssetJob] = dataclasses.field(default_factory=list)
+    # render cache keys of the converted elements, by element id, and of the visited blocks & data, by object id
+    _render_keys: dict[int, str] = dataclasses.field(default_factory=dict)
+    _key_memo: dict[int, str | None] = dataclasses.field(default_factory=dict)
 
     def get_root(self, fragment: bool = False):
         _top_group = cast(Group, self.elements.pop())
         assert isinstance(_top_group, Group)
         assert not self.elements
+        assert not self._jobs, "Scheduled assets must be built first"
         return ViewBlock(
             fragment=fragment,
             version=AR_VERSION,
@@ -49,7 +93,7 @@ class PydanticBuilder(ViewVisitor):
 
     @property
     def store_count(self) -> int:
-        return len(self.store.files)
+        return self.store.store_count
 
     def add_element(self, _: BaseBlock, e: BaseBlock) -> Self:
         """Add an element to the list of nodes at the current XML tree location"""
@@ -63,8 +107,58 @@ class PydanticBuilder(ViewVisitor):
 
         return self
 
-    @multimethod
     def visit(self, b: BaseBlock) -> Self:
+        """Convert the block, or reuse its rendering from the render cache if unchanged since a previous build"""
+        key = self._render_key(b)
+        if key is None:
+            return self._visit(b)
+
+        if rendered := self.render_cache.get(key, self.store):  # type: ignore
+            for fe in rendered.entries:
+                # kept by the cache for later builds, so mustn't be discarded
+                self.store.add_file(fe, shared=True)
+            for block_id in rendered.ids:
+                if block_id in self._seen_ids:
+                    raise ARError(f"Duplicate name {block_id} found in the View")
+                self._seen_ids.add(block_id)
+            return self.add_element(b, RenderedBlock(rendered=rendered))
+
+        self._visit(b)
+        self._render_keys[id(self.elements[-1])] = key
+        return self
+
+    def _render_key(self, b: BaseBlock) -> str | None:
+        # the top-level blocks are converted to a Group for the root of the view, so are never reused
+        if self.render_cache is None or self.store.dry_run or isinstance(b, Blocks):
+            return None
+        return block_key(b, self._key_memo)
+
+    def dump_view(self, view: ViewBlock) -> dict[str, Any]:
+        """
+        Dump the converted view as JSON, block by block, splicing in the blocks reused from the render cache
+        and caching the rest, so producing the same JSON as dumping the whole view
+        """
+        return self._dump_element(view)
+
+    def _dump_element(self, e: BaseBlock) -> dict[str, Any]:
+        if isinstance(e, RenderedBlock):
+            return e.rendered.fragment
+
+        if isinstance(e, ContainerBlock):
+            fragment = e.model_dump(
+                mode="json", by_alias=True, exclude_none=True, exclude={"blocks"}
+            )
+            # as ordered by the model
+            fragment = {"blocks": [self._dump_element(c) for c in e.blocks], **fragment}
+        else:
+            fragment = e.model_dump(mode="json", by_alias=True, exclude_none=True)
+
+        if self.render_cache is not None and (key := self._render_keys.get(id(e))):
+            self.render_cache.put(key, Rendered.from_fragment(fragment, self.store))
+        return fragment
+
+    @multimethod
+    def _visit(self, b: BaseBlock) -> Self:
         """Base implementation - just created an empty tag including all the initial attributes"""
         return self.add_element(b, b)
 
@@ -76,13 +170,13 @@ class PydanticBuilder(ViewVisitor):
         self.elements = cur_elements
         return res
 
-    @visit.register  # type: ignore
+    @_visit.register  # type: ignore
     def _(self, b: ContainerBlock) -> Self:
         sub_elements = self._visit_subnodes(b)
         b.blocks = sub_elements
         return self.add_element(b, b)
 
-    @visit.register  # type: ignore
+    @_visit.register  # type: ignore
     def _(self, b: Blocks) -> Self:
         sub_elements = self._visit_subnodes(b)
 
@@ -99,43 +193,118 @@ class PydanticBuilder(ViewVisitor):
         )
         return self.add_element(b, element)
 
-    @visit.register  # type: ignore
+    @_visit.register  # type: ignore
     def _(self, b: EmbeddedTextBlock) -> Self:
         return self.add_element(b, b)
 
-    @visit.register  # type: ignore
+    @_visit.register  # type: ignore
     def _(self, b: AssetBlock):
-        fe = self._add_asset_to_store(b)
-        element = b.model_copy(
-            update={"type": fe.mime, "src": AnyUrl(f"ref://{fe.hash}")}
-        )
+        element = b.model_copy()
+        for attr, asset in {"src": b, **b.linked_assets()}.items():
+            if self.max_workers and not self.store.dry_run:
+                self._jobs.append(AssetJob(block=asset, element=element, attr=attr))
+            else:
+                _set_ref(element, attr, self._add_asset_to_store(asset))
         return self.add_element(b, element)
 
-    def _add_asset_to_store(self, b: AssetBlock) -> FileEntry:
+    def build_assets(self) -> None:
+        """
+        Run the writers of the asset blocks scheduled during the tree walk concurrently,
+        then add the results to the store in tree order, so the output is identical to a serial build.
+        Objects that can't be written from a thread, e.g. matplotlib figures, are written in a process pool instead
+        """
+        jobs, self._jobs = self._jobs, []
+        scheduled: set[tuple] = set()
+        process_pool: ProcessPoolExecutor | None = None
+
+        with ThreadPoolExecutor(self.max_workers) as thread_pool:
+            try:
+                for job in jobs:
+                    b = job.block
+                    if not self._needs_writing(b):
+                        continue
+
+                    # only write each object once per writer options, later blocks reuse its entry
+                    writer = get_writer(b)
+                    data_key = _data_key(b, writer)
+                    if data_key in scheduled:
+                        continue
+                    scheduled.add(data_key)
+
+                    thread_safe = getattr(writer, "thread_safe", lambda _: True)(b.data)
+                    # payloads reused from the cache or a previous build are only copied, so needn't a process
+                    if thread_safe or self._payload_reusable(b, writer):
+                        # in the current context, so the writer is traced along with the build
+                        ctx = contextvars.copy_context()
+                        job.future = thread_pool.submit(ctx.run, self._prepare_entry, b)
+                    else:
+                        # spawned, as forking whilst the writer threads run may deadlock on the locks they hold
+                        process_pool = process_pool or ProcessPoolExecutor(
+                            self.max_workers, mp_context=mp.get_context("spawn")
+                        )
+                        job.future = process_pool.submit(_write_payload, writer, b.data)
+
+                for job in jobs:
+                    fe = self._add_asset_to_store(job.block, job.future)
+                    _set_ref(job.element, job.attr, fe)
+            finally:
+                if process_pool:
+                    process_pool.shutdown(cancel_futures=True)
+
+    def _payload_reusable(self, b: AssetBlock, writer: AssetWriterP) -> bool:
+        """Whether the asset's payload is stored by a previous build or in the cache, so needn't be written"""
+        meta = self._get_meta(writer, b)
+        key = self._entry_key(b, writer, meta)
+        if key is None:
+            return False
+        return self.store.get_stored(key) is not None or bool(
+            self.cache and self.cache.contains(key, meta.ext)
+        )
+
+    def _needs_writing(self, b: AssetBlock) -> bool:
+        """Whether storing the asset requires running its writer, see `_add_asset_to_store`"""
+        if b.prev_entry and self.store.reusable(b.prev_entry):
+            return False
+        return b.data is not None and _data_key(b) not in self._data_entries
+
+    def _add_asset_to_store(
+        self, b: AssetBlock, prepared: Future | None = None
+    ) -> FileEntry:
         """Default asset store handler that operates on native Python objects"""
+        if self.profile is None or self.store.dry_run:
+            return self._store_asset(b, prepared)
+
+        with self.profile.asset(b) as result:
+            fe = self._store_asset(b, prepared)
+            result["size"] = fe.size
+        return fe
+
+    def _store_asset(self, b: AssetBlock, prepared: Future | None = None) -> FileEntry:
         # import here as a very slow module due to nested imports
         # from .. import files
 
+        if self.store.dry_run:
+            return self._check_asset(b)
+
         # check if we already have stored this asset to the store
         # TODO - do we just persist the asset store across the session??
         if b.prev_entry:
-            if type(b.prev_entry) == self.store.fw_klass:  # noqa: E721
-                self.store.add_file(b.prev_entry)
+            if self.store.reusable(b.prev_entry):
+                # from a previous build, so may also be used by other blocks or cached renderings
+                b.prev_entry = self.store.add_file(b.prev_entry, shared=True)
                 return b.prev_entry
             b.prev_entry = None
 
         if b.data is not None:
-            # fe = files.add_to_store(self.data, s.store)
-            try:
-                writer = get_writer(b)
-                meta: AssetMeta = writer.get_meta(b.data)
-                fe = self.store.get_file(meta.ext, meta.mime)
-                writer.write_file(b.data, fe.file)
-                self.store.add_file(fe)
-            except DispatchError as e:
-                raise ARError(
-                    f"{type(b.data).__name__} not supported for {self.__class__.__name__}"
-                ) from e
+            # the same object used in multiple blocks only needs writing once,
+            # identical payloads from different objects are deduplicated by the store
+            data_key = _data_key(b)
+            if data_key in self._data_entries:
+                fe = self.store.add_file(self._data_entries[data_key][1])
+            else:
+                fe = self._write_asset(b, prepared)
+                # keep a reference to the data so its id isn't reused during the build
+                self._data_entries[data_key] = (b.data, fe)
         elif b.file is not None:
             fe = self.store.load_file(b.file)
         else:
@@ -144,13 +313,116 @@ class PydanticBuilder(ViewVisitor):
         b.prev_entry = fe
         return fe
 
+    def _check_asset(self, b: AssetBlock) -> FileEntry:
+        """Validate the asset is supported without writing it, returning an empty entry in its place"""
+        if b.data is not None:
+            meta = self._get_meta(get_writer(b), b)
+            fe = self.store.get_file(meta.ext, meta.mime)
+        elif b.file is not None:
+            fe = self.store.get_file("".join(b.file.suffixes), guess_type(b.file))
+        else:
+            raise ARError("No asset to add")
+
+        # not stored, as all empty entries share the same hash
+        fe.freeze()
+        return fe
+
+    def _get_meta(self, writer: AssetWriterP, b: AssetBlock) -> AssetMeta:
+        try:
+            return writer.get_meta(b.data)
+        except DispatchError as e:
+            raise ARError(
+                f"{type(b.data).__name__} not supported for {self.__class__.__name__}"
+            ) from e
+
+    def _write_asset(self, b: AssetBlock, prepared: Future | None = None) -> FileEntry:
+        try:
+            if prepared is None:
+                fe = self._prepare_entry(b)
+            elif isinstance(result := prepared.result(), bytes):
+                # payload written in a worker process
+                fe = self._prepare_entry(b, write=lambda f: f.write(result))
+            else:
+                fe = result
+
+            return self.store.add_file(fe)
+        except DispatchError as e:
+            raise ARError(
+                f"{type(b.data).__name__} not supported for {self.__class__.__name__}"
+            ) from e
+
+    def _prepare_entry(
+        self, b: AssetBlock, write: Callable[[IO[bytes]], Any] | None = None
+    ) -> FileEntry:
+        """Write the asset's data into a new, frozen, file entry - via the cache if set,
+        or reuse the entry stored for the same data by a previous build
+        NOTE - this may run concurrently, so mustn't modify the store
+        """
+        writer = get_writer(b)
+        meta = self._get_meta(writer, b)
+        write = write or partial(writer.write_file, b.data)
+
+        key = self._entry_key(b, writer, meta)
+        if key and (stored := self.store.get_stored(key)):
+            return stored
+
+        fe = self.store.get_file(meta.ext, meta.mime)
+        with span(f"write {type(b).__name__}", "writer", block=b.id, mime=meta.mime):
+            if self.cache and key:
+                with self.cache.fetch(key, meta.ext, write) as f:
+                    copyfileobj(f, fe.file)
+            else:
+                write(fe.file)
+
+        fe.freeze()
+        fe.key = key
+        return fe
+
+    def _entry_key(
+        self, b: AssetBlock, writer: AssetWriterP, meta: AssetMeta
+    ) -> str | None:
+        """The key of the asset's payload, see `asset_key`, only fingerprinting the data if its payload may be reused"""
+        if not (self.cache or self.store.persistent):
+            return None
+        return asset_key(
+            b.data,
+            type(b).__name__,
+            meta.ext,
+            meta.mime,
+            *getattr(writer, "key_parts", ()),
+        )
+
+
+def _data_key(b: AssetBlock, writer: AssetWriterP | None = None) -> tuple:
+    """Key of the asset's data object within a build, along with the writer options that change its payload"""
+    writer = writer or get_writer(b)
+    return (type(b), id(b.data), *getattr(writer, "key_parts", ()))
+
+
+def _set_ref(element: AssetBlock, attr: str, fe: FileEntry) -> None:
+    """Point the element's field at the stored asset, along with its type for the main asset"""
+    if attr == "src":
+        element.type = fe.mime
+    setattr(element, attr, AnyUrl(f"ref://{fe.ref}"))
+
+
+def _write_payload(writer: AssetWriterP, x: Any) -> bytes:
+    """Run a writer in a worker process, returning the payload to add to the store"""
+    f = io.BytesIO()
+    writer.write_file(x, f)
+    return f.getvalue()
+
 
 AssetMeta = namedtuple("AssetMeta", "ext mime")
 
 
 class AssetWriterP(Protocol):
     """Implement these in any class to support asset writing
-    for a particular AssetBlock"""
+    for a particular AssetBlock
+
+    Writers may also implement `thread_safe(x) -> bool`, returning False for objects
+    that must be written in a separate process when building assets concurrently,
+    and `key_parts`, the options that change the written payload, for keying cached assets"""
 
     def get_meta(self, x: Any) -> AssetMeta: ...
 
@@ -166,12 +438,12 @@ def get_writer(b: AssetBlock) -> AssetWriterP:
         return aw.PlotWriter()
 
     if isinstance(b, a.Table):
-        return aw.HTMLTableWriter()  # type: ignore
+        return aw.HTMLTableWriter(b.renderer)  # type: ignore
 
     if isinstance(b, a.Attachment):
         return aw.AttachmentWriter()
 
     if isinstance(b, a.DataTable):
-        return aw.DataTableWriter()  # type: ignore
+        return aw.DataTableWriter(b.category_estimate, b.compression, b.batch_size)  # type: ignore
 
     raise KeyError(f"No writer found for {type(b).__name__}")
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import sys
 from collections.abc import Mapping
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Literal
 
 from pydantic import Field, field_validator
 
@@ -17,7 +17,10 @@ else:
 
 
 if TYPE_CHECKING:
+    from arakawa.asset_cache import AssetCache
     from arakawa.processors.types import Formatting
+    from arakawa.profiling import BuildProfile
+    from arakawa.render_cache import RenderCache
 
 
 class Blocks(ContainerBlock):
@@ -140,20 +143,37 @@ class Report(Blocks):
         formatting: Formatting | None = None,
         cdn_base: str | None = None,
         standalone: bool = False,
-    ) -> None:
+        stream: bool = False,
+        cache: AssetCache | None = None,
+        max_workers: int | None = None,
+        compress: bool = False,
+        mode: Literal["file", "directory"] = "file",
+        profile: BuildProfile | None = None,
+        render_cache: RenderCache | None = None,
+    ) -> BuildProfile | None:
         """Save a report as an HTML file.
 
         Args:
-            path: A file path to store the document.
+            path: A file path to store the document, or the directory to store it in with `mode="directory"`.
             open: Open in your browser after creating. Default to False.
             name: A name of a report. Optional. Uses path if not provided.
             formatting: Sets the basic app styling.
             cdn_base: Base URL of CDN. Defaults to None.
             standalone: Whether or not to inline assets in an HTML instead of loading via CDN or not. Defaults to False.
+            stream: Whether or not to stream the HTML and assets into the file rather than rendering it in memory first, reducing peak memory usage for large reports. Defaults to False.
+            cache: An `AssetCache` to reuse the serialized assets of unchanged data across builds. Defaults to None.
+            max_workers: The number of threads (or processes, for matplotlib figures) to write assets concurrently with. Defaults to None, writing them serially.
+            compress: Whether or not to gzip the inlined assets that support it (e.g. DataTables and plots), which are decompressed in the browser. Defaults to False.
+            mode: Either "file" to save a single HTML file with the assets inlined, or "directory" to save an `index.html` with the assets as separate files to be served over HTTP, so a rebuild only writes the changed ones. Defaults to "file".
+            profile: A `BuildProfile` to record the time & memory of each step of the build in, and the size of the output. Defaults to None.
+            render_cache: A `RenderCache` to reuse the rendering of the blocks that are unchanged since a previous build, e.g. when iterating on a report in a notebook. Defaults to None.
+
+        Returns:
+            The `profile`, if given.
         """
         from ..processors import save_report
 
-        save_report(
+        return save_report(
             blocks=self,
             path=path,
             open=open,
@@ -161,6 +181,13 @@ class Report(Blocks):
             formatting=formatting,
             cdn_base=cdn_base,
             standalone=standalone,
+            stream=stream,
+            cache=cache,
+            max_workers=max_workers,
+            compress=compress,
+            mode=mode,
+            profile=profile,
+            render_cache=render_cache,
         )
 
     def stringify(
@@ -170,6 +197,8 @@ class Report(Blocks):
         cdn_base: str | None = None,
         resizable: bool = True,
         standalone: bool = False,
+        profile: BuildProfile | None = None,
+        render_cache: RenderCache | None = None,
     ) -> str:
         """Stringify a report as an HTML string.
 
@@ -179,6 +208,8 @@ class Report(Blocks):
             cdn_base: Base URL of CDN. Defaults to None.
             resizable: Wether or not to allow make an iframed report resizable or not. Defaults to True.
             standalone: Whether or not to inline assets in an HTML instead of loading via CDN or not. Defaults to False.
+            profile: A `BuildProfile` to record the time & memory of each step of the build in, and the size of the output. Defaults to None.
+            render_cache: A `RenderCache` to reuse the rendering of the blocks that are unchanged since a previous build, e.g. when iterating on a report in a notebook. Defaults to None.
         """
         from ..processors import stringify_report
 
@@ -189,4 +220,6 @@ class Report(Blocks):
             cdn_base=cdn_base,
             resizable=resizable,
             standalone=standalone,
+            profile=profile,
+            render_cache=render_cache,
         )
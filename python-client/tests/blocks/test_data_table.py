@@ -0,0 +1,272 @@
+import base64
+import io
+import json
+from pathlib import Path
+
+import pandas as pd
+import polars as pl
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv
+import pyarrow.parquet as pq
+import pytest
+
+import arakawa as ar
+from arakawa.common.dataset_scan import DatasetScan
+from arakawa.common.df_processor import to_df
+from arakawa.exceptions import ARError
+from arakawa.file_store import B64FileEntry
+from arakawa.processors import ConvertPydantic, Pipeline, PreProcessView, ViewState
+from arakawa.view.asset_writers import DataTableWriter
+
+
+class CapsuleStream:
+    """Exports a table only through the Arrow PyCapsule interface, as e.g. DuckDB results"""
+
+    def __init__(self, table: pa.Table):
+        self.table = table
+
+    def __arrow_c_stream__(self, requested_schema=None):
+        return self.table.__arrow_c_stream__(requested_schema)
+
+
+class CapsuleArray:
+    def __init__(self, batch: pa.RecordBatch):
+        self.batch = batch
+
+    def __arrow_c_array__(self, requested_schema=None):
+        return self.batch.__arrow_c_array__(requested_schema)
+
+
+TABLE = pa.table({"a": [1, 2, 3], "b": ["x", "y", None]})
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        TABLE,
+        pa.RecordBatchReader.from_batches(TABLE.schema, TABLE.to_batches()),
+        CapsuleStream(TABLE),
+        CapsuleArray(TABLE.to_batches()[0]),
+        pl.from_arrow(TABLE),
+    ],
+    ids=["table", "reader", "stream", "array", "polars"],
+)
+def test_data_table_from_arrow(data, monkeypatch: pytest.MonkeyPatch):
+    def fail(_):
+        raise AssertionError("Arrow data shouldn't be converted to pandas")
+
+    monkeypatch.setattr("arakawa.blocks.asset.to_df", fail)
+    block = ar.DataTable(data)
+
+    assert isinstance(block.data, pa.Table)
+    assert (block.rows, block.columns) == (3, 2)
+    if isinstance(data, pa.Table):
+        assert block.data is data
+
+    f = io.BytesIO()
+    DataTableWriter().write_file(block.data, f)
+    written = pa.ipc.open_file(f.getvalue()).read_all()
+    assert written.cast(TABLE.schema).equals(TABLE)
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        pa.array([1, 2, 3]),
+        pa.chunked_array([[1, 2], [3]]),
+        CapsuleStream(pa.chunked_array([[1, 2, 3]])),
+        pl.Series("a", [1, 2, 3]),
+    ],
+    ids=["array", "chunked_array", "stream", "polars"],
+)
+def test_data_table_from_arrow_values(data):
+    block = ar.DataTable(data)
+    assert isinstance(block.data, pa.Table)
+    assert (block.rows, block.columns) == (3, 1)
+    assert block.data.to_pydict() == {"Result": [1, 2, 3]}
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        pd.DataFrame({"a": [1, 2, 3]}),
+        pd.Series([1, 2, 3], name="a"),
+        pd.Series([1, 2, 3]),
+        pd.Index([1, 2, 3], name="a"),
+    ],
+    ids=["frame", "series", "unnamed_series", "index"],
+)
+def test_data_table_from_pandas_isnt_arrow(data):
+    block = ar.DataTable(data)
+    pd.testing.assert_frame_equal(block.data, to_df(data))
+
+
+def test_arrow_types_normalized():
+    table = pa.table(
+        {
+            "view": pa.array(["x", None], pa.string_view()),
+            "duration": pa.array([1_000_000, None], pa.duration("us")),
+        }
+    )
+    f = io.BytesIO()
+    DataTableWriter().write_file(table, f)
+    written = pa.ipc.open_file(f.getvalue()).read_all()
+
+    assert written.schema == pa.schema(
+        {"view": pa.large_string(), "duration": pa.large_string()}
+    )
+    assert written.column("duration").to_pylist() == ["0 days 00:00:01", None]
+
+    with pytest.raises(ARError):
+        DataTableWriter().write_file(table.slice(0, 0), io.BytesIO())
+
+
+@pytest.mark.parametrize(
+    ("series", "expected"),
+    [
+        (
+            pl.Series(["a", "b", "a"], dtype=pl.Categorical),
+            pa.dictionary(pa.uint32(), pa.large_string()),
+        ),
+        (
+            pl.Series([["a"], ["b", "c"], None], dtype=pl.List(pl.String)),
+            pa.large_list(pa.large_string()),
+        ),
+    ],
+    ids=["categorical", "list"],
+)
+def test_nested_arrow_types_normalized(series: pl.Series, expected: pa.DataType):
+    # exported through the PyCapsule interface with `string_view` values
+    block = ar.DataTable(CapsuleStream(pa.table(series.to_frame("x"))))
+    written = _written(block)
+    assert written.schema.field("x").type == expected
+    assert written.column("x").to_pylist() == series.to_list()
+
+
+@pytest.fixture
+def parquet_file(tmp_path: Path) -> Path:
+    table = pa.table(
+        {
+            "year": [2019, 2020, 2021, 2022] * 25_000,
+            "name": pa.array([f"n{i}" for i in range(100_000)], pa.string_view()),
+            "value": range(100_000),
+        }
+    )
+    path = tmp_path / "data.parquet"
+    pq.write_table(table, path, row_group_size=10_000)
+    return path
+
+
+def _written(block: ar.DataTable) -> pa.Table:
+    f = io.BytesIO()
+    DataTableWriter().write_file(block.data, f)
+    return pa.ipc.open_file(f.getvalue()).read_all()
+
+
+def test_data_table_from_file(parquet_file: Path):
+    block = ar.DataTable.from_file(parquet_file)
+    assert isinstance(block.data, DatasetScan)
+    assert (block.rows, block.columns) == (100_000, 3)
+    written = _written(block)
+    assert written.schema.field("name").type == pa.large_string()
+    assert written.cast(pq.read_schema(parquet_file)).equals(
+        pq.read_table(parquet_file)
+    )
+
+
+def test_data_table_from_file_scan_options(parquet_file: Path):
+    block = ar.DataTable.from_file(
+        parquet_file,
+        columns=["value", "year"],
+        filter=pc.field("year") >= 2021,
+        limit=25_001,
+    )
+    assert (block.rows, block.columns) == (25_001, 2)
+    written = _written(block)
+    assert written.column_names == ["value", "year"]
+    assert written.num_rows == 25_001
+    assert pc.min(written.column("year")).as_py() == 2021
+
+    # csv files are scanned the same way
+    csv_file = parquet_file.with_suffix(".csv")
+    pa.csv.write_csv(pq.read_table(parquet_file, columns=["year", "value"]), csv_file)
+    csv_block = ar.DataTable.from_file(
+        csv_file,
+        columns=["value", "year"],
+        filter=pc.field("year") >= 2021,
+        limit=25_001,
+    )
+    assert _written(csv_block).equals(written)
+
+
+def test_data_table_from_file_errors(parquet_file: Path):
+    with pytest.raises(ARError):
+        ar.DataTable.from_file(parquet_file.with_suffix(".json"))
+    with pytest.raises(ARError):
+        ar.DataTable.from_file(parquet_file, columns=["missing"])
+    with pytest.raises(ARError):
+        ar.DataTable.from_file(parquet_file, filter=pc.field("year") > 3000)
+
+
+def _build(*blocks, max_workers: int | None = None) -> ViewState:
+    s = ViewState(blocks=ar.Blocks(*blocks), file_entry_klass=B64FileEntry)
+    return (
+        Pipeline(s)
+        .pipe(PreProcessView())
+        .pipe(ConvertPydantic(max_workers=max_workers))
+        .state
+    )
+
+
+def _asset(s: ViewState, ref: str) -> pa.Table:
+    fe = s.store.get_entry(ref.removeprefix("ref://"))
+    _, data = fe.src.split(",", 1)
+    return pa.ipc.open_file(base64.b64decode(data)).read_all()
+
+
+@pytest.mark.parametrize("max_workers", [None, 2])
+def test_data_table_preview(parquet_file: Path, max_workers: int | None):
+    df = pd.DataFrame({"a": range(1000), "b": [f"s{i}" for i in range(1000)]})
+    blocks = [
+        ar.DataTable(df, preview_rows=100),
+        ar.DataTable(pa.Table.from_pandas(df), preview_rows=100),
+        ar.DataTable.from_file(parquet_file, preview_rows=100),
+    ]
+    s = _build(*blocks, max_workers=max_workers)
+    view = s.view_json["blocks"]
+
+    assert s.store.store_count == 6
+    for block, elem in zip(blocks, view, strict=True):
+        full, preview = _asset(s, elem["src"]), _asset(s, elem["previewSrc"])
+        assert full.num_rows == block.rows
+        assert preview.num_rows == block.preview.rows == 100
+        # pandas columns may be downcast differently for the first rows
+        assert preview.to_pylist() == full.slice(0, 100).to_pylist()
+
+    # small tables are written in full only
+    s = _build(ar.DataTable(df, preview_rows=1000))
+    (elem,) = s.view_json["blocks"]
+    assert "previewSrc" not in elem
+    assert s.store.store_count == 1
+
+
+def test_data_table_stats(parquet_file: Path):
+    df = pd.DataFrame({"a": range(1000), "b": ["x", "y"] * 500})
+    blocks = [
+        ar.DataTable(df, stats=True),
+        ar.DataTable(pa.Table.from_pandas(df, preserve_index=False), stats=True),
+        ar.DataTable.from_file(parquet_file, columns=["value", "year"], stats=True),
+    ]
+    s = _build(*blocks)
+    for elem in s.view_json["blocks"]:
+        fe = s.store.get_entry(elem["statsSrc"].removeprefix("ref://"))
+        assert fe.mime == "application/json"
+        _, data = fe.src.split(",", 1)
+        stats = json.loads(base64.b64decode(data))
+        assert [c["name"] for c in stats] in (["a", "b"], ["value", "year"])
+        assert sum(stats[0]["histogram"]["counts"]) == elem["rows"]
+
+    # no stats by default
+    (elem,) = _build(ar.DataTable(df)).view_json["blocks"]
+    assert "statsSrc" not in elem
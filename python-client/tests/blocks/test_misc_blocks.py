@@ -4,6 +4,7 @@ import numpy as np
 import pytest
 
 from arakawa.blocks.misc_blocks import BigNumber
+from arakawa.blocks.network import Sigma
 
 
 @pytest.mark.parametrize(
@@ -20,11 +21,11 @@ from arakawa.blocks.misc_blocks import BigNumber
             {
                 "heading": "test",
                 "value": "2",
-                "prev_value": "1",
+                "prevValue": "1",
                 "change": "1",
                 "_tag": "BigNumber",
-                "is_positive_intent": True,
-                "is_upward_change": True,
+                "isPositiveIntent": True,
+                "isUpwardChange": True,
             },
         ),
         (
@@ -37,8 +38,8 @@ from arakawa.blocks.misc_blocks import BigNumber
                 "heading": "test",
                 "value": "1",
                 "_tag": "BigNumber",
-                "is_positive_intent": False,
-                "is_upward_change": False,
+                "isPositiveIntent": False,
+                "isUpwardChange": False,
             },
         ),
     ],
@@ -46,3 +47,12 @@ from arakawa.blocks.misc_blocks import BigNumber
 def test_big_number_annotations(block: BigNumber, expected: Any):
     dumped = block.model_dump(by_alias=True, exclude_none=True)
     assert dumped == expected
+
+
+def test_sigma_serialization():
+    data = {"nodes": [{"key": "a", "attributes": {"node_size": 1}}], "edges": []}
+    block = Sigma(data, layout_settings={"barnes_hut_optimize": True})
+    dumped = block.model_dump(mode="json", by_alias=True, exclude_none=True)
+    # the graph data is kept as is, only the block's fields are camelCased
+    assert dumped["data"] == data
+    assert dumped["layoutSettings"] == {"barnesHutOptimize": True}
@@ -0,0 +1,147 @@
+import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+import vega_datasets as vd
+
+from arakawa.common import df_processor
+from arakawa.common.arrow_processor import DFConverter, df_to_arrow
+from arakawa.common.datafiles import ArrowFormat
+from arakawa.common.df_processor import process_df
+from arakawa.exceptions import ARError
+
+N = 3000
+
+
+def _expected(df: pd.DataFrame) -> pa.Table:
+    table = pa.Table.from_pandas(process_df(df, copy=True), preserve_index=False)
+    return table.replace_schema_metadata()
+
+
+def _check_parity(df: pd.DataFrame):
+    before = df.copy(deep=True)
+    table, expected = df_to_arrow(df), _expected(df)
+
+    assert table.schema == expected.schema
+    for name in expected.column_names:
+        assert (
+            table.column(name)
+            .combine_chunks()
+            .equals(expected.column(name).combine_chunks())
+        ), name
+    # the input isn't modified
+    pd.testing.assert_frame_equal(df, before)
+
+
+rng = np.random.default_rng(0)
+idx = np.arange(N)
+COLUMNS = {
+    "int": idx,
+    "int_negative": idx - 50,
+    "int_large": idx * 10**10,
+    "uint64_huge": np.full(N, 2**63 + 1, dtype="uint64"),
+    "float": rng.random(N),
+    "float_integral": idx.astype(float),
+    "float_integral_nan": np.where(idx % 3, idx, np.nan),
+    "float_nan": np.where(idx % 3, rng.random(N), np.nan),
+    "float_inf": np.where(idx % 3, 1.0, np.inf),
+    "float32": rng.random(N).astype("float32"),
+    "float16": rng.random(N).astype("float16"),
+    "bool": idx % 2 == 0,
+    "bool_object": pd.Series([True, None] * (N // 2), dtype=object),
+    "Int64": pd.array([*range(N - 1), None], dtype="Int64"),
+    "Float64": pd.array([0.5] * (N - 1) + [None], dtype="Float64"),
+    "boolean": pd.array([True] * (N - 1) + [None], dtype="boolean"),
+    "str": [f"s{i}" for i in idx],
+    "str_few": [f"c{i % 5}" for i in idx],
+    "str_many_categories": [f"c{i % 140}" for i in idx],
+    "str_object": pd.Series([f"s{i}" if i % 2 else None for i in idx], dtype=object),
+    "mixed_object": pd.Series([1, "a"] * (N // 2), dtype=object),
+    "int_object": pd.Series(list(idx), dtype=object),
+    "all_null": pd.Series([None] * N, dtype=object),
+    "datetime": pd.date_range("2020", periods=N, freq="h"),
+    "datetime_tz": pd.date_range("2020", periods=N, freq="h", tz="UTC"),
+    "timedelta": pd.to_timedelta(idx, unit="s"),
+    "timedelta_few": pd.to_timedelta(np.where(idx % 2, idx % 3, np.nan), unit="s"),
+    "category": pd.Categorical([f"c{i % 3}" for i in idx]),
+    "category_ordered": pd.Categorical(
+        [f"c{i % 3}" for i in idx], categories=["c2", "c0", "c1"], ordered=True
+    ),
+    "category_int": pd.Categorical(idx % 3),
+    "date": [datetime.date(2020, 1, 1)] * N,
+    "period": pd.period_range("2020", periods=N, freq="D"),
+}
+
+
+@pytest.mark.parametrize("column", list(COLUMNS))
+def test_column_parity(column: str):
+    _check_parity(pd.DataFrame({column: COLUMNS[column]}))
+
+
+def test_frame_parity():
+    _check_parity(pd.DataFrame(COLUMNS))
+    _check_parity(vd.data.cars())
+
+
+def test_axis_parity():
+    df = pd.DataFrame({"a": [1, 2, 3], "b": ["x", "y", "z"]})
+    _check_parity(df.set_index("b"))
+    _check_parity(df.set_index(["a", "b"]))
+    # an unnamed index is reset as "level_0" if there's already an "index" column
+    _check_parity(df.rename(columns={"a": "index"}).set_index(pd.Index([5, 6, 7])))
+    _check_parity(
+        pd.DataFrame(
+            [[1, 2]], columns=pd.MultiIndex.from_tuples([("x", "a"), ("x", "b")])
+        )
+    )
+
+
+@pytest.mark.parametrize("column", ["float16", "mixed_object", "str_few"])
+def test_category_estimate_passed_through(column: str, monkeypatch: pytest.MonkeyPatch):
+    estimates = []
+
+    def parse_categories(_df: pd.DataFrame, category_estimate: str = "exact"):
+        estimates.append(category_estimate)
+
+    monkeypatch.setattr(df_processor, "parse_categories", parse_categories)
+    df_to_arrow(pd.DataFrame({column: COLUMNS[column]}), category_estimate="sample")
+    assert set(estimates) <= {"sample"}
+
+
+@pytest.mark.parametrize(
+    "df",
+    [
+        pd.DataFrame([[1, 2]], columns=["a", "a"]),
+        pd.DataFrame([[1, 2]], columns=[1, "1"]),
+        pd.DataFrame({"a": [1]}, index=pd.Index([0], name="a")),
+    ],
+    ids=["duplicate", "str_collision", "index_collision"],
+)
+def test_duplicate_columns(df: pd.DataFrame):
+    with pytest.raises(ARError, match="Duplicate column name"):
+        df_to_arrow(df)
+
+
+@pytest.mark.parametrize("batch_size", [250, 1000, N - 1])
+def test_batches_match_single_pass(batch_size: int):
+    # values only seen in the last batch still get a category
+    df = pd.DataFrame(COLUMNS).assign(str_few=[*COLUMNS["str_few"][:-1], "last"])
+    converter = DFConverter(df, batch_size=batch_size)
+    batches = list(converter.iter_batches())
+
+    assert len(batches) == -(-N // batch_size)
+    assert df_to_arrow(df, batch_size=batch_size).equals(df_to_arrow(df, batch_size=N))
+    assert all(b.schema == converter.schema for b in batches)
+
+
+def test_save_file_in_batches(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr("arakawa.common.arrow_processor.BATCH_BYTES", 1)
+    df = pd.DataFrame(COLUMNS)
+    ArrowFormat.save_file(str(tmp_path / "df.arrow"), df)
+
+    with pa.ipc.open_file(tmp_path / "df.arrow") as reader:
+        assert reader.num_record_batches == -(-N // 1024)
+        assert reader.read_all().equals(df_to_arrow(df))
@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from arakawa.common.column_stats import HISTOGRAM_BINS, TOP_K, ColumnStats
+
+
+def _stats(data) -> dict[str, dict]:
+    return {c["name"]: c for c in ColumnStats(data).compute()}
+
+
+def test_column_stats():
+    n = 10_000
+    df = pd.DataFrame(
+        {
+            "int": np.arange(n),
+            "few": np.arange(n) % 5,
+            "float": np.where(np.arange(n) % 10 == 0, np.nan, np.arange(n) / 10),
+            "str": [f"s{i % 50}" for i in range(n)],
+            "date": pd.date_range("2020-01-01", periods=n, freq="h"),
+        }
+    )
+    df.loc[0, "float"] = np.inf
+    stats = _stats(df)
+
+    s = stats["int"]
+    assert (s["nulls"], s["min"], s["max"]) == (0, 0, n - 1)
+    # estimated, as more than the sketch size
+    assert s["distinct"] == pytest.approx(n, rel=0.05)
+    assert len(s["histogram"]["counts"]) == HISTOGRAM_BINS
+    assert sum(s["histogram"]["counts"]) == n
+
+    # a bin per value for few integers
+    assert stats["few"]["histogram"] == {
+        "edges": [0, 1, 2, 3, 4, 5],
+        "counts": [n // 5] * 5,
+    }
+
+    # non-finite floats are left out
+    s = stats["float"]
+    assert s["nulls"] == n // 10 - 1
+    assert (s["min"], s["max"]) == (0.1, 999.9)
+    assert sum(s["histogram"]["counts"]) == n - n // 10
+
+    s = stats["str"]
+    assert s["distinct"] == 50
+    assert len(s["top"]) == TOP_K
+    assert s["top"][0] == ["s0", n // 50]
+
+    s = stats["date"]
+    assert s["histogram"]["edges"][0].startswith("2020-01-01T00:00")
+    assert sum(s["histogram"]["counts"]) == n
+
+    for s in stats.values():
+        assert s["distinct"] <= n - s["nulls"]
+
+
+def test_temporal_histogram_edges():
+    n = 100
+    times = pd.date_range("2020-01-01", periods=n, freq="h", tz="Europe/Paris")
+    dates = pd.date_range("2020-01-01", periods=n, freq="D").date
+    stats = _stats(
+        pa.table({"time": pa.array(times), "date": pa.array(dates, pa.date32())})
+    )
+
+    # in the column's timezone, as the min & max
+    s = stats["time"]
+    edges = s["histogram"]["edges"]
+    assert edges[0] == s["min"].isoformat() == "2020-01-01T00:00:00+01:00"
+    assert edges[-1] == s["max"].isoformat() == "2020-01-05T03:00:00+01:00"
+
+    # bins of whole days, each edge a different date
+    s = stats["date"]
+    assert s["histogram"] == {
+        "edges": [*map(str, dates[::5]), "2020-04-10"],
+        "counts": [5] * HISTOGRAM_BINS,
+    }
+
+
+def test_distinct_estimate_capped():
+    # all unique, where the sketch alone overestimates
+    n = 50_000
+    stats = _stats(pd.DataFrame({"x": np.arange(n)}))
+    assert stats["x"]["distinct"] == n
+
+
+@pytest.mark.parametrize("chunks", [1, 3])
+def test_column_stats_arrow(chunks: int):
+    values = [3, None, 1, 2, 2, None]
+    size = len(values) // chunks
+    table = pa.Table.from_batches(
+        [
+            pa.record_batch({"x": values[i : i + size], "l": [[1]] * size})
+            for i in range(0, len(values), size)
+        ]
+    )
+    assert table.column("x").num_chunks == chunks
+    stats = _stats(table)
+    assert stats["x"] == {
+        "name": "x",
+        "type": "int64",
+        "nulls": 2,
+        "distinct": 3,
+        "min": 1,
+        "max": 3,
+        "histogram": {"edges": [1, 2, 3, 4], "counts": [1, 2, 1]},
+    }
+    # unsupported types only count nulls
+    assert stats["l"] == {"name": "l", "type": "list<item: int64>", "nulls": 0}
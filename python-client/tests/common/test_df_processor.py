@@ -385,3 +385,24 @@ def test_e2e_df_processing(tmp_path: Path):
                 "datetime64[us]",
             ],
         )
+
+
+def test_parse_categories_sample():
+    n = 50_000
+    data = pd.DataFrame(
+        {
+            "unique": [str(x) for x in range(n)],
+            "few": [str(x % 25) for x in range(n)],
+            "many": [str(x % 2000) for x in range(n)],
+        }
+    )
+    exact, sampled = data.copy(), data.copy()
+    parse_categories(exact)
+    parse_categories(sampled, category_estimate="sample")
+    _check_categories_parsed(exact, ["few", "many"])
+    pd.testing.assert_frame_equal(exact, sampled)
+
+    # values repeating only a few times look unique in the sample, so are missed
+    data = pd.DataFrame({"spread": [str(x % (n // 20)) for x in range(n)]})
+    parse_categories(data, category_estimate="sample")
+    _check_categories_parsed(data, [])
@@ -2,8 +2,9 @@ from datetime import timedelta
 
 import numpy as np
 import pandas as pd
+import pytest
 
-from arakawa.common.df_processor import to_df
+from arakawa.common.df_processor import copy_on_write, process_df, to_df
 
 
 def assert_unnamed_col_works(col):
@@ -31,6 +32,35 @@ def test_to_df_df():
     pd.testing.assert_frame_equal(empty, new_df, check_like=True)
 
 
+def test_to_df_df_copy():
+    df = pd.DataFrame({"a": np.arange(10), "b": np.arange(10.0)})
+    new_df = to_df(df)
+    assert new_df is not df
+    if copy_on_write():
+        # only copied once either frame is modified
+        assert np.shares_memory(new_df["a"].to_numpy(), df["a"].to_numpy())
+
+    df.loc[0, "a"] = 100
+    assert new_df.loc[0, "a"] == 0
+
+
+@pytest.mark.skipif(not copy_on_write(), reason="process_df mutates without CoW")
+def test_process_df_doesnt_modify():
+    df = pd.DataFrame(
+        {
+            "int": np.arange(100),
+            "str": ["a", "b"] * 50,
+            "obj": [object()] * 100,
+            "td": pd.to_timedelta(np.arange(100), unit="s"),
+        },
+        index=pd.Index(np.arange(100) * 2, name="idx"),
+    )
+    expected = df.copy(deep=True)
+    out = process_df(df)
+    pd.testing.assert_frame_equal(df, expected)
+    assert out["str"].dtype == "category"
+
+
 def test_to_df_series():
     assert_unnamed_col_works(pd.Series([2, 3, 5]))
 
@@ -0,0 +1,62 @@
+import re
+
+import numpy as np
+import pandas as pd
+import polars as pl
+import pytest
+
+from arakawa.common.html_table import to_html_table
+
+
+def _normalize(html: str) -> str:
+    return re.sub(r">\s+<", "><", html).strip()
+
+
+DF = pd.DataFrame(
+    {
+        "int": [1, 2, 3],
+        "str": ["<b>", "a & b", "c"],
+        "bool": [True, False, True],
+        "cat": pd.Categorical(["x", "y", "x"]),
+        "<col>": [10, 20, 30],
+    }
+)
+
+
+@pytest.mark.parametrize(
+    "df",
+    [
+        DF,
+        DF.set_index(pd.Index(["a", "b", "c"], name="idx")),
+        DF.set_index(pd.date_range("2020-01-01", periods=3)),
+        # hierarchical columns are rendered by pandas
+        pd.concat({"top": DF}, axis=1),
+    ],
+    ids=["default", "named", "dates", "multi"],
+)
+def test_matches_to_html(df: pd.DataFrame):
+    assert _normalize(to_html_table(df)) == _normalize(df.to_html())
+
+
+def test_polars_matches_to_html():
+    df = pl.from_pandas(DF.drop(columns="cat"))
+    assert _normalize(to_html_table(df)) == _normalize(
+        df.to_pandas().to_html(index=False)
+    )
+
+
+def test_formatting():
+    df = pd.DataFrame(
+        {
+            "float": [1 / 3, np.nan, 2.5],
+            "time": pd.to_datetime(["2020-01-01 10:30", None, "2020-01-02 00:00"]),
+            "td": pd.to_timedelta([1, None, 60], unit="s"),
+            "obj": [1, "x", None],
+        }
+    )
+    html = to_html_table(df)
+    assert (
+        "<td>0.333333</td><td>2020-01-01 10:30:00</td><td>0 days 00:00:01</td><td>1</td>"
+        in html
+    )
+    assert "<td>NaN</td><td>NaT</td><td>NaT</td><td>x</td>" in html
@@ -0,0 +1,106 @@
+import datetime
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from jinja2.utils import htmlsafe_json_dumps
+
+import arakawa as ar
+from arakawa import settings
+from arakawa.common import json_backend
+from arakawa.exceptions import ARError
+from tests.builtins import gen_df, gen_plot
+
+OBJ = {
+    "text": "<script>alert('a & b')</script>",
+    "unicode": "日本語 ü",
+    "nested": [{"a": 1, "b": [1.5, None, True]}],
+    1: "non-str key",
+}
+
+BACKENDS = ["json", "orjson"]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_htmlsafe_dumps(backend: str):
+    pytest.importorskip(backend)
+    encoded = json_backend.htmlsafe_dumps(OBJ, backend)
+    assert not any(c in encoded for c in "<>&'")
+    assert json.loads(encoded) == json.loads(htmlsafe_json_dumps(OBJ))
+    # both backends encode the same JSON
+    assert encoded == json_backend.htmlsafe_dumps(OBJ, "json")
+
+
+def test_backend_parity():
+    pytest.importorskip("orjson")
+    obj = {
+        "floats": [1.5, float("nan"), float("inf"), -float("inf")],
+        "datetime": datetime.datetime(2020, 1, 2, 3, 4, 5, 123456),
+        "datetime_tz": datetime.datetime(2020, 1, 2, tzinfo=datetime.timezone.utc),
+        "date": datetime.date(2020, 1, 2),
+        "timestamp": pd.Timestamp("2020-01-02 03:04:05"),
+        "numpy": [np.array([1.0, np.nan]), np.int64(3), np.float64("nan")],
+    }
+    encoded = json_backend.dumps_bytes(obj, "orjson")
+    assert encoded == json_backend.dumps_bytes(obj, "json")
+    assert json.loads(encoded) == {
+        "floats": [1.5, None, None, None],
+        "datetime": "2020-01-02T03:04:05.123456",
+        "datetime_tz": "2020-01-02T00:00:00+00:00",
+        "date": "2020-01-02",
+        "timestamp": "2020-01-02T03:04:05",
+        "numpy": [[1.0, None], 3, None],
+    }
+
+    for backend in BACKENDS:
+        with pytest.raises(TypeError, match="not JSON serializable"):
+            json_backend.dumps_bytes({"x": object()}, backend)  # type: ignore
+
+
+def test_orjson_fallback():
+    pytest.importorskip("orjson")
+    # over 64 bits, so encoded by the stdlib
+    assert (
+        json_backend.dumps_bytes({"x": 2**70}, "orjson")
+        == b'{"x":1180591620717411303424}'
+    )
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_circular_reference(backend: str):
+    pytest.importorskip(backend)
+    obj: dict = {"floats": [float("nan")]}
+    obj["self"] = obj
+    with pytest.raises(ValueError, match="Circular reference"):
+        json_backend.dumps_bytes(obj, backend)  # type: ignore
+
+
+def test_unknown_backend():
+    with pytest.raises(ARError, match="Unknown JSON backend"):
+        json_backend.dumps_bytes(OBJ, "yaml")  # type: ignore
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_save_report_backends(
+    backend: str, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    pytest.importorskip(backend)
+    monkeypatch.setattr(settings, "AR_JSON_BACKEND", backend)
+    view = ar.Blocks(
+        ar.Text("<b>Hello</b> & ü"), ar.Plot(gen_plot()), ar.Table(gen_df())
+    )
+
+    path, stream_path = tmp_path / "report.html", tmp_path / "stream.html"
+    ar.save_report(view, str(path))
+    ar.save_report(view, str(stream_path), stream=True)
+    # the streamed app data matches the rendered JSON
+    html, streamed = path.read_text(), stream_path.read_text()
+    decoder = json.JSONDecoder()
+    start, stream_start = html.index('{"data":'), streamed.index('{"data":')
+    app_data, end = decoder.raw_decode(html, start)
+    stream_data, stream_end = decoder.raw_decode(streamed, stream_start)
+    assert streamed[stream_start:stream_end] == html[start:end]
+    assert stream_data == app_data
+    assert app_data["data"]["result"]["viewJson"]["blocks"][0]["content"]
@@ -0,0 +1,123 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+import arakawa as ar
+from arakawa import settings
+from arakawa.asset_cache import AssetCache, fingerprint
+from arakawa.file_store import B64FileEntry
+from arakawa.processors import ConvertPydantic, Pipeline, PreProcessView, ViewState
+from arakawa.view import asset_writers
+from tests.builtins import gen_df, gen_plot, gen_table_df
+
+
+def _build(view: ar.Blocks, cache: AssetCache) -> ViewState:
+    s = ViewState(blocks=view, file_entry_klass=B64FileEntry)
+    return Pipeline(s).pipe(PreProcessView()).pipe(ConvertPydantic(cache=cache)).state
+
+
+@pytest.fixture
+def cache(tmp_path: Path) -> AssetCache:
+    return AssetCache(tmp_path / "cache")
+
+
+def test_fingerprint():
+    df = gen_table_df(10)
+    assert fingerprint(df) == fingerprint(df.copy())
+    assert fingerprint(df) != fingerprint(df.head(5))
+    assert fingerprint(df) != fingerprint(df.rename(columns={"A": "Z"}))
+    assert fingerprint(gen_plot()) == fingerprint(gen_plot())
+    # unsupported types aren't cached
+    assert fingerprint(object()) is None
+    assert fingerprint(pd.DataFrame({"a": [[1], [2]]})) is None
+    # mixed-type object values
+    ints, strs = pd.Index([1, "x"], dtype=object), pd.Index(["1", "x"], dtype=object)
+    assert fingerprint(pd.DataFrame({"a": ints})) != fingerprint(
+        pd.DataFrame({"a": strs})
+    )
+    assert fingerprint(pd.DataFrame({"a": [0, 1]}, index=ints)) != fingerprint(
+        pd.DataFrame({"a": [0, 1]}, index=strs)
+    )
+
+
+def test_cache_reuses_payloads(cache: AssetCache, monkeypatch: pytest.MonkeyPatch):
+    df = gen_table_df(100)
+    s1 = _build(ar.Blocks(ar.DataTable(df), ar.Plot(gen_plot())), cache)
+    assert (cache.hits, cache.misses) == (0, 2)
+
+    def fail(*_):
+        raise AssertionError("Asset shouldn't be serialized")
+
+    monkeypatch.setattr(asset_writers.ArrowFormat, "save_file", fail)
+    s2 = _build(ar.Blocks(ar.DataTable(df.copy()), ar.Plot(gen_plot())), cache)
+    assert (cache.hits, cache.misses) == (2, 2)
+    assert s1.store.as_dict() == s2.store.as_dict()
+
+
+def test_cache_keyed_by_block_type(cache: AssetCache):
+    df = gen_df()
+    _build(ar.Blocks(ar.Table(df), ar.DataTable(df)), cache)
+    assert (cache.hits, cache.misses) == (0, 2)
+
+
+def test_cache_keyed_by_category_estimate(
+    cache: AssetCache, monkeypatch: pytest.MonkeyPatch
+):
+    df = gen_table_df(100)
+    _build(ar.Blocks(ar.DataTable(df)), cache)
+    _build(ar.Blocks(ar.DataTable(df, category_estimate="sample")), cache)
+    assert (cache.hits, cache.misses) == (0, 2)
+
+    # blocks default to the global setting
+    monkeypatch.setattr(settings, "AR_CATEGORY_ESTIMATE", "sample")
+    _build(ar.Blocks(ar.DataTable(df)), cache)
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_cache_eviction(cache: AssetCache):
+    _build(ar.Blocks(ar.DataTable(gen_table_df(100))), cache)
+    (payload,) = cache.cache_dir.iterdir()
+
+    # only the most recent payload fits
+    cache.max_size = payload.stat().st_size
+    _build(ar.Blocks(ar.DataTable(gen_table_df(100))), cache)
+    assert len(list(cache.cache_dir.iterdir())) == 1
+    assert not payload.exists()
+
+
+def test_cache_evicts_once_per_build(
+    cache: AssetCache, monkeypatch: pytest.MonkeyPatch
+):
+    evictions = []
+    monkeypatch.setattr(
+        cache, "evict", lambda: evictions.append(len(list(cache.cache_dir.iterdir())))
+    )
+    view = ar.Blocks(*(ar.DataTable(gen_table_df(10)) for _ in range(3)))
+    _build(view, cache)
+    assert evictions == [3]
+
+
+def test_cached_payloads_not_written_in_processes(
+    cache: AssetCache, monkeypatch: pytest.MonkeyPatch
+):
+    from arakawa.view import pydantic_visitor
+
+    # as for matplotlib figures, though charts can be fingerprinted
+    monkeypatch.setattr(asset_writers.PlotWriter, "thread_safe", lambda *_: False)
+    view = ar.Blocks(ar.Plot(gen_plot()), ar.Text("text"))
+
+    def build() -> ViewState:
+        s = ViewState(blocks=view, file_entry_klass=B64FileEntry)
+        convert = ConvertPydantic(cache=cache, max_workers=2)
+        return Pipeline(s).pipe(PreProcessView()).pipe(convert).state
+
+    s1 = build()
+
+    def fail(*_, **__):
+        raise AssertionError("Cached payload shouldn't be written in a process")
+
+    monkeypatch.setattr(pydantic_visitor, "ProcessPoolExecutor", fail)
+    s2 = build()
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert s1.store.as_dict() == s2.store.as_dict()
@@ -0,0 +1,248 @@
+import base64
+import gzip
+import hashlib
+from pathlib import Path
+
+import pytest
+
+import arakawa as ar
+from arakawa import file_store
+from arakawa.file_store import (
+    AssetFileEntry,
+    B64FileEntry,
+    FileStore,
+    GzipB64FileEntry,
+    GzipTmpFileEntry,
+    LinkedFileEntry,
+)
+from arakawa.processors import ConvertPydantic, Pipeline, PreProcessView, ViewState
+from tests.builtins import gen_df, gen_plot
+
+IMAGE_PATH = Path(__file__).parent / "fixtures" / "Example.png"
+
+
+def _add(store: FileStore, payload: bytes):
+    fe = store.get_file(".json", "application/json")
+    fe.file.write(payload)
+    return store.add_file(fe)
+
+
+def test_add_file_dedup():
+    store = FileStore(B64FileEntry)
+    fe1 = _add(store, b'{"a": 1}')
+    fe2 = _add(store, b'{"a": 1}')
+    fe3 = _add(store, b'{"b": 2}')
+
+    assert fe1 is fe2
+    assert fe1 is not fe3
+    assert store.store_count == 2
+    assert store.dedup_hits == 1
+    assert store.get_entry(fe1.ref) is fe1
+    assert set(store.as_dict()) == {fe1.ref, fe3.ref}
+
+
+def test_view_assets_dedup_by_mime(tmp_path: Path):
+    payload = b'<svg xmlns="http://www.w3.org/2000/svg"></svg>'
+    (tmp_path / "a.svg").write_bytes(payload)
+    (tmp_path / "a.txt").write_bytes(payload)
+    view = ar.Blocks(
+        ar.Media(file=tmp_path / "a.svg"), ar.Attachment(file=tmp_path / "a.txt")
+    )
+    s = ViewState(blocks=view, file_entry_klass=B64FileEntry)
+    s = Pipeline(s).pipe(PreProcessView()).pipe(ConvertPydantic()).state
+
+    # the same contents, but served as different types
+    assert s.store.store_count == 2
+    assert s.store.dedup_hits == 0
+    media, attachment = s.view_json["blocks"]
+    assert media["type"] == "image/svg+xml"
+    assert attachment["type"] == "text/plain"
+    assert media["src"] != attachment["src"]
+
+
+def test_add_file_dedup_removes_duplicate_files(tmp_path: Path):
+    store = FileStore(GzipTmpFileEntry, assets_dir=tmp_path)
+    _add(store, b'{"a": 1}')
+    _add(store, b'{"a": 1}')
+
+    assert store.dedup_hits == 1
+    assert len(list(tmp_path.iterdir())) == 1
+
+
+def test_merge_stores():
+    store1 = FileStore(B64FileEntry)
+    store2 = FileStore(B64FileEntry)
+    fe = _add(store1, b'{"a": 1}')
+    _add(store2, b'{"a": 1}')
+    _add(store2, b'{"b": 2}')
+
+    store = store1 + store2
+    assert store.store_count == 2
+    assert store.dedup_hits == 1
+    assert store.get_entry(fe.ref) is fe
+
+
+def test_view_assets_dedup():
+    plot = gen_plot()
+    view = ar.Blocks(
+        ar.Select(
+            ar.Group(ar.Plot(plot), ar.Table(gen_df()), label="A"),
+            ar.Group(ar.Plot(plot), ar.Table(gen_df()), label="B"),
+        )
+    )
+    s = ViewState(blocks=view, file_entry_klass=B64FileEntry)
+    s = Pipeline(s).pipe(PreProcessView()).pipe(ConvertPydantic()).state
+
+    assert s.store.store_count == 2
+    assert s.store.dedup_hits == 2
+
+
+@pytest.mark.parametrize("max_workers", [None, 2])
+def test_view_assets_keyed_by_writer_options(max_workers: int | None):
+    df = gen_df()
+    view = ar.Blocks(ar.Table(df), ar.Table(df, renderer="fast"))
+    s = ViewState(blocks=view, file_entry_klass=B64FileEntry)
+    convert = ConvertPydantic(max_workers=max_workers)
+    s = Pipeline(s).pipe(PreProcessView()).pipe(convert).state
+
+    assert s.store.store_count == 2
+    assert s.store.dedup_hits == 0
+
+
+def test_gzip_b64_entry():
+    payload = b'{"a": 1}' * 10_000
+    fe = GzipB64FileEntry(".vl.json", "application/vnd.vegalite.v5+json")
+    fe.file.write(payload)
+    fe.freeze()
+
+    assert fe.metadata["encoding"] == "gzip"
+    assert fe.raw_size == len(payload)
+    assert fe.saved_size == len(payload) - fe.size > 0
+    _, data = fe.src.split(",", 1)
+    assert gzip.decompress(base64.b64decode(data)) == payload
+
+    # assets whose src is used directly aren't compressed
+    fe = GzipB64FileEntry(".svg", "image/svg+xml")
+    fe.file.write(b"<svg></svg>")
+    fe.freeze()
+    assert "encoding" not in fe.metadata
+    assert (
+        fe.src
+        == "data:image/svg+xml;base64," + base64.b64encode(b"<svg></svg>").decode()
+    )
+
+
+def test_freeze_hashes_stored_contents(tmp_path: Path):
+    payload = b'{"a": 1}' * 10_000
+
+    b64_fe = B64FileEntry(".json")
+    b64_fe.file.write(payload)
+    b64_fe.freeze()
+    _, encoded = b64_fe.src.split(",", 1)
+    assert b64_fe.hash == hashlib.sha256(payload).hexdigest()
+    assert b64_fe.size == len(encoded)
+    assert base64.b64decode(encoded) == payload
+
+    gz_fe = GzipTmpFileEntry(".json", dir_path=tmp_path)
+    gz_fe.file.write(payload)
+    gz_fe.freeze()
+    compressed = Path(gz_fe.wrapped.name).read_bytes()
+    assert gz_fe.hash == hashlib.sha256(compressed).hexdigest()
+    assert gz_fe.size == len(compressed)
+    assert gzip.decompress(compressed) == payload
+
+
+def test_asset_file_entry(tmp_path: Path):
+    store = FileStore(AssetFileEntry, assets_dir=tmp_path)
+    payload = b'{"a": 1}' * 1000
+    fe = store.get_file(".vl.json", "application/vnd.vegalite.v5+json")
+    fe.file.write(payload)
+    fe = store.add_file(fe)
+
+    assert fe.path == tmp_path / f"ar-{fe.hash}.vl.json"
+    assert fe.src == f"assets/{fe.path.name}"
+    assert fe.metadata["encoding"] == "gzip"
+    assert gzip.decompress(fe.path.read_bytes()) == payload
+
+    # a duplicate reuses the hash-named file, leaving no temp files behind
+    dup = store.get_file(".vl.json", "application/vnd.vegalite.v5+json")
+    dup.file.write(payload)
+    assert store.add_file(dup) is fe
+    assert list(tmp_path.iterdir()) == [fe.path]
+
+
+def test_load_file_links_into_assets_dir(tmp_path: Path):
+    src = IMAGE_PATH
+    store = FileStore(GzipTmpFileEntry, assets_dir=tmp_path)
+    fe = store.load_file(src)
+
+    assert isinstance(fe, LinkedFileEntry)
+    assert fe.mime == "image/png"
+    assert fe.hash == hashlib.sha256(src.read_bytes()).hexdigest()
+    assert fe.size == src.stat().st_size
+    assert fe.path.parent == tmp_path
+    assert fe.path.read_bytes() == src.read_bytes()
+    assert fe.src == f"assets/{fe.path.name}"
+
+    # loading the same file again reuses the linked entry
+    assert store.load_file(src) is fe
+    assert len(list(tmp_path.iterdir())) == 1
+
+
+def test_link_file_falls_back_to_copy(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    def fail(*_):
+        raise OSError("Not supported")
+
+    monkeypatch.setattr(file_store, "_reflink", fail)
+    monkeypatch.setattr(file_store, "_symlink", fail)
+    monkeypatch.setattr(file_store.os, "link", fail)
+
+    dest = tmp_path / "Example.png"
+    file_store.link_file(IMAGE_PATH, dest)
+    assert not dest.is_symlink()
+    assert dest.read_bytes() == IMAGE_PATH.read_bytes()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 8, 4096])
+def test_iter_src(chunk_size: int):
+    fe = B64FileEntry(".json")
+    fe.file.write(b'{"a": 1}' * 100 + b"x")
+    fe.freeze()
+
+    assert "".join(fe.iter_src(chunk_size=chunk_size)) == fe.src
+
+
+def test_parallel_build_matches_serial(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    import matplotlib
+    import matplotlib.pyplot as plt
+
+    # make matplotlib's SVGs deterministic, also within the (spawned) worker processes
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", "0")
+    monkeypatch.setitem(matplotlib.rcParams, "svg.hashsalt", "arakawa")
+    (tmp_path / "matplotlibrc").write_text("svg.hashsalt: arakawa\n")
+    monkeypatch.setenv("MATPLOTLIBRC", str(tmp_path / "matplotlibrc"))
+    fig, ax = plt.subplots()
+    ax.plot([1, 2, 3])
+    plot, df = gen_plot(), gen_df()
+    view = ar.Blocks(
+        ar.Plot(plot),
+        ar.Plot(fig),
+        ar.DataTable(gen_df(10)),
+        ar.Table(df),
+        ar.Group(ar.Plot(plot), ar.Table(df), ar.Plot(fig)),
+    )
+
+    def build(max_workers: int | None) -> ViewState:
+        s = ViewState(blocks=view, file_entry_klass=B64FileEntry)
+        return (
+            Pipeline(s)
+            .pipe(PreProcessView())
+            .pipe(ConvertPydantic(max_workers=max_workers))
+            .state
+        )
+
+    serial, parallel = build(None), build(4)
+    assert parallel.view_json == serial.view_json
+    assert parallel.store.as_dict() == serial.store.as_dict()
+    assert parallel.store.store_count == 4
+    plt.close(fig)
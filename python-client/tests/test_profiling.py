@@ -0,0 +1,127 @@
+import json
+import tracemalloc
+from pathlib import Path
+
+import pytest
+
+import arakawa as ar
+from arakawa.profiling import span
+from arakawa.view import asset_writers
+from tests.builtins import gen_plot, gen_table_df
+
+
+def _report() -> ar.Blocks:
+    return ar.Blocks(
+        ar.DataTable(gen_table_df(100), name="data"),
+        ar.Plot(gen_plot()),
+        ar.Text("hello"),
+    )
+
+
+def test_profile_save_report(tmp_path: Path):
+    path = tmp_path / "report.html"
+    profile = ar.BuildProfile()
+    assert ar.save_report(_report(), str(path), profile=profile) is profile
+
+    assert [p.processor for p in profile.processors] == [
+        "PreProcessView",
+        "ConvertPydantic",
+        "ExportHTMLInlineAssets",
+    ]
+    assert [(a.block_type, a.block_name) for a in profile.assets] == [
+        ("DataTable", "data"),
+        ("Plot", None),
+    ]
+    assert all(a.size > 0 for a in profile.assets)
+    # the assets are written within the conversion processor
+    convert = profile.processors[1]
+    assert convert.wall_time >= sum(a.wall_time for a in profile.assets)
+    assert convert.peak_memory >= max(a.peak_memory for a in profile.assets) > 0
+    assert profile.output_size == path.stat().st_size
+    assert not tracemalloc.is_tracing()
+    assert "ConvertPydantic" in profile.summary()
+    assert profile.to_dict()["output_size"] == profile.output_size
+
+
+def test_profile_failed_build(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    def fail(*_, **__):
+        raise ValueError("Failed to write")
+
+    monkeypatch.setattr(asset_writers.ArrowFormat, "save_file", fail)
+    profile = ar.BuildProfile()
+    with pytest.raises(ValueError, match="Failed to write"):
+        ar.save_report(_report(), str(tmp_path / "report.html"), profile=profile)
+    # tracing is stopped, though the build isn't finished
+    assert not tracemalloc.is_tracing()
+    assert profile.output_size is None
+
+    with pytest.raises(ValueError, match="Failed to write"):
+        ar.stringify_report(_report(), profile=ar.BuildProfile())
+    assert not tracemalloc.is_tracing()
+
+
+def test_profile_without_memory(tmp_path: Path):
+    profile = ar.BuildProfile(trace_memory=False)
+    ar.save_report(
+        _report(), str(tmp_path / "report"), mode="directory", profile=profile
+    )
+    assert all(p.peak_memory is None for p in profile.processors)
+    assert profile.processors[-1].processor == "ExportHTMLFileAssets"
+    assert profile.output_size > sum(a.size for a in profile.assets)
+
+    profile = ar.BuildProfile(trace_memory=False)
+    html = ar.stringify_report(_report(), profile=profile)
+    assert profile.output_size == len(html.encode())
+    assert len(profile.assets) == 2
+
+
+def test_profile_trace(tmp_path: Path):
+    profile = ar.BuildProfile(trace_memory=False, trace=True)
+    ar.save_report(
+        _report(),
+        str(tmp_path / "report.html"),
+        compress=True,
+        max_workers=2,
+        profile=profile,
+    )
+    path = tmp_path / "trace.json"
+    profile.save_trace(path)
+
+    events = json.loads(path.read_text())["traceEvents"]
+    spans = [e for e in events if e["ph"] == "X"]
+    names = {e["name"] for e in spans}
+    assert {
+        "PreProcessView",
+        "ConvertPydantic",
+        "ExportHTMLInlineAssets",
+        "walk view",
+        "build assets",
+        "dump view",
+        "write DataTable",
+        "write Plot",
+        "DataTable data",
+        "GzipB64FileEntry.freeze",
+        "B64FileEntry.src",
+        "dump app data",
+        "render template",
+    } <= names
+    # the writers run in the pool's threads, named in the metadata
+    main = next(e["tid"] for e in spans if e["name"] == "ConvertPydantic")
+    writers = [e for e in spans if e["cat"] == "writer"]
+    assert all(e["tid"] != main for e in writers)
+    thread_names = {e["tid"] for e in events if e["ph"] == "M"}
+    assert {e["tid"] for e in spans} <= thread_names
+    # spans are nested within their processor
+    convert = next(e for e in spans if e["name"] == "ConvertPydantic")
+    assert all(
+        convert["ts"] <= e["ts"] <= e["ts"] + e["dur"] <= convert["ts"] + convert["dur"]
+        for e in writers
+    )
+
+
+def test_span_without_profile():
+    # nothing is recorded outside a traced build
+    profile = ar.BuildProfile(trace=True)
+    with span("step"):
+        pass
+    assert profile._events == []
@@ -0,0 +1,113 @@
+import pandas as pd
+import pytest
+
+import arakawa as ar
+from arakawa.exceptions import ARError
+from arakawa.file_store import B64FileEntry, FileEntry, GzipB64FileEntry
+from arakawa.processors import ConvertPydantic, Pipeline, PreProcessView, ViewState
+from arakawa.render_cache import RenderCache
+from arakawa.view import asset_writers
+from tests.builtins import gen_plot, gen_table_df
+
+DF = gen_table_df(50)
+SMALL_DF = gen_table_df(5)
+
+
+def _report(title: str = "Title", df: pd.DataFrame | None = None) -> ar.Blocks:
+    return ar.Blocks(
+        ar.Text(f"# {title}"),
+        ar.Text("Some text"),
+        ar.Group(
+            ar.DataTable(DF if df is None else df, name="data"),
+            ar.Plot(gen_plot()),
+            columns=2,
+        ),
+        ar.Select(
+            ar.Text("tab 1", label="1"),
+            ar.Table(SMALL_DF, label="2"),
+        ),
+    )
+
+
+def _build(
+    view: ar.Blocks,
+    render_cache: RenderCache | None,
+    klass: type[FileEntry] = B64FileEntry,
+) -> ViewState:
+    s = ViewState(blocks=view, file_entry_klass=klass)
+    convert = ConvertPydantic(render_cache=render_cache)
+    return Pipeline(s).pipe(PreProcessView()).pipe(convert).state
+
+
+def test_render_cache_same_output():
+    expected = _build(_report(), None)
+    cache = RenderCache()
+    for _ in range(2):
+        s = _build(_report(), cache)
+        assert s.view_json == expected.view_json
+        assert s.store.as_dict() == expected.store.as_dict()
+    # the merged text, group and select are reused, so their sub-blocks aren't visited
+    assert (cache.hits, cache.misses) == (3, 7)
+
+
+def test_render_cache_rebuilds_changed_blocks(monkeypatch: pytest.MonkeyPatch):
+    cache = RenderCache()
+    _build(_report(), cache)
+
+    def fail(*_):
+        raise AssertionError("DataTable shouldn't be written")
+
+    monkeypatch.setattr(asset_writers.ArrowFormat, "save_file", fail)
+    hits = cache.hits
+    # only the text changes
+    s = _build(_report(title="New title"), cache)
+    assert cache.hits == hits + 2
+    assert s.view_json["blocks"][0]["content"].startswith("# New title")
+    monkeypatch.undo()
+    assert s.view_json == _build(_report(title="New title"), None).view_json
+
+    # changing the data rebuilds its table and the enclosing group
+    df = DF.copy()
+    df.iloc[0, 0] = -1
+    hits = cache.hits
+    s = _build(_report(df=df), cache)
+    # the text, select and plot
+    assert cache.hits == hits + 3
+    assert s.view_json == _build(_report(df=df), None).view_json
+
+
+def test_render_cache_entries_reusable():
+    cache = RenderCache()
+    _build(_report(), cache)
+    hits = cache.hits
+    # the cached entries can't be added to a store of another type, so only the texts are reused
+    s = _build(_report(), cache, GzipB64FileEntry)
+    assert cache.hits == hits + 2
+    assert s.view_json == _build(_report(), None, GzipB64FileEntry).view_json
+
+
+def test_render_cache_duplicate_names():
+    cache = RenderCache()
+    group = ar.Group(ar.Text("a", name="a"), ar.Text("b"))
+    _build(ar.Blocks(group, ar.Text("c")), cache)
+    with pytest.raises(ARError, match="Duplicate name a"):
+        _build(ar.Blocks(group, ar.Text("a2", name="a")), cache)
+
+
+def test_render_cache_eviction():
+    cache = RenderCache(max_entries=2)
+    _build(_report(), cache)
+    assert len(cache) == 2
+
+
+def test_render_cache_keeps_shared_entries():
+    # the tables' payloads are identical, so share the same entry
+    b = ar.Table(SMALL_DF.copy(), "b")
+    cache = RenderCache()
+    _build(ar.Blocks(ar.Table(SMALL_DF, "a"), b), cache)
+    # the changed table is rewritten and stored first, so the cached entry reused for b is a duplicate
+    _build(ar.Blocks(ar.Table(SMALL_DF, "changed"), b), cache)
+    s = _build(ar.Blocks(ar.Text("text"), b), cache)
+    assert (
+        s.store.as_dict() == _build(ar.Blocks(ar.Text("text"), b), None).store.as_dict()
+    )
@@ -1,9 +1,16 @@
+import io
 import tempfile
 from typing import cast
 
+import pandas as pd
 import polars as pl
+import pyarrow as pa
 import pytest
 
+from arakawa import settings
+from arakawa.blocks import DataTable
+from arakawa.exceptions import ARError
+from arakawa.view import Blocks
 from arakawa.view.asset_writers import DataTableWriter, HTMLTableWriter
 from tests.parser import TagsRecorderParser
 
@@ -54,3 +61,66 @@ def test_table_writer_with_polars(
     assert "table" in parser.start_tags
     assert "table" in parser.end_tags
     assert parser.is_valid()
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        pd.DataFrame({"a": [i % 10 for i in range(1000)], "b": ["foo"] * 1000}),
+        pa.table({"a": [i % 10 for i in range(1000)], "b": ["foo"] * 1000}),
+        pl.DataFrame({"a": [i % 10 for i in range(1000)], "b": ["foo"] * 1000}),
+    ],
+    ids=["pandas", "arrow", "polars"],
+)
+def test_data_table_writer_options(data):
+    plain, compressed = io.BytesIO(), io.BytesIO()
+    DataTableWriter(batch_size=300).write_file(data, plain)
+    DataTableWriter(compression="lz4", batch_size=300).write_file(data, compressed)
+
+    reader = pa.ipc.open_file(compressed.getvalue())
+    assert reader.num_record_batches == 4
+    assert reader.read_all().equals(pa.ipc.open_file(plain.getvalue()).read_all())
+    assert len(compressed.getvalue()) < len(plain.getvalue())
+
+
+@pytest.mark.parametrize(
+    "data", [pd.DataFrame({"a": [1]}), pa.table({"a": [1]}), pl.DataFrame({"a": [1]})]
+)
+def test_data_table_writer_meta(data):
+    assert DataTableWriter().get_meta(data).ext == ".arrow"
+
+
+def test_data_table_writer_invalid_category_estimate(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(settings, "AR_CATEGORY_ESTIMATE", "approx")
+    with pytest.raises(ARError, match="Unknown category estimate approx"):
+        DataTableWriter()
+    assert DataTableWriter("sample").category_estimate == "sample"
+
+
+def test_table_writer_invalid_renderer(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(settings, "AR_TABLE_RENDERER", "slow")
+    with pytest.raises(ARError, match="Unknown table renderer slow"):
+        HTMLTableWriter()
+    assert HTMLTableWriter("fast").renderer == "fast"
+
+
+def test_data_table_unsupported_data():
+    block = DataTable(pd.DataFrame({"a": [1]}))
+    block.data = {"a": [1]}
+    # rejected by the dry-run, without writing the data
+    with pytest.raises(ARError, match="dict not supported"):
+        Blocks(block).get_view()
+
+
+def test_table_writer_fast_renderer(
+    df: pl.DataFrame, monkeypatch: pytest.MonkeyPatch, parser: TagsRecorderParser
+):
+    def fail(*_):
+        raise AssertionError("Polars frames shouldn't be converted to pandas")
+
+    monkeypatch.setattr(pl.DataFrame, "to_pandas", fail)
+    f = io.BytesIO()
+    HTMLTableWriter("fast").write_file(df, f)
+    parser.feed(f.getvalue().decode())
+    assert parser.is_valid()
+    assert parser.start_tags.count("tr") == df.height + 1
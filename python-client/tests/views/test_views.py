@@ -4,6 +4,7 @@ from __future__ import annotations
 
 from pathlib import Path
 from typing import BinaryIO
+from uuid import UUID
 
 import pandas as pd
 import pytest
@@ -216,6 +217,29 @@ def test_gen_view_nested_mixed():
     assert glom(view, "blocks.0.blocks.0.name") == "test-id-1"
 
 
+def test_get_view_dry_run(monkeypatch: MonkeyPatch):
+    from arakawa.view.pydantic_visitor import PydanticBuilder
+
+    def fail(*_):
+        raise AssertionError("Assets shouldn't be written")
+
+    monkeypatch.setattr(PydanticBuilder, "_write_asset", fail)
+    df = gen_df()
+    view = ar.Blocks(
+        ar.DataTable(df), ar.Table(df), ar.Plot(gen_plot()), ar.Attachment({"a": 1})
+    ).get_view()
+    assert [b.type for b in view.blocks] == [
+        "application/vnd.apache.arrow+binary",
+        "application/vnd.arakawa.table+html",
+        "application/vnd.vegalite.v5+json",
+        "application/vnd.pickle+binary",
+    ]
+
+    # writer dispatch is still validated
+    with pytest.raises(ARError):
+        ar.Blocks(ar.Plot(object())).get_view()
+
+
 def test_gen_view_primitives(datadir: Path):
     # check we don't allow arbitrary python primitives - must be pickled directly via ar.Attachment
     with pytest.raises(ARError):
@@ -345,3 +369,79 @@ def test_save_report_with_files(datadir: Path, monkeypatch: MonkeyPatch):
     monkeypatch.chdir(datadir)
     view = gen_view_complex_with_files(datadir, local_report=True)
     ar.save_report(view, path="test_out.html", name="Even better report")
+
+
+def test_save_report_stream(datadir: Path, monkeypatch: MonkeyPatch):
+    import arakawa.processors.processors as pr
+
+    monkeypatch.chdir(datadir)
+    # fix the generated values so the outputs can be compared
+    monkeypatch.setattr(pr, "uuid4", lambda: UUID(int=0))
+    monkeypatch.setattr(pr, "timestamp", lambda: "2000-01-01T00:00:00Z")
+    view = ar.Blocks(
+        md_block,
+        ar.Plot(data=gen_plot()),
+        ar.Table(data=gen_df()),
+        ar.Media(file=datadir / "datapane-icon-192x192.png"),
+    )
+
+    ar.save_report(view, path="test_out.html")
+    ar.save_report(view, path="test_out_stream.html", stream=True)
+    assert Path("test_out_stream.html").read_text() == Path("test_out.html").read_text()
+
+
+def test_save_report_compressed(tmp_path: Path):
+    view = ar.Blocks(ar.DataTable(gen_df(1000)), ar.Plot(gen_plot()))
+    path, compressed_path = tmp_path / "report.html", tmp_path / "compressed.html"
+    ar.save_report(view, str(path))
+    ar.save_report(view, str(compressed_path), compress=True)
+
+    html = compressed_path.read_text()
+    assert '"encoding":"gzip"' in html
+    assert compressed_path.stat().st_size < path.stat().st_size
+
+
+def test_save_report_directory(tmp_path: Path, monkeypatch: MonkeyPatch):
+    from arakawa.view import asset_writers
+
+    df = gen_df(100)
+    ar.save_report(
+        ar.Blocks(ar.DataTable(df), ar.Plot(gen_plot())),
+        str(tmp_path),
+        mode="directory",
+    )
+    assets_dir = tmp_path / "assets"
+    assert (tmp_path / "index.html").is_file()
+    first_build = {p.name for p in assets_dir.glob("ar-*")}
+    assert len(first_build) == 2
+
+    # only the changed plot is written on a rebuild, and the stale one is removed
+    def fail(*_):
+        raise AssertionError("Unchanged asset shouldn't be serialized")
+
+    monkeypatch.setattr(asset_writers.ArrowFormat, "save_file", fail)
+    plot = gen_plot().properties(title="Changed")
+    ar.save_report(
+        ar.Blocks(ar.DataTable(df.copy()), ar.Plot(plot)),
+        str(tmp_path),
+        mode="directory",
+    )
+    second_build = {p.name for p in assets_dir.glob("ar-*")}
+    assert len(second_build) == 2
+    assert len(first_build & second_build) == 1
+    assert not list(assets_dir.glob(".ar-tmp-*"))
+
+    html = (tmp_path / "index.html").read_text()
+    assert all(f"assets/{name}" in html for name in second_build)
+
+
+@pytest.mark.parametrize("option", ["stream", "compress"])
+def test_save_report_directory_options(tmp_path: Path, option: str):
+    with pytest.raises(ARError, match="supported with mode='directory'"):
+        ar.save_report(
+            ar.Blocks(ar.Text("Hello")),
+            str(tmp_path),
+            mode="directory",
+            **{option: True},
+        )
+    assert not (tmp_path / "index.html").exists()
@@ -1,5 +1,25 @@
 import numeral from 'numeral'
 
+import type { ColumnStats } from '@/data-model/blocks'
+
 export const formatNumber = (n: number): string => {
   return numeral(n).format('0[.][0]a')
 }
+
+export const formatStats = (s: ColumnStats): string => {
+  /**
+   * Summarise a column's statistics in a line, e.g. for its header's tooltip
+   */
+  const parts = [`${formatNumber(s.nulls)} nulls`]
+  if (s.distinct !== undefined) {
+    parts.push(`${formatNumber(s.distinct)} distinct`)
+  }
+  if (s.min !== undefined && s.min !== null) {
+    parts.push(`${s.min} to ${s.max}`)
+  }
+  if (s.top?.length) {
+    const top = s.top.slice(0, 3).map(([v, n]) => `${v} (${formatNumber(n)})`)
+    parts.push(`most common ${top.join(', ')}`)
+  }
+  return parts.join(', ')
+}
@@ -2,7 +2,8 @@ import { markRaw } from 'vue'
 
 import VDataTableBlock from '@/components/blocks/DataTable/DataTableConnector.vue'
 
-import { AssetBlock, type BlockFigure, type CaptionType, type Elem } from './index'
+import { useRootStore } from '../root-store'
+import { AssetBlock, type BlockFigure, type CaptionType, decodeResponse, type Elem } from './index'
 
 const AUTO_LOAD_CELLS_LIMIT = 500000
 
@@ -12,11 +13,35 @@ export type DatasetResponse = {
   containsBigInt: boolean
 }
 
+export type ColumnStats = {
+  name: string
+  type: string
+  nulls: number
+  distinct?: number
+  min?: any
+  max?: any
+  // the most common values, with their counts
+  top?: [any, number][]
+  histogram?: { edges: any[]; counts: number[] }
+}
+
+type AssetRef = { src: string; encoding?: string }
+
+const getAssetRef = (ref: string): AssetRef => {
+  const [, assetId] = ref.split('://')
+  const { src, encoding } = useRootStore().assetMap[assetId]
+  return { src, encoding }
+}
+
 export class DataTableBlock extends AssetBlock {
   public component = markRaw(VDataTableBlock)
   public static captionType: CaptionType = 'Table'
   public rows: number
   public columns: number
+  // a small head of the table, shown until the full dataset is requested, if written
+  public preview?: AssetRef
+  // per-column statistics computed when the report was saved, if written
+  public stats?: AssetRef
 
   private _revogridExportPlugin: any
 
@@ -25,7 +50,7 @@ export class DataTableBlock extends AssetBlock {
   }
 
   public get deferLoad(): boolean {
-    return this.cells > AUTO_LOAD_CELLS_LIMIT
+    return this.preview !== undefined || this.cells > AUTO_LOAD_CELLS_LIMIT
   }
 
   public get exportUrl(): string {
@@ -34,16 +59,22 @@ export class DataTableBlock extends AssetBlock {
 
   public constructor(elem: Elem, figure: BlockFigure) {
     super(elem, figure)
-    const { rows, columns } = elem as unknown as {
+    const { rows, columns, previewSrc, statsSrc } = elem as unknown as {
       rows: number
       columns: number
+      previewSrc?: string
+      statsSrc?: string
     }
     this.rows = rows
     this.columns = columns
+    this.preview = previewSrc ? getAssetRef(previewSrc) : undefined
+    this.stats = statsSrc ? getAssetRef(statsSrc) : undefined
 
     this.componentProps = {
       ...this.componentProps,
       streamContents: this.streamContents,
+      streamPreview: this.preview && this.streamPreview,
+      fetchStats: this.stats && this.fetchStats,
       getCsvText: this.getCsvText,
       downloadLocal: this.downloadLocal,
       deferLoad: this.deferLoad,
@@ -52,12 +83,12 @@ export class DataTableBlock extends AssetBlock {
     }
   }
 
-  private fetchDataset(): Promise<any> {
-    return fetch(this.src).then((r) => {
+  private fetchDataset(src: string, encoding?: string): Promise<any> {
+    return fetch(src).then((r) => {
       if (!r.ok) {
         throw new Error('Failed to fetch dataset')
       }
-      return r.arrayBuffer()
+      return decodeResponse(r, encoding).arrayBuffer()
     })
   }
 
@@ -66,10 +97,27 @@ export class DataTableBlock extends AssetBlock {
      * Fetch dataset and convert to arrow format
      */
     const { apiResponseToArrow } = await import('../datatable/arrow-utils')
-    const arrayBuffer = await this.fetchDataset()
+    const arrayBuffer = await this.fetchDataset(this.src, this.encoding)
     return apiResponseToArrow(arrayBuffer)
   }
 
+  public streamPreview = async (): Promise<DatasetResponse> => {
+    /**
+     * Fetch the preview of the dataset, leaving the full dataset until it's requested
+     */
+    const { apiResponseToArrow } = await import('../datatable/arrow-utils')
+    const arrayBuffer = await this.fetchDataset(this.preview!.src, this.preview!.encoding)
+    return apiResponseToArrow(arrayBuffer)
+  }
+
+  public fetchStats = async (): Promise<ColumnStats[]> => {
+    /**
+     * Fetch the column statistics, which don't need the dataset to be loaded
+     */
+    const arrayBuffer = await this.fetchDataset(this.stats!.src, this.stats!.encoding)
+    return JSON.parse(new TextDecoder().decode(arrayBuffer))
+  }
+
   public downloadLocal = async (): Promise<void> => {
     /**
      * Download the current state of the DataTable via the client
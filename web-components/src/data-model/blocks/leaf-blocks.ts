@@ -46,12 +46,25 @@ export type CaptionType = 'Table' | 'Figure' | 'Plot'
 
 /* Helper functions */
 
-const readGcsTextOrJsonFile = <T = string | object | null>(url: string): Promise<T> => {
+export const decodeResponse = (res: Response, encoding?: string): Response => {
+  /**
+   * Decompress the body of a fetched asset, if it was stored compressed (e.g. gzip)
+   */
+  if (!encoding || !res.body) {
+    return res
+  }
+  return new Response(res.body.pipeThrough(new DecompressionStream(encoding as CompressionFormat)))
+}
+
+const readGcsTextOrJsonFile = <T = string | object | null>(
+  url: string,
+  encoding?: string,
+): Promise<T> => {
   return fetch(url, { method: 'GET' }).then(async (res) => {
     if (!res.ok) {
       throw new Error(`Failed to fetch asset data from ${url}: ${res.statusText}`)
     }
-    const text = await res.text()
+    const text = await decodeResponse(res, encoding).text()
     try {
       return JSON.parse(text) as T
     } catch {
@@ -292,6 +305,7 @@ export abstract class AssetBlock extends Block {
    */
   public src: string
   public type: string
+  public encoding?: string
 
   public constructor(elem: Elem, figure: BlockFigure) {
     super(elem, figure)
@@ -305,9 +319,10 @@ export abstract class AssetBlock extends Block {
       throw new Error(`Couldn't get block asset ID from src ${elem.src}`)
     }
 
-    const { src, mime } = rootStore.assetMap[assetId]
+    const { src, mime, encoding } = rootStore.assetMap[assetId]
     this.src = src
     this.type = mime
+    this.encoding = encoding
     this.componentProps = {
       ...this.componentProps,
       fetchAssetData: this.fetchAssetData.bind(this),
@@ -315,7 +330,7 @@ export abstract class AssetBlock extends Block {
   }
 
   protected async fetchAssetData(): AssetResource {
-    return await readGcsTextOrJsonFile(this.src)
+    return await readGcsTextOrJsonFile(this.src, this.encoding)
   }
 }
 
@@ -390,7 +405,7 @@ export class PlotlyBlock extends PlotAssetBlock {
   public component = markRaw(VPlotlyBlock)
 
   protected async fetchAssetData(): AssetResource {
-    const res = await readGcsTextOrJsonFile<string>(this.src)
+    const res = await readGcsTextOrJsonFile<string>(this.src, this.encoding)
     return JSON.parse(res)
   }
 }
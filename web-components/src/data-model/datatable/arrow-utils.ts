@@ -1,7 +1,38 @@
+import * as arrow from 'apache-arrow'
 import { DataType, Precision, tableFromIPC, Type } from 'apache-arrow'
 
 import type { DatasetResponse } from '../blocks'
 import { Coerce } from './Coerce'
+import { decodeLz4Frame } from './lz4'
+
+const LZ4_FRAME_MAGIC = [0x04, 0x22, 0x4d, 0x18]
+
+const isLz4Frame = (data: Uint8Array, pos: number): boolean =>
+  LZ4_FRAME_MAGIC.every((b, i) => data[pos + i] === b)
+
+// DataTables written with `compression="lz4"` have their buffers compressed as LZ4 frames,
+// which are decoded via apache-arrow's codec registry, returning whether it's available
+const registerLz4Codec = (): boolean => {
+  const registry = (arrow as any).compressionRegistry
+  const compressionType = (arrow as any).CompressionType
+  if (!registry || !compressionType) {
+    console.error('apache-arrow has no compressionRegistry, LZ4 compressed DataTables cannot be read')
+    return false
+  }
+  registry.set(compressionType.LZ4_FRAME, {
+    encode: () => {
+      throw new Error('LZ4 compression is not supported')
+    },
+    decode: (data: Uint8Array) => {
+      // skip the uncompressed length that prefixes the frame, if it's included
+      const start = !isLz4Frame(data, 0) && isLz4Frame(data, 8) ? 8 : 0
+      return decodeLz4Frame(data.subarray(start))
+    },
+  })
+  return true
+}
+
+export const lz4CodecRegistered = registerLz4Codec()
 
 export type FormattedNsSchemaField = {
   name: string
@@ -90,7 +121,17 @@ const extractArrowSchema = (sch: any): FormattedNsSchemaField[] => {
 
 export const apiResponseToArrow = (r: any): DatasetResponse => {
   const d: any[] = []
-  const table: any = tableFromIPC(r)
+  let table: any
+  try {
+    table = tableFromIPC(r)
+  } catch (e) {
+    if (!lz4CodecRegistered) {
+      throw new Error(
+        `Failed to read the DataTable (${e}), if it was saved with compression="lz4" this apache-arrow version cannot decompress it`,
+      )
+    }
+    throw e
+  }
   const coerce = new Coerce(table.schema.fields)
 
   for (const row of table) {
@@ -0,0 +1,126 @@
+/*
+Decoder for the LZ4 frame format (https://github.com/lz4/lz4/blob/dev/doc/lz4_Frame_format.md),
+used to decompress the buffers of DataTables written with `compression="lz4"`.
+
+Checksums are skipped rather than verified, as the assets are already checked by their hash.
+*/
+
+const FRAME_MAGIC = 0x184d2204
+const SKIPPABLE_MAGIC_MASK = 0xfffffff0
+const SKIPPABLE_MAGIC = 0x184d2a50
+
+const readU32 = (src: Uint8Array, pos: number): number =>
+  (src[pos] | (src[pos + 1] << 8) | (src[pos + 2] << 16) | (src[pos + 3] << 24)) >>> 0
+
+class Output {
+  public buf: Uint8Array
+  public len = 0
+
+  public constructor(size: number) {
+    this.buf = new Uint8Array(Math.max(size, 64))
+  }
+
+  public reserve(n: number) {
+    if (this.len + n > this.buf.length) {
+      const buf = new Uint8Array(Math.max(this.buf.length * 2, this.len + n))
+      buf.set(this.buf.subarray(0, this.len))
+      this.buf = buf
+    }
+  }
+}
+
+/** Decompress an LZ4 block into the output, where matches may refer back to previous blocks */
+const decodeBlock = (src: Uint8Array, start: number, end: number, out: Output) => {
+  let pos = start
+  while (pos < end) {
+    const token = src[pos++]
+
+    // literals
+    let litLen = token >>> 4
+    if (litLen === 15) {
+      let b
+      do {
+        b = src[pos++]
+        litLen += b
+      } while (b === 255)
+    }
+    out.reserve(litLen)
+    out.buf.set(src.subarray(pos, pos + litLen), out.len)
+    out.len += litLen
+    pos += litLen
+    // the last sequence only has literals
+    if (pos >= end) {
+      break
+    }
+
+    // match
+    const offset = src[pos] | (src[pos + 1] << 8)
+    pos += 2
+    if (offset === 0 || offset > out.len) {
+      throw new Error('Invalid LZ4 block')
+    }
+    let matchLen = (token & 15) + 4
+    if ((token & 15) === 15) {
+      let b
+      do {
+        b = src[pos++]
+        matchLen += b
+      } while (b === 255)
+    }
+    out.reserve(matchLen)
+    const buf = out.buf
+    let from = out.len - offset
+    if (offset >= matchLen) {
+      buf.copyWithin(out.len, from, from + matchLen)
+      out.len += matchLen
+    } else {
+      // overlapping matches repeat the bytes as they're written
+      for (let i = 0; i < matchLen; i++) {
+        buf[out.len++] = buf[from++]
+      }
+    }
+  }
+}
+
+/** Decompress one or more concatenated LZ4 frames */
+export const decodeLz4Frame = (src: Uint8Array, sizeHint = 0): Uint8Array => {
+  const out = new Output(sizeHint || src.length * 4)
+  let pos = 0
+  while (pos < src.length) {
+    const magic = readU32(src, pos)
+    if ((magic & SKIPPABLE_MAGIC_MASK) >>> 0 === SKIPPABLE_MAGIC) {
+      pos += 8 + readU32(src, pos + 4)
+      continue
+    }
+    if (magic !== FRAME_MAGIC) {
+      throw new Error('Invalid LZ4 frame')
+    }
+    const flags = src[pos + 4]
+    const hasBlockChecksum = flags & 0x10
+    const hasContentSize = flags & 0x08
+    const hasContentChecksum = flags & 0x04
+    const hasDictId = flags & 0x01
+    // magic, flags, block descriptor, optional content size & dictionary id, header checksum
+    pos += 6 + (hasContentSize ? 8 : 0) + (hasDictId ? 4 : 0) + 1
+
+    for (;;) {
+      const blockSize = readU32(src, pos)
+      pos += 4
+      if (blockSize === 0) {
+        break
+      }
+      const size = blockSize & 0x7fffffff
+      if (blockSize & 0x80000000) {
+        // stored uncompressed
+        out.reserve(size)
+        out.buf.set(src.subarray(pos, pos + size), out.len)
+        out.len += size
+      } else {
+        decodeBlock(src, pos, pos + size, out)
+      }
+      pos += size + (hasBlockChecksum ? 4 : 0)
+    }
+    pos += hasContentChecksum ? 4 : 0
+  }
+  return out.buf.subarray(0, out.len)
+}
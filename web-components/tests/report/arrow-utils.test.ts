@@ -0,0 +1,27 @@
+/**
+ * Tests reading DataTables written by the Python client
+ */
+import * as arrow from 'apache-arrow'
+import { readFileSync } from 'node:fs'
+import { describe, expect, it } from 'vitest'
+
+import { apiResponseToArrow, lz4CodecRegistered } from '../../src/data-model/datatable/arrow-utils'
+
+// written by `DataTableWriter(compression="lz4")`, 1000 rows of `id`, `name` (category) & `value`
+const lz4Table = readFileSync(new URL('./fixtures/lz4-table.arrow', import.meta.url))
+
+describe('Arrow utils tests', () => {
+  it('Registers the LZ4 codec with the installed apache-arrow', () => {
+    expect((arrow as any).compressionRegistry).toBeDefined()
+    expect(lz4CodecRegistered).toBe(true)
+  })
+
+  it('Decodes an LZ4 compressed table', () => {
+    const { schema, data } = apiResponseToArrow(new Uint8Array(lz4Table))
+    expect(schema.map((f) => f.name)).toEqual(['id', 'name', 'value'])
+    expect(schema[1].type).toBe('category')
+    expect(data).toHaveLength(1000)
+    expect(data[0]).toEqual({ id: 0, name: 'row 0', value: 0 })
+    expect(data[999]).toEqual({ id: 999, name: 'row 9', value: 249.75 })
+  })
+})